@@ -0,0 +1,117 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blockchain.blockchain import Block
+from blockchain.transaction import Transaction
+from crypto.poh import ProofOfHistory
+
+DEFAULT_BLOCKS = 200
+DEFAULT_BLOCK_SIZE = 500
+
+
+def make_transactions(count, fleet_size):
+    """Build a mix of registrations and authentications as (dict, Transaction) pairs"""
+    pairs = []
+    timestamp = int(time.time())
+    for i in range(count):
+        uav_id = f"uav-model-serial-{i % fleet_size}"
+        if i % 4 == 0:
+            public_key = os.urandom(32)
+            tx = Transaction.register(uav_id, public_key, "Quadcopter X500", "1.0.0", timestamp)
+        else:
+            tx = Transaction.authenticate(uav_id, uuid.uuid4().hex, timestamp, os.urandom(64))
+        pairs.append((tx.to_dict(), tx))
+    return pairs
+
+
+def legacy_block_hash(block_dict):
+    """Block hash as computed before the binary encoding: JSON of the whole block"""
+    return hashlib.sha256(json.dumps(block_dict, sort_keys=True).encode()).hexdigest()
+
+
+def legacy_tx_hash(tx_dict):
+    """Transaction hash over sorted-key JSON"""
+    return hashlib.sha256(json.dumps(tx_dict, sort_keys=True).encode()).hexdigest()
+
+
+def rate(count, func):
+    """Run func and return operations per second"""
+    started = time.perf_counter()
+    func()
+    return count / (time.perf_counter() - started)
+
+
+def allocated_bytes(build):
+    """Bytes still allocated after build() returns its result"""
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JSON/dict and binary encodings of blocks and transactions")
+    parser.add_argument("--blocks", type=int, default=DEFAULT_BLOCKS, help=f"Number of blocks (default: {DEFAULT_BLOCKS})")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help=f"Transactions per block (default: {DEFAULT_BLOCK_SIZE})")
+    parser.add_argument("--fleet-size", type=int, default=1000, help="Distinct UAV ids (default: 1000)")
+
+    args = parser.parse_args()
+
+    poh = ProofOfHistory()
+    legacy_blocks = []
+    blocks = []
+    for index in range(args.blocks):
+        pairs = make_transactions(args.block_size, args.fleet_size)
+        block = Block(index + 1, bytes(32), poh.tick(), [tx for _, tx in pairs], int(time.time()))
+        blocks.append(block)
+        legacy = block.to_dict()
+        legacy['transactions'] = [tx_dict for tx_dict, _ in pairs]
+        legacy_blocks.append(legacy)
+
+    tx_count = args.blocks * args.block_size
+    print(f"{args.blocks} blocks x {args.block_size} transactions, {args.fleet_size} distinct UAVs\n")
+
+    legacy_size = sum(len(json.dumps(block).encode()) for block in legacy_blocks) / args.blocks
+    binary_size = sum(len(block.to_bytes()) for block in blocks) / args.blocks
+    print(f"{'':28} {'before (JSON)':>16} {'after (binary)':>16}")
+    print(f"{'bytes per block':28} {legacy_size:>16,.0f} {binary_size:>16,.0f}")
+
+    all_pairs = [pair for block, legacy in zip(blocks, legacy_blocks) for pair in zip(legacy['transactions'], block.transactions)]
+    legacy_tx_rate = rate(tx_count, lambda: [legacy_tx_hash(tx_dict) for tx_dict, _ in all_pairs])
+    binary_tx_rate = rate(tx_count, lambda: [hashlib.sha256(tx.encode()).digest() for _, tx in all_pairs])
+    print(f"{'transaction hashes/s':28} {legacy_tx_rate:>16,.0f} {binary_tx_rate:>16,.0f}")
+
+    legacy_block_rate = rate(args.blocks, lambda: [legacy_block_hash(block) for block in legacy_blocks])
+    binary_block_rate = rate(args.blocks, lambda: [block.calculate_hash() for block in blocks])
+    full_block_rate = rate(args.blocks, lambda: [block.calculate_merkle_root() for block in blocks])
+    print(f"{'block hashes/s (header)':28} {legacy_block_rate:>16,.0f} {binary_block_rate:>16,.0f}")
+    print(f"{'block hashes/s (with txs)':28} {legacy_block_rate:>16,.0f} {full_block_rate:>16,.0f}")
+
+    encode_rate = rate(args.blocks, lambda: [block.to_bytes() for block in blocks])
+    payloads = [block.to_bytes() for block in blocks]
+    decode_rate = rate(args.blocks, lambda: [Block.from_bytes(payload) for payload in payloads])
+    legacy_encode_rate = rate(args.blocks, lambda: [json.dumps(block) for block in legacy_blocks])
+    legacy_payloads = [json.dumps(block) for block in legacy_blocks]
+    legacy_decode_rate = rate(args.blocks, lambda: [json.loads(payload) for payload in legacy_payloads])
+    print(f"{'blocks encoded/s':28} {legacy_encode_rate:>16,.0f} {encode_rate:>16,.0f}")
+    print(f"{'blocks decoded/s':28} {legacy_decode_rate:>16,.0f} {decode_rate:>16,.0f}")
+
+    sample = make_transactions(10000, args.fleet_size)
+    legacy_memory = allocated_bytes(lambda: [json.loads(json.dumps(tx_dict)) for tx_dict, _ in sample]) / len(sample)
+    binary_memory = allocated_bytes(lambda: [Transaction.decode(tx.encode())[0] for _, tx in sample]) / len(sample)
+    print(f"{'bytes per transaction (RAM)':28} {legacy_memory:>16,.0f} {binary_memory:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
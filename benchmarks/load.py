@@ -0,0 +1,219 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+import httpx
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from client.uav_client import UAVClient
+
+DEFAULT_UAVS = 200
+DEFAULT_CONCURRENCY = 100
+REPLAY_MESSAGE = "Nonce already used"
+# Fleets loaded from key files may already be registered from an earlier run
+ALREADY_REGISTERED = "UAV already registered"
+
+
+class OpStats:
+    """Latencies and outcomes of one kind of request"""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.errors = 0
+        self.rejected = 0
+
+    def record(self, latency, ok, rejected=False):
+        self.latencies.append(latency)
+        if rejected:
+            self.rejected += 1
+        elif not ok:
+            self.errors += 1
+
+    def report(self, elapsed):
+        """One line of the results table"""
+        values = sorted(self.latencies)
+        count = len(values)
+        if not count:
+            return f"{self.name:14} {0:>8}"
+
+        def percentile(fraction):
+            return values[min(count - 1, int(count * fraction))] * 1000
+
+        return (f"{self.name:14} {count:>8} {count / elapsed:>10,.0f} {percentile(0.5):>9.1f} "
+                f"{percentile(0.95):>9.1f} {percentile(0.99):>9.1f} {statistics.fmean(values) * 1000:>9.1f} "
+                f"{self.errors / count:>8.1%} {self.rejected / count:>8.1%}")
+
+
+def load_fleet(count, key_dir, server_url):
+    """Create the simulated UAVs, reusing key files from key_dir when present"""
+    fleet = []
+    prefix = uuid.uuid4().hex[:8]
+    for i in range(count):
+        if key_dir:
+            path = os.path.join(key_dir, f"uav-{i}.json")
+            if os.path.exists(path):
+                fleet.append(UAVClient.load_from_file(path, server_url))
+                continue
+            client = UAVClient(server_url, f"load-{prefix}-{i}")
+            os.makedirs(key_dir, exist_ok=True)
+            client.save_keys(path)
+        else:
+            client = UAVClient(server_url, f"load-{prefix}-{i}")
+        fleet.append(client)
+    return fleet
+
+
+async def send(http, path, body, stats, expect_replay=False, scheduled=None):
+    """Send one request and record its latency, measured from its scheduled start if given
+
+    With expect_replay the request is supposed to be rejected as a replay
+    and such a rejection is counted separately instead of as an error.
+    """
+    started = scheduled if scheduled is not None else time.perf_counter()
+    try:
+        response = await http.post(path, json=body)
+        result = response.json()
+        message = result["message"] or ""
+        ok = result["success"] or message == ALREADY_REGISTERED
+    except (httpx.HTTPError, ValueError, KeyError):
+        ok = False
+        message = ""
+    rejected = expect_replay and not ok and message.startswith(REPLAY_MESSAGE)
+    stats.record(time.perf_counter() - started, ok, rejected)
+
+
+async def register_fleet(http, fleet, concurrency, stats):
+    """Register every UAV, at most concurrency requests in flight"""
+    limit = asyncio.Semaphore(concurrency)
+
+    async def register(client):
+        async with limit:
+            await send(http, "/api/v1/uav/register", client.registration_data("Quadcopter X500", "1.0.0"), stats)
+
+    await asyncio.gather(*(register(client) for client in fleet))
+
+
+async def authenticate_fleet(http, fleet, args, stats, replays):
+    """Authenticate UAVs round robin for the configured duration
+
+    With a target rate requests are started on a fixed schedule (open loop)
+    and latency counts from the scheduled start, so time spent waiting for a
+    free concurrency slot is included. Without one, concurrency workers send
+    back to back (closed loop).
+    """
+    limit = asyncio.Semaphore(args.concurrency)
+    last_body = {}
+    rng = random.Random(args.seed)
+    deadline = time.perf_counter() + args.duration
+
+    def next_request(i):
+        client = fleet[i % len(fleet)]
+        if client.uav_id in last_body and rng.random() < args.replay_fraction:
+            # Resend an already accepted body, the server must reject it
+            return last_body[client.uav_id], replays, True
+        body = client.authentication_data()
+        last_body[client.uav_id] = body
+        return body, stats, False
+
+    async def scheduled_send(body, op_stats, replay, scheduled):
+        async with limit:
+            await send(http, "/api/v1/uav/authenticate", body, op_stats, replay, scheduled)
+
+    if args.rate:
+        tasks = []
+        started = time.perf_counter()
+        i = 0
+        while True:
+            scheduled = started + i / args.rate
+            if scheduled >= deadline:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(scheduled_send(*next_request(i), scheduled)))
+            i += 1
+        await asyncio.gather(*tasks)
+        return
+
+    counter = iter(range(sys.maxsize))
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            body, op_stats, replay = next_request(next(counter))
+            await send(http, "/api/v1/uav/authenticate", body, op_stats, replay)
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+async def run(args):
+    if args.url:
+        # One connection per concurrency slot, a much larger httpx pool gets slow to scan
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        http = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout)
+        lifespan = None
+    else:
+        # The server reads its UAV_* settings when it is imported
+        from server.server import app
+        http = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://in-process", timeout=args.timeout)
+        lifespan = app.router.lifespan_context(app)
+        await lifespan.__aenter__()
+
+    fleet = load_fleet(args.uavs, args.key_dir, args.url or "http://in-process")
+    register_stats = OpStats("register")
+    auth_stats = OpStats("authenticate")
+    replay_stats = OpStats("replay")
+
+    try:
+        started = time.perf_counter()
+        await register_fleet(http, fleet, args.concurrency, register_stats)
+        register_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        await authenticate_fleet(http, fleet, args, auth_stats, replay_stats)
+        auth_seconds = time.perf_counter() - started
+    finally:
+        await http.aclose()
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+
+    return register_stats, register_seconds, auth_stats, replay_stats, auth_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate registration and authentication load and report latency")
+    parser.add_argument("--url", default=None, help="Server URL, the ASGI app is driven in-process when omitted")
+    parser.add_argument("--uavs", type=int, default=DEFAULT_UAVS, help=f"Simulated UAVs (default: {DEFAULT_UAVS})")
+    parser.add_argument("--key-dir", default=None, help="Load UAV key files from this directory, creating missing ones")
+    parser.add_argument("--rate", type=float, default=0, help="Target authentications per second, 0 sends as fast as possible (default: 0)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help=f"Requests in flight at most (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of authentication load (default: 10)")
+    parser.add_argument("--replay-fraction", type=float, default=0.0, help="Share of authentications that replay an old request (default: 0)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds (default: 60)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for choosing replays (default: 1)")
+
+    args = parser.parse_args()
+
+    register_stats, register_seconds, auth_stats, replay_stats, auth_seconds = asyncio.run(run(args))
+
+    target = f"{args.rate:,.0f}/s target" if args.rate else "closed loop"
+    print(f"{args.uavs} UAVs, concurrency {args.concurrency}, {target}, {'in-process' if not args.url else args.url}\n")
+    print(f"{'':14} {'requests':>8} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mean ms':>9} "
+          f"{'errors':>8} {'replays':>8}")
+    print(register_stats.report(register_seconds))
+    print(auth_stats.report(auth_seconds))
+    if replay_stats.latencies:
+        print(replay_stats.report(auth_seconds))
+        missed = len(replay_stats.latencies) - replay_stats.rejected
+        print(f"\nreplays sent {len(replay_stats.latencies)}, rejected {replay_stats.rejected}, accepted or failed otherwise {missed}")
+
+
+if __name__ == "__main__":
+    main()
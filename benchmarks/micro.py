@@ -0,0 +1,144 @@
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blockchain.blockchain import Blockchain
+from blockchain.transaction import Transaction
+from crypto.poh import ProofOfHistory
+
+DEFAULT_TICKS = 200000
+DEFAULT_BLOCKS = 500
+DEFAULT_BLOCK_SIZE = 100
+
+
+def best_rate(count, func, repeat):
+    """Run func repeat times and return the best operations per second"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+    return count / best
+
+
+def build_chain(block_count, block_size):
+    """Build an in-memory chain of blocks filled with synthetic transactions"""
+    blockchain = Blockchain()
+    timestamp = int(time.time())
+    for b in range(block_count):
+        for i in range(block_size):
+            uav_id = f"uav-{b}-{i}"
+            if i % 2:
+                tx = Transaction.authenticate(uav_id, uuid.uuid4().hex, timestamp, os.urandom(64))
+            else:
+                tx = Transaction.register(uav_id, os.urandom(32), "Quadcopter X500", "1.0.0", timestamp)
+            blockchain.add_transaction(tx)
+        blockchain.mine_block()
+    return blockchain
+
+
+def poh_tick(args):
+    poh = ProofOfHistory()
+    data = os.urandom(32)
+
+    def run():
+        for i in range(args.ticks):
+            poh.tick(data if i % 10 == 0 else None)
+
+    return best_rate(args.ticks, run, args.repeat)
+
+
+def block_hash(args, blockchain):
+    blocks = list(blockchain.chain)
+
+    def run():
+        for block in blocks:
+            block.calculate_hash()
+
+    return best_rate(len(blocks), run, args.repeat)
+
+
+def merkle_root(args, blockchain):
+    blocks = list(blockchain.chain)
+
+    def run():
+        for block in blocks:
+            block.calculate_merkle_root()
+
+    return best_rate(len(blocks), run, args.repeat)
+
+
+def chain_valid(args, blockchain):
+    def run():
+        # Forget the watermark so every block is checked again
+        blockchain.verified_height = 0
+        if not blockchain.is_chain_valid():
+            raise RuntimeError("test chain failed validation")
+
+    return best_rate(len(blockchain.chain), run, args.repeat)
+
+
+def chain_audit(args, blockchain):
+    def run():
+        if not blockchain.is_chain_valid(full=True, workers=1):
+            raise RuntimeError("test chain failed the full audit")
+
+    return best_rate(len(blockchain.chain), run, args.repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the PoH and chain validation hot paths")
+    parser.add_argument("--ticks", type=int, default=DEFAULT_TICKS, help=f"PoH ticks per run (default: {DEFAULT_TICKS})")
+    parser.add_argument("--blocks", type=int, default=DEFAULT_BLOCKS, help=f"Blocks in the test chain (default: {DEFAULT_BLOCKS})")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help=f"Transactions per block (default: {DEFAULT_BLOCK_SIZE})")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark, the best one counts (default: 3)")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare against results saved earlier with --save")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown against --compare before failing (default: 0.2)")
+
+    args = parser.parse_args()
+
+    blockchain = build_chain(args.blocks, args.block_size)
+    results = {
+        "poh_tick": (poh_tick(args), "ticks/s"),
+        "block_hash": (block_hash(args, blockchain), "blocks/s"),
+        "merkle_root": (merkle_root(args, blockchain), "blocks/s"),
+        "is_chain_valid": (chain_valid(args, blockchain), "blocks/s"),
+        "is_chain_valid_full": (chain_audit(args, blockchain), "blocks/s"),
+    }
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    print(f"{args.blocks} blocks x {args.block_size} transactions, best of {args.repeat}\n")
+    regressions = []
+    for name, (rate, unit) in results.items():
+        line = f"{name:22} {rate:>14,.0f} {unit}"
+        if name in baseline:
+            change = rate / baseline[name] - 1
+            line += f"  {change:+.1%}"
+            if change < -args.tolerance:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({name: rate for name, (rate, _) in results.items()}, f, indent=2)
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower than {args.compare} by more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
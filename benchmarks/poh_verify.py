@@ -0,0 +1,66 @@
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crypto.poh import ProofOfHistory
+
+DEFAULT_TICKS = 2000000
+
+
+def build_history(tick_count, data_every):
+    """Generate a PoH history, mixing data into every data_every-th tick"""
+    poh = ProofOfHistory()
+    for i in range(tick_count):
+        poh.tick(f"event-{i}" if i % data_every == 0 else None)
+    return poh
+
+
+def parse_workers(value):
+    """Parse a comma separated list of worker counts"""
+    return [int(part) for part in value.split(",") if part]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel PoH sequence verification")
+    parser.add_argument("--ticks", type=int, default=DEFAULT_TICKS, help=f"Number of ticks to generate (default: {DEFAULT_TICKS})")
+    parser.add_argument("--data-every", type=int, default=10, help="Mix data into every Nth tick (default: 10)")
+    parser.add_argument("--workers", type=parse_workers, default=None, help="Comma separated worker counts (default: 1,2,4,... up to the core count)")
+    parser.add_argument("--corrupt", type=int, default=None, help="Corrupt the tick at this index to check error reporting")
+
+    args = parser.parse_args()
+
+    workers = args.workers
+    if workers is None:
+        workers = [1]
+        while workers[-1] * 2 <= (os.cpu_count() or 1):
+            workers.append(workers[-1] * 2)
+
+    print(f"Generating {args.ticks} ticks...")
+    started = time.perf_counter()
+    poh = build_history(args.ticks, args.data_every)
+    generate_seconds = time.perf_counter() - started
+    print(f"Generated in {generate_seconds:.2f}s ({args.ticks / generate_seconds:,.0f} ticks/s)")
+
+    if args.corrupt is not None:
+        poh.ticks[args.corrupt].hash = bytes(32)
+
+    print("\nSerial verify_sequence...")
+    started = time.perf_counter()
+    valid = poh.verify_sequence()
+    serial_seconds = time.perf_counter() - started
+    print(f"Valid: {valid}, {serial_seconds:.2f}s ({args.ticks / serial_seconds:,.0f} ticks/s)")
+
+    print(f"\n{'workers':>8} {'seconds':>10} {'ticks/s':>14} {'speedup':>8}  first bad index")
+    for worker_count in workers:
+        started = time.perf_counter()
+        bad_index = poh.verify_parallel(workers=worker_count)
+        seconds = time.perf_counter() - started
+        print(f"{worker_count:>8} {seconds:>10.2f} {args.ticks / seconds:>14,.0f} {serial_seconds / seconds:>7.2f}x  {bad_index}")
+
+
+if __name__ == "__main__":
+    main()
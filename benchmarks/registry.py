@@ -0,0 +1,123 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blockchain.registry import UavRegistry
+
+DEFAULT_UAVS = 200000
+MODELS = ("Quadcopter X500", "Quadcopter X700", "Fixed Wing F1", "Hexacopter H6")
+FIRMWARE_VERSIONS = tuple(f"{major}.{minor}.0" for major in range(1, 5) for minor in range(5))
+
+
+def make_fleet(count):
+    """Synthetic (uav_id, public_key, model, firmware_version) registrations"""
+    return [
+        (f"uav-model-serial-{i}", os.urandom(32), MODELS[i % len(MODELS)],
+         FIRMWARE_VERSIONS[i % len(FIRMWARE_VERSIONS)])
+        for i in range(count)
+    ]
+
+
+def build_legacy(fleet):
+    """Registry as a dict of per-UAV dicts with hex keys, as it was kept before"""
+    registry = {}
+    for uav_id, public_key, model, firmware_version in fleet:
+        registry[uav_id] = {
+            'public_key': public_key.hex(),
+            'model': model,
+            'firmware_version': firmware_version,
+            'last_auth': int(time.time())
+        }
+    return registry
+
+
+def build_registry(fleet):
+    """The same fleet in a columnar UavRegistry"""
+    registry = UavRegistry()
+    now = int(time.time())
+    for uav_id, public_key, model, firmware_version in fleet:
+        registry.register(uav_id, public_key, model, firmware_version)
+        registry.set_last_auth(uav_id, now)
+    return registry
+
+
+def allocated_bytes(build, fleet):
+    """Bytes allocated by build(fleet) that are still held by its result, ids excluded"""
+    tracemalloc.start()
+    result = build(fleet)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def best_time(func, repeat):
+    """Best wall time of repeat runs of func, in seconds"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the dict registry with the columnar UavRegistry")
+    parser.add_argument("--uavs", type=int, default=DEFAULT_UAVS, help=f"Registered UAVs (default: {DEFAULT_UAVS})")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query, the best is reported (default: 3)")
+
+    args = parser.parse_args()
+
+    fleet = make_fleet(args.uavs)
+    legacy, legacy_bytes = allocated_bytes(build_legacy, fleet)
+    registry, registry_bytes = allocated_bytes(build_registry, fleet)
+    print(f"{args.uavs} UAVs, {len(MODELS)} models, {len(FIRMWARE_VERSIONS)} firmware versions")
+    print(f"memory per UAV (uav_id strings not counted): dict {legacy_bytes / args.uavs:.0f} B, "
+          f"columns {registry_bytes / args.uavs:.0f} B")
+
+    firmware_version = FIRMWARE_VERSIONS[0]
+    expected = args.uavs // len(FIRMWARE_VERSIONS)
+
+    def legacy_find():
+        return [uav_id for uav_id, entry in legacy.items() if entry['firmware_version'] == firmware_version]
+
+    def registry_find():
+        return registry.find(firmware_version=firmware_version, limit=args.uavs)['uav_ids']
+
+    assert len(legacy_find()) == len(registry_find()) >= expected
+    print(f"UAVs on firmware {firmware_version}: scan {best_time(legacy_find, args.repeat) * 1e3:.2f} ms, "
+          f"index {best_time(registry_find, args.repeat) * 1e3:.2f} ms")
+
+    def legacy_counts():
+        return Counter(entry['firmware_version'] for entry in legacy.values())
+
+    def registry_counts():
+        return registry.counts('firmware_version')
+
+    assert dict(legacy_counts()) == registry_counts()
+    print(f"UAVs per firmware version: scan {best_time(legacy_counts, args.repeat) * 1e3:.2f} ms, "
+          f"counters {best_time(registry_counts, args.repeat) * 1e6:.1f} us")
+
+    changes = min(args.uavs, 10000)
+    new_key = os.urandom(32)
+
+    def rotate():
+        for uav_id, _, _, _ in fleet[:changes]:
+            registry.rotate_key(uav_id, new_key)
+
+    def revoke():
+        for uav_id, _, _, _ in fleet[:changes]:
+            registry.revoke(uav_id)
+
+    print(f"key rotation {best_time(rotate, args.repeat) / changes * 1e6:.2f} us, "
+          f"revocation {best_time(revoke, 1) / changes * 1e6:.2f} us per UAV")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from cryptography.hazmat.primitives import serialization
+
+from blockchain.blockchain import Blockchain
+from blockchain.producer import BlockProducer
+from crypto.signatures import SignatureVerifier, auth_message
+from server.metrics import resident_memory
+
+# Unix time the generated streams start at, block timestamps of 0 count as unset
+EPOCH = 1700000000
+DEFAULT_UAVS = 1000
+DEFAULT_AUTHS = 20000
+DEFAULT_RATE = 2000.0
+DEFAULT_BLOCK_SIZE = 500
+DEFAULT_BLOCK_INTERVAL = 1.0
+MODELS = ("Quadcopter X500", "Quadcopter X700", "Fixed Wing F1", "Hexacopter H6")
+
+
+class SimClock:
+    """Unix time that only moves when the replay sets it"""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def generate(seed, uavs, auths, rate):
+    """Deterministic stream of registrations followed by authentications
+
+    Arrivals are a Poisson process of rate requests per second. Keys,
+    nonces and the order of authenticating UAVs only depend on the seed, so
+    a seed always produces the same stream byte for byte.
+    """
+    rng = random.Random(seed)
+    keys = []
+    stream = []
+    at = float(EPOCH)
+    for i in range(uavs):
+        key = ed25519.Ed25519PrivateKey.from_private_bytes(hashlib.sha256(f"{seed}:{i}".encode()).digest())
+        keys.append(key)
+        public_key = key.public_key().public_bytes(
+            encoding=serialization.Encoding.Raw,
+            format=serialization.PublicFormat.Raw
+        )
+        stream.append({
+            'at': at, 'type': 'REGISTER', 'uav_id': f"uav-sim-{seed}-{i}", 'public_key': public_key.hex(),
+            'model': MODELS[i % len(MODELS)], 'firmware_version': f"1.{i % 5}.0"
+        })
+        at += rng.expovariate(rate)
+    for _ in range(auths):
+        i = rng.randrange(uavs)
+        uav_id = f"uav-sim-{seed}-{i}"
+        nonce = f"{rng.getrandbits(128):032x}"
+        timestamp = int(at)
+        stream.append({
+            'at': at, 'type': 'AUTHENTICATE', 'uav_id': uav_id, 'nonce': nonce, 'timestamp': timestamp,
+            'signature': keys[i].sign(auth_message(uav_id, nonce, timestamp)).hex()
+        })
+        at += rng.expovariate(rate)
+    return stream
+
+
+def read_stream(path):
+    """Stream saved with --save-stream, one request per line"""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_stream(path, stream):
+    with open(path, 'w') as f:
+        for request in stream:
+            f.write(json.dumps(request, separators=(',', ':')) + "\n")
+
+
+def stream_from_chain(storage_dir):
+    """Registrations and authentications recorded in a stored chain, in chain order
+
+    A request arrives at its transaction's timestamp. Other transaction
+    types are left out, so authentications signed with a rotated key are
+    rejected in the replay. Stop the server before reading its data dir.
+    """
+    blockchain = Blockchain(storage_dir=storage_dir)
+    if blockchain.pruned_height:
+        raise SystemExit(f"{storage_dir} is pruned below block {blockchain.pruned_height}, "
+                         f"the registrations in those blocks are gone")
+    stream = []
+    for height in range(1, len(blockchain.chain)):
+        for tx in blockchain.chain[height].transactions:
+            if tx.type == 'REGISTER':
+                stream.append({
+                    'at': float(tx.timestamp), 'type': 'REGISTER', 'uav_id': tx.uav_id,
+                    'public_key': tx.public_key.hex(), 'model': tx.model, 'firmware_version': tx.firmware_version
+                })
+            elif tx.type == 'AUTHENTICATE':
+                stream.append({
+                    'at': float(tx.timestamp), 'type': 'AUTHENTICATE', 'uav_id': tx.uav_id, 'nonce': tx.nonce,
+                    'timestamp': tx.timestamp, 'signature': tx.signature.hex()
+                })
+    blockchain.close()
+    # Stable, so requests with the same timestamp keep their chain order
+    stream.sort(key=lambda request: request['at'])
+    return stream
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def replay(stream, args):
+    """Replay a stream through a BlockProducer on a simulated clock
+
+    Blocks are sealed on the producer's size or time window, measured in
+    simulated time, and sealing takes no simulated time. Returns the chain
+    and the replay statistics.
+    """
+    clock = SimClock(stream[0]['at'] if stream else float(EPOCH))
+    verifier = SignatureVerifier(executor=args.verify_executor, workers=args.workers)
+    blockchain = Blockchain(nonce_window=args.nonce_window, verifier=verifier, clock=clock)
+    producer = BlockProducer(blockchain, max_block_size=args.block_size, block_interval=args.block_interval)
+
+    waiting = []  # (arrival, receipt) not sealed or rejected yet
+    latencies = []
+    rejected = 0
+    first_pending_at = None
+    processing = 0.0
+
+    def seal():
+        nonlocal first_pending_at, processing, rejected
+        started = time.perf_counter()
+        producer.seal()
+        processing += time.perf_counter() - started
+        for arrival, receipt in waiting:
+            if receipt.is_sealed():
+                latencies.append(clock.now - arrival)
+            else:
+                rejected += 1
+        waiting.clear()
+        first_pending_at = None
+
+    memory_before = resident_memory()
+    for request in stream:
+        # Blocks whose time window closes before this arrival
+        if first_pending_at is not None and first_pending_at + args.block_interval <= request['at']:
+            clock.now = first_pending_at + args.block_interval
+            seal()
+        clock.now = request['at']
+
+        started = time.perf_counter()
+        if request['type'] == 'REGISTER':
+            success, _, receipt = producer.register_uav(
+                request['uav_id'], request['public_key'], request['model'], request['firmware_version']
+            )
+        else:
+            success, _, receipt = producer.authenticate_uav(
+                request['uav_id'], request['nonce'], request['timestamp'], request['signature']
+            )
+        processing += time.perf_counter() - started
+
+        if not success:
+            rejected += 1
+            continue
+        waiting.append((request['at'], receipt))
+        if first_pending_at is None:
+            first_pending_at = request['at']
+        if len(waiting) >= args.block_size:
+            seal()
+
+    if first_pending_at is not None:
+        clock.now = first_pending_at + args.block_interval
+        seal()
+    memory_after = resident_memory()
+
+    started = time.perf_counter()
+    valid = blockchain.is_chain_valid(full=True)
+    validation = time.perf_counter() - started
+
+    return blockchain, {
+        'requests': len(stream),
+        'transactions': len(latencies),
+        'rejected': rejected,
+        'blocks': len(blockchain.chain) - 1,
+        'simulated_seconds': clock.now - stream[0]['at'] if stream else 0.0,
+        'processing_seconds': processing,
+        'latencies': latencies,
+        'memory_growth': memory_after - memory_before,
+        'validation_seconds': validation,
+        'valid': valid
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a stream of registrations and authentications on a simulated clock")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--stream", help="Replay a stream saved with --save-stream instead of generating one")
+    source.add_argument("--from-chain", metavar="DATA_DIR", help="Replay the registrations and authentications of a stored chain")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the generated stream (default: 1)")
+    parser.add_argument("--uavs", type=int, default=DEFAULT_UAVS, help=f"Generated registrations (default: {DEFAULT_UAVS})")
+    parser.add_argument("--auths", type=int, default=DEFAULT_AUTHS, help=f"Generated authentications (default: {DEFAULT_AUTHS})")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help=f"Generated requests per simulated second (default: {DEFAULT_RATE:g})")
+    parser.add_argument("--save-stream", help="Write the stream that is replayed to this JSONL file")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help=f"Transactions per block (default: {DEFAULT_BLOCK_SIZE})")
+    parser.add_argument("--block-interval", type=float, default=DEFAULT_BLOCK_INTERVAL,
+                        help=f"Simulated seconds before a partial block is sealed (default: {DEFAULT_BLOCK_INTERVAL:g})")
+    parser.add_argument("--nonce-window", type=int, default=300, help="Accepted clock skew in seconds (default: 300)")
+    parser.add_argument("--verify-executor", choices=["thread", "process"], help="Verify signature batches in a worker pool")
+    parser.add_argument("--workers", type=int, help="Verification workers")
+    parser.add_argument("--expect", help="Fail unless the replay ends on this block hash")
+
+    args = parser.parse_args()
+
+    if args.stream:
+        stream = read_stream(args.stream)
+    elif args.from_chain:
+        stream = stream_from_chain(args.from_chain)
+    else:
+        stream = generate(args.seed, args.uavs, args.auths, args.rate)
+    if args.save_stream:
+        write_stream(args.save_stream, stream)
+
+    blockchain, stats = replay(stream, args)
+    head = blockchain.get_latest_block()
+    latencies = stats['latencies']
+    wall = stats['processing_seconds'] or float('inf')
+    simulated = stats['simulated_seconds']
+
+    print(f"{stats['requests']} requests, {stats['transactions']} sealed and {stats['rejected']} rejected "
+          f"in {stats['blocks']} blocks over {simulated:.1f} simulated seconds")
+    print(f"commit latency (simulated): p50 {percentile(latencies, 0.50) * 1e3:.0f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1e3:.0f} ms, p99 {percentile(latencies, 0.99) * 1e3:.0f} ms")
+    print(f"processing: {stats['blocks'] / wall:,.0f} blocks/s, {stats['transactions'] / wall:,.0f} tx/s, "
+          f"{stats['processing_seconds'] / simulated if simulated else 0:.0%} of the simulated time")
+    print(f"memory growth: {stats['memory_growth'] / 2**20:.1f} MiB")
+    print(f"full validation: {stats['validation_seconds'] * 1e3:.0f} ms, {'valid' if stats['valid'] else 'INVALID'}")
+    print(f"head block {head.index} {head.hash.hex()}")
+    print(f"PoH hash {blockchain.poh.current_hash.hex()}")
+
+    if not stats['valid']:
+        sys.exit(1)
+    if args.expect and args.expect != head.hash.hex():
+        print(f"\nhead block hash differs from {args.expect}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+import httpx
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from client.uav_client import UAVClient
+
+DEFAULT_URL = "http://127.0.0.1:8080"
+DEFAULT_CLIENTS = 1000
+
+
+def percentile(values, fraction):
+    """Value below which the given fraction of the sorted values fall"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run_client(url, uav, delay, requests, timeout, latencies, failures, start):
+    """Register one UAV, then authenticate it repeatedly and read its status
+
+    Every UAV gets its own connection, like separate devices would. A single
+    shared httpx pool spends more time scanning its connections than the
+    server spends on a request once it holds hundreds of them.
+    """
+    async with httpx.AsyncClient(base_url=url, timeout=timeout) as http:
+        await start.wait()
+        await asyncio.sleep(delay)
+        for i in range(requests + 1):
+            await client_round(http, uav, i == 0, latencies, failures)
+
+
+async def client_round(http, uav, register, latencies, failures):
+    """One write (register or authenticate) followed by one status read"""
+    if register:
+        path = "/api/v1/uav/register"
+        body = {
+            "uav_id": uav.uav_id,
+            "public_key": uav.get_public_key_hex(),
+            "model": "Quadcopter X500",
+            "firmware_version": "1.0.0"
+        }
+    else:
+        nonce = uuid.uuid4().hex
+        timestamp = int(time.time())
+        path = "/api/v1/uav/authenticate"
+        body = {
+            "uav_id": uav.uav_id,
+            "nonce": nonce,
+            "timestamp": timestamp,
+            "signature": uav.sign_message(f"{uav.uav_id}{nonce}{timestamp}")
+        }
+
+    started = time.perf_counter()
+    try:
+        response = await http.post(path, json=body)
+        ok = response.json()["success"]
+    except (httpx.HTTPError, ValueError):
+        ok = False
+    latencies['write'].append(time.perf_counter() - started)
+    if not ok:
+        failures.append(path)
+
+    started = time.perf_counter()
+    try:
+        await http.get(f"/api/v1/uav/status/{uav.uav_id}")
+    except httpx.HTTPError:
+        failures.append("status")
+    latencies['read'].append(time.perf_counter() - started)
+
+
+async def run(url, clients, requests, timeout, ramp):
+    prefix = uuid.uuid4().hex[:8]
+    uavs = [UAVClient(url, f"bench-{prefix}-{i}") for i in range(clients)]
+    latencies = {'write': [], 'read': []}
+    failures = []
+    start = asyncio.Event()
+
+    # Spread the first connections over the ramp, a burst of 1000 SYNs overflows the accept queue
+    tasks = [
+        asyncio.create_task(run_client(url, uav, ramp * i / clients, requests, timeout, latencies, failures, start))
+        for i, uav in enumerate(uavs)
+    ]
+    started = time.perf_counter()
+    start.set()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    async with httpx.AsyncClient(base_url=url, timeout=timeout) as http:
+        stats = (await http.get("/api/v1/blockchain/stats")).json()["data"]
+
+    return latencies, failures, elapsed, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure server throughput with many concurrent UAV clients")
+    parser.add_argument("--url", default=DEFAULT_URL, help=f"Server URL (default: {DEFAULT_URL})")
+    parser.add_argument("--clients", type=int, default=DEFAULT_CLIENTS, help=f"Concurrent clients (default: {DEFAULT_CLIENTS})")
+    parser.add_argument("--requests", type=int, default=3, help="Authentications per client after registering (default: 3)")
+    parser.add_argument("--ramp", type=float, default=2.0, help="Seconds over which clients start (default: 2)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds (default: 60)")
+
+    args = parser.parse_args()
+
+    latencies, failures, elapsed, stats = asyncio.run(run(args.url, args.clients, args.requests, args.timeout, args.ramp))
+
+    writes = sorted(latencies['write'])
+    reads = sorted(latencies['read'])
+    print(f"{args.clients} clients, {len(writes)} writes and {len(reads)} status reads in {elapsed:.2f}s")
+    print(f"throughput: {(len(writes) + len(reads)) / elapsed:,.0f} req/s ({len(writes) / elapsed:,.0f} writes/s)")
+    for name, values in (("write", writes), ("read", reads)):
+        print(f"{name:6} latency ms: p50 {percentile(values, 0.5) * 1000:8.1f}  "
+              f"p99 {percentile(values, 0.99) * 1000:8.1f}  mean {statistics.fmean(values) * 1000:8.1f}")
+    print(f"failures: {len(failures)}")
+    print(f"chain: {stats['blocks']} blocks, {stats['registered_uavs']} UAVs, {stats.get('shards', 1)} shards")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,173 +1,930 @@
-import time
-import json
-import hashlib
-import sys
-import os
-
-# Add parent directory to path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from crypto.poh import ProofOfHistory
-
-class Block:
-    """Represents a block in the blockchain"""
-    
-    def __init__(self, index, prev_hash, poh_tick, transactions, timestamp=None):
-        self.index = index
-        self.prev_hash = prev_hash
-        self.poh_tick = poh_tick
-        self.transactions = transactions
-        self.timestamp = timestamp or int(time.time())
-        self.hash = self.calculate_hash()
-    
-    def calculate_hash(self):
-        """Calculate the hash of this block"""
-        block_data = {
-            'index': self.index,
-            'prev_hash': self.prev_hash,
-            'poh_tick': self.poh_tick,
-            'transactions': self.transactions,
-            'timestamp': self.timestamp
-        }
-        block_string = json.dumps(block_data, sort_keys=True)
-        return hashlib.sha256(block_string.encode()).hexdigest()
-    
-    def to_dict(self):
-        """Convert block to dictionary"""
-        return {
-            'index': self.index,
-            'hash': self.hash,
-            'prev_hash': self.prev_hash,
-            'poh_tick': self.poh_tick,
-            'transactions': self.transactions,
-            'timestamp': self.timestamp
-        }
-
-class Blockchain:
-    """UAV authentication blockchain with PoH consensus"""
-    
-    def __init__(self):
-        """Initialize the blockchain with a genesis block"""
-        self.chain = []
-        self.poh = ProofOfHistory()
-        self.pending_transactions = []
-        self.registered_uavs = {}  # uav_id -> public_key
-        self.used_nonces = {}  # nonce -> timestamp
-        
-        # Create genesis block
-        genesis_tick = self.poh.tick("Genesis Block")
-        genesis_block = Block(0, "0" * 64, genesis_tick, [], int(time.time()))
-        self.chain.append(genesis_block)
-    
-    def get_latest_block(self):
-        """Get the latest block in the chain"""
-        return self.chain[-1]
-    
-    def add_transaction(self, transaction):
-        """Add a transaction to pending transactions"""
-        # Transaction validation would go here
-        self.pending_transactions.append(transaction)
-        return len(self.pending_transactions)
-    
-    def register_uav(self, uav_id, public_key, model, firmware_version):
-        """Register a new UAV"""
-        if uav_id in self.registered_uavs:
-            return False, "UAV already registered"
-        
-        # Create registration transaction
-        transaction = {
-            'type': 'REGISTER',
-            'uav_id': uav_id,
-            'public_key': public_key,
-            'model': model,
-            'firmware_version': firmware_version,
-            'timestamp': int(time.time())
-        }
-        
-        self.add_transaction(transaction)
-        self.registered_uavs[uav_id] = {
-            'public_key': public_key,
-            'model': model,
-            'firmware_version': firmware_version,
-            'last_auth': None
-        }
-        
-        return True, "UAV registered successfully"
-    
-    def authenticate_uav(self, uav_id, nonce, timestamp, signature):
-        """Authenticate a UAV"""
-        # Check if UAV is registered
-        if uav_id not in self.registered_uavs:
-            return False, "UAV not registered"
-        
-        # Check for replay attacks
-        nonce_key = f"{uav_id}:{nonce}"
-        if nonce_key in self.used_nonces:
-            return False, "Nonce already used (potential replay attack)"
-        
-        # In a real implementation, we would verify the signature here
-        # using the UAV's public key
-        
-        # Create authentication transaction
-        transaction = {
-            'type': 'AUTHENTICATE',
-            'uav_id': uav_id,
-            'nonce': nonce,
-            'timestamp': timestamp,
-            'signature': signature
-        }
-        
-        self.add_transaction(transaction)
-        self.used_nonces[nonce_key] = timestamp
-        self.registered_uavs[uav_id]['last_auth'] = timestamp
-        
-        return True, "UAV authenticated successfully"
-    
-    def mine_block(self):
-        """Create a new block with pending transactions"""
-        if not self.pending_transactions:
-            return None
-            
-        latest_block = self.get_latest_block()
-        
-        # Create a PoH tick with the transaction data
-        poh_tick = self.poh.tick(self.pending_transactions)
-        
-        # Create a new block
-        new_block = Block(
-            index=latest_block.index + 1,
-            prev_hash=latest_block.hash,
-            poh_tick=poh_tick,
-            transactions=self.pending_transactions.copy(),
-            timestamp=int(time.time())
-        )
-        
-        # Reset pending transactions
-        self.pending_transactions = []
-        
-        # Add the block to the chain
-        self.chain.append(new_block)
-        
-        return new_block
-    
-    def is_chain_valid(self):
-        """Verify the integrity of the blockchain"""
-        for i in range(1, len(self.chain)):
-            current = self.chain[i]
-            previous = self.chain[i-1]
-            
-            # Check current block hash
-            if current.hash != current.calculate_hash():
-                return False
-                
-            # Check link to previous block
-            if current.prev_hash != previous.hash:
-                return False
-        
-        return True
-    
-    def get_uav_status(self, uav_id):
-        """Get the status of a registered UAV"""
-        if uav_id not in self.registered_uavs:
-            return None
-            
-        return self.registered_uavs[uav_id]
\ No newline at end of file
+import time
+import hashlib
+import struct
+import sys
+import os
+import threading
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from crypto.poh import ProofOfHistory, Tick
+from crypto import merkle
+from crypto.signatures import SignatureVerifier, auth_message, load_public_key, revoke_message, rotate_key_message
+from blockchain.nonces import NonceStore
+from blockchain.storage import BlockLog, SnapshotStore, BlobStore, ChainView, TickView, RECORD_HEADER
+from blockchain.history import HistoryIndex
+from blockchain.registry import UavRegistry
+from blockchain.checkpoints import Checkpoint, state_hash, verify_checkpoints
+from blockchain.validation import verify_block, verify_blocks, audit_chain
+from blockchain.transaction import Transaction
+from blockchain.encoding import U32, U64, pack_str, unpack_str
+
+# index, timestamp, prev_hash, PoH hash, Merkle root
+BLOCK_HASH_FIELDS = struct.Struct('>Qq32s32s32s')
+# index, timestamp, prev_hash, Merkle root, block hash
+BLOCK_RECORD_FIELDS = struct.Struct('>Qq32s32s32s')
+# Checkpoints kept, older ones are only needed until the blocks they cover are pruned
+MAX_CHECKPOINTS = 256
+
+class Block:
+    """Represents a block in the blockchain
+    
+    Hashes are kept as raw 32-byte digests and transactions as Transaction
+    objects. to_dict produces the hex/JSON form for the API and to_bytes
+    the compact binary form for storage and transfer.
+    """
+    
+    __slots__ = ('index', 'prev_hash', 'poh_tick', 'transactions', 'timestamp', 'tx_hashes',
+                 'merkle_root', 'hash')
+    
+    def __init__(self, index, prev_hash, poh_tick, transactions, timestamp=None, block_hash=None,
+                 tx_hashes=None, merkle_root=None):
+        self.index = index
+        self.prev_hash = prev_hash
+        self.poh_tick = poh_tick
+        self.transactions = transactions
+        self.timestamp = timestamp or int(time.time())
+        self.tx_hashes = tx_hashes
+        self.merkle_root = merkle_root or merkle.merkle_root(self.get_tx_hashes())
+        self.hash = block_hash or self.calculate_hash()
+    
+    def get_tx_hashes(self):
+        """Get the transaction hashes in block order, computed once"""
+        if self.tx_hashes is None:
+            self.tx_hashes = [tx.digest for tx in self.transactions]
+        return self.tx_hashes
+    
+    def calculate_hash(self):
+        """Calculate the hash of this block
+        
+        Only the fixed-size header is hashed, the transactions are covered
+        through the Merkle root.
+        """
+        header = BLOCK_HASH_FIELDS.pack(
+            self.index, self.timestamp, self.prev_hash, self.poh_tick.hash, self.merkle_root
+        )
+        return hashlib.sha256(header).digest()
+    
+    def calculate_merkle_root(self):
+        """Recompute the Merkle root from the transactions themselves"""
+        return merkle.merkle_root([merkle.hash_leaf(tx.encode()) for tx in self.transactions])
+    
+    def header(self):
+        """Header-only copy of the block, what is kept of it once pruned
+        
+        The transactions and the PoH tick data are dropped, the stored hash,
+        Merkle root and tick hashes still link the chain together.
+        """
+        if not self.transactions:
+            return self
+        tick = self.poh_tick
+        return Block(
+            index=self.index,
+            prev_hash=self.prev_hash,
+            poh_tick=Tick(tick.sequence, tick.prev_hash, tick.hash, None, tick.timestamp),
+            transactions=[],
+            timestamp=self.timestamp,
+            block_hash=self.hash,
+            merkle_root=self.merkle_root
+        )
+    
+    def get_proof(self, position):
+        """Get the Merkle inclusion proof for the transaction at position"""
+        return merkle.merkle_proof(self.get_tx_hashes(), position)
+    
+    def to_dict(self):
+        """Convert block to dictionary"""
+        return {
+            'index': self.index,
+            'hash': self.hash.hex(),
+            'prev_hash': self.prev_hash.hex(),
+            'poh_tick': self.poh_tick.to_dict(),
+            'merkle_root': self.merkle_root.hex(),
+            'transactions': [tx.to_dict() for tx in self.transactions],
+            'timestamp': self.timestamp
+        }
+    
+    def to_bytes(self):
+        """Serialize the block for the block log
+        
+        Every uav_id is written once in a table and transactions refer to it
+        by position.
+        """
+        uav_refs = {}
+        for tx in self.transactions:
+            if tx.uav_id not in uav_refs:
+                uav_refs[tx.uav_id] = len(uav_refs)
+        
+        parts = [
+            BLOCK_RECORD_FIELDS.pack(self.index, self.timestamp, self.prev_hash, self.merkle_root, self.hash),
+            self.poh_tick.encode(),
+            U32.pack(len(uav_refs))
+        ]
+        parts.extend(pack_str(uav_id) for uav_id in uav_refs)
+        parts.append(U32.pack(len(self.transactions)))
+        parts.extend(tx.encode_interned(uav_refs[tx.uav_id]) for tx in self.transactions)
+        return b''.join(parts)
+    
+    @classmethod
+    def from_bytes(cls, payload):
+        """Deserialize a block written with to_bytes, keeping the stored hash"""
+        index, timestamp, prev_hash, merkle_root, block_hash = BLOCK_RECORD_FIELDS.unpack_from(payload, 0)
+        poh_tick, offset = Tick.decode(payload, BLOCK_RECORD_FIELDS.size)
+        
+        (uav_count,) = U32.unpack_from(payload, offset)
+        offset += U32.size
+        uav_ids = []
+        for _ in range(uav_count):
+            uav_id, offset = unpack_str(payload, offset)
+            uav_ids.append(uav_id)
+        
+        (tx_count,) = U32.unpack_from(payload, offset)
+        offset += U32.size
+        transactions = []
+        for _ in range(tx_count):
+            tx, offset = Transaction.decode_interned(payload, offset, uav_ids)
+            transactions.append(tx)
+        
+        return cls(
+            index=index,
+            prev_hash=prev_hash,
+            poh_tick=poh_tick,
+            transactions=transactions,
+            timestamp=timestamp,
+            block_hash=block_hash,
+            merkle_root=merkle_root
+        )
+
+class Blockchain:
+    """UAV authentication blockchain with PoH consensus"""
+    
+    def __init__(self, nonce_window=300, verifier=None, storage_dir=None, snapshot_every=100, sync_every=32,
+                 block_cache_size=256, poh_clock=None, genesis=None, retain_blocks=0, archive_dir=None,
+                 challenges=None, clock=time.time):
+        """Initialize the blockchain with a genesis block
+        
+        nonce_window is the accepted clock skew in seconds for authentication
+        timestamps, nonces are only remembered for that long. verifier is the
+        SignatureVerifier used for authentication signatures.
+        
+        With a storage_dir every block is appended to a block log and the
+        derived state is snapshotted every snapshot_every blocks. On startup
+        the snapshot is loaded and only the blocks after it are replayed.
+        The chain is then a memory-mapped view of the log that keeps only
+        block_cache_size decoded blocks in memory.
+        
+        poh_clock is an optional running PoHClock. Transaction hashes are
+        mixed into it as they arrive and every block's PoH tick records the
+        clock position at which it was sealed.
+        
+        genesis is a genesis Block to start from instead of a new one, so a
+        follower node shares the chain of its leader. A stored chain must
+        start with it.
+        
+        Every snapshot_every blocks a checkpoint commits to the block, its PoH
+        hash and the ledger state. With retain_blocks set, blocks older than
+        the latest retain_blocks and covered by a checkpoint are pruned down
+        to their headers, their bodies are appended to archive_dir if given
+        and dropped otherwise. Validation then starts from the pruned height.
+        
+        challenges is an optional ChallengeIssuer. Authentications then have
+        to sign a nonce it issued for the UAV and that has not expired yet.
+        
+        clock returns the unix time that blocks, ticks and transactions are
+        stamped with and that authentication timestamps are checked against.
+        A simulated clock makes a replay of the same transactions produce the
+        same chain.
+        """
+        started = time.perf_counter()
+        
+        self.clock = clock
+        self.chain = []
+        self.poh = ProofOfHistory(clock=clock)
+        self.pending_transactions = []
+        self.pending_tx_hashes = []  # hash of every pending transaction, computed once
+        self.pending_undo = []  # registry entry each pending transaction replaced, None for a new UAV
+        self.registry = UavRegistry()
+        self.used_nonces = NonceStore(nonce_window, clock=clock)  # "uav_id:nonce" within the skew window
+        self.verifier = verifier or SignatureVerifier()
+        self.poh_clock = poh_clock
+        self.challenges = challenges
+        # Called with every block appended to the chain, on the thread that appended it
+        self.block_listeners = []
+        # Held while blocks are added or pruned, readers of the chain and history on other threads take it too
+        self.lock = threading.RLock()
+        
+        self.block_log = None
+        self.snapshots = None
+        self.watermark = None
+        self.verified_height = 0  # blocks below this height passed validation
+        self.snapshot_every = snapshot_every
+        self.snapshot_height = 0
+        self.replayed_blocks = 0
+        
+        self.checkpoints = []
+        self.checkpoint_store = None
+        self.retain_blocks = retain_blocks
+        self.archive_dir = archive_dir
+        self.pruned_height = 0  # blocks below this height are headers only
+        
+        # tx_id -> (block index, position), built lazily for chains loaded from storage
+        self.tx_locations = {}
+        self.tx_indexed_height = 0
+        # uav_id -> transactions and time -> height, saved next to every snapshot
+        self.history = HistoryIndex()
+        self.history_store = None
+        
+        if storage_dir:
+            os.makedirs(storage_dir, exist_ok=True)
+            self.block_log = BlockLog(os.path.join(storage_dir, 'blocks.log'), sync_every)
+            self.snapshots = SnapshotStore(os.path.join(storage_dir, 'snapshot.json'))
+            self.watermark = SnapshotStore(os.path.join(storage_dir, 'verified.json'))
+            self.history_store = BlobStore(os.path.join(storage_dir, 'history.idx'))
+            self.checkpoint_store = SnapshotStore(os.path.join(storage_dir, 'checkpoints.json'))
+            headers = BlockLog(os.path.join(storage_dir, 'headers.log'), sync_every)
+            
+            # Blocks and their PoH ticks are read back from the log on demand
+            self.chain = ChainView(self.block_log, Block.to_bytes, Block.from_bytes, block_cache_size, headers)
+            self.poh = ProofOfHistory(ticks=TickView(self.chain), clock=self.clock)
+            self.pruned_height = self.chain.base
+            self.tx_indexed_height = self.pruned_height
+            self.poh.trusted_index = max(self.pruned_height - 1, 0)
+        
+        if self.block_log is not None and len(self.block_log):
+            self.load()
+            if genesis is not None and self.chain[0].hash != genesis.hash:
+                raise ValueError("Stored chain does not start with the given genesis block")
+        elif genesis is not None:
+            self.poh.append(genesis.poh_tick)
+            self.append_block(genesis)
+        else:
+            # Create genesis block
+            genesis_tick = self.poh.tick("Genesis Block")
+            genesis_block = Block(0, bytes(32), genesis_tick, [], int(self.clock()))
+            self.append_block(genesis_block)
+        
+        # Time from construction until the chain is ready to serve
+        self.startup_seconds = time.perf_counter() - started
+    
+    def get_latest_block(self):
+        """Get the latest block in the chain"""
+        return self.chain[-1]
+    
+    def append_block(self, block):
+        """Add a sealed block to the chain and the block log"""
+        self.chain.append(block)
+        self._block_appended(block)
+    
+    def _block_appended(self, block):
+        """Index, publish and checkpoint a block that was just added to the chain"""
+        # Keep the transaction index current unless it is still waiting to be built
+        if self.tx_indexed_height == block.index:
+            self._index_block(block)
+        if self.history.height == block.index:
+            self.history.add_block(block)
+        for listener in self.block_listeners:
+            listener(block)
+        
+        # In memory checkpoints are only needed as the starting point of pruning
+        if self.block_log is None and not self.retain_blocks:
+            return
+        
+        # Pending transactions are left out of the checkpointed state, so they never hold it back
+        if block.index - self.snapshot_height >= self.snapshot_every:
+            self.checkpoint()
+    
+    def apply_block(self, block):
+        """Verify a block sealed by another node and add it to the chain
+        
+        The block must follow the latest block, its hash, Merkle root, link
+        and PoH tick are checked before its transactions are applied.
+        Returns False if it does not verify.
+        """
+        if self.pending_transactions or not verify_block(block, self.get_latest_block()):
+            return False
+        
+        for transaction in block.transactions:
+            self.apply_transaction(transaction)
+        self.poh.append(block.poh_tick)
+        self.append_block(block)
+        return True
+    
+    def get_block_records(self, start, count):
+        """Encoded blocks from start on as length-prefixed records, the replication wire format
+        
+        Pruned blocks would only be headers, which do not verify on a
+        follower, so None is returned if start is below the pruned height.
+        The check and the read happen under the chain lock, so pruning
+        cannot overtake the read halfway.
+        """
+        start = max(start, 0)
+        with self.lock:
+            end = min(start + count, len(self.chain))
+            if start < self.pruned_height:
+                if start:
+                    return None
+                # Only the genesis block is left whole below the pruned height
+                end = min(end, 1)
+            parts = []
+            for index in range(start, end):
+                if self.block_log is not None:
+                    # Stored blocks are sent as they are in the log, without decoding them
+                    payload = self.chain.read_raw(index)
+                else:
+                    payload = self.chain[index].to_bytes()
+                parts.append(RECORD_HEADER.pack(len(payload)))
+                parts.append(payload)
+        return b''.join(parts)
+    
+    def checkpoint(self):
+        """Commit to the latest block, its PoH hash and the ledger state
+        
+        Stored chains save the checkpoint with a snapshot of the same state.
+        With retain_blocks set the chain is then pruned up to the checkpoint.
+        """
+        latest_block = self.get_latest_block()
+        registered_uavs, used_nonces = self.sealed_state()
+        checkpoint = Checkpoint(
+            latest_block.index,
+            latest_block.hash,
+            latest_block.poh_tick.hash,
+            state_hash(registered_uavs, used_nonces),
+            self.checkpoints[-1].hash if self.checkpoints else bytes(32)
+        )
+        self.checkpoints.append(checkpoint)
+        del self.checkpoints[:-MAX_CHECKPOINTS]
+        
+        if self.block_log is not None:
+            self.checkpoint_store.save([cp.to_dict() for cp in self.checkpoints])
+            self.save_snapshot(checkpoint, registered_uavs, used_nonces)
+        else:
+            self.snapshot_height = latest_block.index
+        
+        if self.retain_blocks:
+            self.prune()
+        return checkpoint
+    
+    def sealed_state(self):
+        """Registry and live nonces in snapshot form, as of the latest block
+        
+        Pending transactions are already applied to the registry, their
+        effects are undone on the copy, newest first.
+        """
+        registered_uavs = self.registry.to_dict()
+        used_nonces = self.used_nonces.to_dict()
+        for transaction, previous in zip(reversed(self.pending_transactions), reversed(self.pending_undo)):
+            uav_id = transaction.uav_id
+            if transaction.type == 'SESSION':
+                continue
+            if previous is None:
+                registered_uavs.pop(uav_id, None)
+            else:
+                registered_uavs[uav_id] = previous
+            if transaction.type == 'AUTHENTICATE':
+                used_nonces.pop(f"{uav_id}:{transaction.nonce}", None)
+            elif transaction.type == 'ROTATE_KEY':
+                used_nonces.pop(f"{uav_id}:rotate:{transaction.timestamp}", None)
+        return registered_uavs, used_nonces
+    
+    def save_snapshot(self, checkpoint, registered_uavs, used_nonces):
+        """Write the derived state at the checkpoint height to the snapshot store"""
+        latest_block = self.get_latest_block()
+        
+        # Never let the snapshot get ahead of what is durable in the log
+        self.block_log.sync()
+        self.snapshots.save({
+            'height': latest_block.index,
+            'hash': latest_block.hash.hex(),
+            'registered_uavs': registered_uavs,
+            'used_nonces': used_nonces,
+            'checkpoint': checkpoint.to_dict()
+        })
+        if self.history.height == len(self.chain):
+            self.history_store.save(self.history.to_bytes(latest_block.hash))
+        self.snapshot_height = latest_block.index
+    
+    def prune(self):
+        """Cut the blocks behind the retention horizon down to their headers
+        
+        Only verified blocks up to the latest checkpoint are pruned. Stored
+        chains rewrite the block log to drop the bodies, so that only happens
+        once at least retain_blocks blocks can go, keeping the cost per block
+        constant.
+        
+        Pruning moves the history index and the chain under their readers,
+        so it runs under self.lock, the lock those readers take. The lock
+        is reentrant, so mining under it may prune as well.
+        """
+        with self.lock:
+            return self._prune()
+    
+    def _prune(self):
+        """Body of prune, runs under self.lock"""
+        end = min(self.checkpoints[-1].height + 1, len(self.chain) - self.retain_blocks)
+        if end - self.pruned_height < self.retain_blocks or not self.is_chain_valid():
+            return 0
+        start = self.pruned_height
+        
+        # Pruned transactions can no longer be proven
+        for index in range(start, min(end, self.tx_indexed_height)):
+            for tx_id in self.chain[index].get_tx_hashes():
+                self.tx_locations.pop(tx_id, None)
+        self.tx_indexed_height = max(self.tx_indexed_height, end)
+        
+        if self.block_log is not None:
+            archive = None
+            if self.archive_dir:
+                os.makedirs(self.archive_dir, exist_ok=True)
+                archive = open(os.path.join(self.archive_dir, f'blocks-{start}-{end - 1}.log'), 'ab')
+            try:
+                self.chain.prune(end, lambda block: block.header().to_bytes(), archive)
+            finally:
+                if archive is not None:
+                    archive.close()
+        else:
+            for index in range(start, end):
+                self.chain[index] = self.chain[index].header()
+                self.poh.ticks[index] = self.chain[index].poh_tick
+        
+        self.history.prune(end)
+        self.pruned_height = end
+        self.poh.trusted_index = end - 1
+        return end - start
+    
+    def snapshot_matches(self, snapshot):
+        """Check that a snapshot was taken on this chain and matches its checkpoint"""
+        height = snapshot['height']
+        if height >= len(self.chain) or height + 1 < self.pruned_height:
+            return False
+        block = self.chain[height]
+        if block.hash.hex() != snapshot['hash']:
+            return False
+        
+        if 'checkpoint' not in snapshot:
+            # Written before checkpoints existed
+            return not self.pruned_height
+        checkpoint = Checkpoint.from_dict(snapshot['checkpoint'])
+        return (checkpoint.hash == checkpoint.calculate_hash() and checkpoint.matches(block)
+                and checkpoint.state_hash == state_hash(snapshot['registered_uavs'], snapshot['used_nonces']))
+    
+    def load(self):
+        """Rebuild the derived state from the snapshot and the block log"""
+        self.load_checkpoints()
+        
+        # Start from the snapshot if it matches the log, otherwise from genesis
+        start = 1
+        snapshot = self.snapshots.load()
+        if snapshot and self.snapshot_matches(snapshot):
+            self.registry = UavRegistry.from_dict(snapshot['registered_uavs'])
+            self.used_nonces.restore(snapshot['used_nonces'])
+            self.snapshot_height = snapshot['height']
+            start = snapshot['height'] + 1
+        elif self.pruned_height:
+            raise ValueError("Pruned chain has no usable snapshot, the state cannot be replayed from genesis")
+        
+        # Only the tail after the snapshot has to be replayed
+        for index in range(start, len(self.chain)):
+            for transaction in self.chain[index].transactions:
+                self.apply_transaction(transaction)
+        self.replayed_blocks = len(self.chain) - start
+        
+        self.poh.restore(self.poh.ticks)
+        self.load_history()
+        
+        # Resume validation where the last run left off if the chain still matches
+        watermark = self.watermark.load()
+        if watermark and 0 < watermark['height'] <= len(self.chain):
+            if self.chain[watermark['height'] - 1].hash.hex() == watermark['hash']:
+                self.verified_height = watermark['height']
+    
+    def load_checkpoints(self):
+        """Load the saved checkpoints up to the first one that is broken or not on the chain"""
+        self.checkpoints = [Checkpoint.from_dict(data) for data in self.checkpoint_store.load() or []]
+        position = verify_checkpoints(self.checkpoints)
+        if position is not None:
+            del self.checkpoints[position:]
+        # Checkpoints past the end of the log were taken on blocks lost in a crash
+        while self.checkpoints and not (self.checkpoints[-1].height < len(self.chain)
+                                        and self.checkpoints[-1].matches(self.chain[self.checkpoints[-1].height])):
+            self.checkpoints.pop()
+    
+    def load_history(self):
+        """Load the saved history index if it matches the log and index the blocks after it"""
+        payload = self.history_store.load()
+        if payload:
+            try:
+                history, block_hash = HistoryIndex.from_bytes(payload)
+            except ValueError:
+                # Written in an older format, rebuilt below
+                history, block_hash = HistoryIndex(), None
+            if 0 < history.height <= len(self.chain) and self.chain[history.height - 1].hash == block_hash:
+                self.history = history
+        
+        for index in range(self.history.height, len(self.chain)):
+            self.history.add_block(self.chain[index])
+    
+    def close(self):
+        """Flush the block log and release the memory map"""
+        if self.block_log is not None:
+            self.chain.close()
+            self.block_log.close()
+            self.chain.headers.close()
+    
+    def find_transaction(self, tx_id):
+        """Find the (block index, position) of a sealed transaction by its raw hash"""
+        location = self.tx_locations.get(tx_id)
+        if location is None and self.tx_indexed_height < len(self.chain):
+            # Chains loaded from storage are indexed on the first lookup
+            while self.tx_indexed_height < len(self.chain):
+                self._index_block(self.chain[self.tx_indexed_height])
+            location = self.tx_locations.get(tx_id)
+        return location
+    
+    def get_transaction_proof(self, tx_id):
+        """Get a Merkle inclusion proof for a sealed transaction given its hex id"""
+        try:
+            location = self.find_transaction(bytes.fromhex(tx_id))
+        except ValueError:
+            return None
+        if location is None:
+            return None
+        
+        block_index, position = location
+        block = self.chain[block_index]
+        transaction = block.transactions[position]
+        return {
+            'tx_id': tx_id,
+            'block_number': block.index,
+            'block_hash': block.hash.hex(),
+            'merkle_root': block.merkle_root.hex(),
+            'position': position,
+            'proof': [
+                {'hash': step['hash'].hex(), 'position': step['position']}
+                for step in block.get_proof(position)
+            ],
+            'transaction': transaction.to_dict(),
+            'encoded': transaction.encode().hex()
+        }
+    
+    def get_uav_history(self, uav_id, since=None, cursor=0, limit=100):
+        """Get a page of the sealed transactions of a UAV in chain order
+        
+        since is a unix time, only blocks sealed at or after it are included.
+        cursor is the next_cursor of the previous page. Returns None for an
+        unknown UAV.
+        """
+        if uav_id not in self.history.uav_entries:
+            return None
+        
+        page, next_cursor = self.history.uav_history(uav_id, since, cursor, limit)
+        transactions = []
+        for block_index, position in page:
+            block = self.chain[block_index]
+            transactions.append({
+                'tx_id': block.get_tx_hashes()[position].hex(),
+                'block_number': block_index,
+                'position': position,
+                'block_time': block.timestamp,
+                **block.transactions[position].to_dict()
+            })
+        return {'uav_id': uav_id, 'transactions': transactions, 'next_cursor': next_cursor}
+    
+    def get_blocks(self, start_time=None, end_time=None, cursor=None, limit=100):
+        """Get a page of block headers sealed in [start_time, end_time)
+        
+        Times are unix times and either end may be left open. cursor is the
+        next_cursor of the previous page, a block height.
+        """
+        first = self.history.height_at(start_time) if start_time is not None else 0
+        end = self.history.height_at(end_time) if end_time is not None else self.history.height
+        if cursor is not None:
+            first = max(first, cursor)
+        stop = min(first + limit, end)
+        
+        blocks = []
+        for index in range(first, stop):
+            block = self.chain[index]
+            blocks.append({
+                'index': block.index,
+                'hash': block.hash.hex(),
+                'prev_hash': block.prev_hash.hex(),
+                'merkle_root': block.merkle_root.hex(),
+                'poh_hash': block.poh_tick.hash.hex(),
+                'timestamp': block.timestamp,
+                'transactions': len(block.transactions),
+                'pruned': index < self.pruned_height
+            })
+        return {'blocks': blocks, 'next_cursor': stop if stop < end else None}
+    
+    def get_checkpoints(self, limit=100):
+        """Get the latest checkpoints, newest first, and the pruned height"""
+        return {
+            'pruned_height': self.pruned_height,
+            'retain_blocks': self.retain_blocks,
+            'checkpoints': [cp.to_dict() for cp in reversed(self.checkpoints[-limit:])]
+        }
+    
+    def _index_block(self, block):
+        """Add the transactions of a block to the transaction index"""
+        for position, tx_id in enumerate(block.get_tx_hashes()):
+            self.tx_locations[tx_id] = (block.index, position)
+        self.tx_indexed_height = block.index + 1
+    
+    def apply_transaction(self, transaction):
+        """Apply a transaction to the registry and nonce state"""
+        uav_id = transaction.uav_id
+        
+        if transaction.type == 'REGISTER':
+            self.registry.register(uav_id, transaction.public_key, transaction.model, transaction.firmware_version)
+        elif transaction.type == 'AUTHENTICATE':
+            # Nonces with stale timestamps can no longer be replayed
+            if self.used_nonces.is_fresh(transaction.timestamp):
+                self.used_nonces.add(f"{uav_id}:{transaction.nonce}", transaction.timestamp)
+            self.registry.set_last_auth(uav_id, transaction.timestamp)
+        elif transaction.type == 'REVOKE':
+            self.registry.revoke(uav_id)
+            self.verifier.invalidate(uav_id)
+        elif transaction.type == 'ROTATE_KEY':
+            # The same rotation cannot be replayed while its timestamp is fresh
+            if self.used_nonces.is_fresh(transaction.timestamp):
+                self.used_nonces.add(f"{uav_id}:rotate:{transaction.timestamp}", transaction.timestamp)
+            self.registry.rotate_key(uav_id, transaction.public_key)
+            self.verifier.invalidate(uav_id)
+    
+    def add_transaction(self, transaction):
+        """Add a transaction to pending transactions
+        
+        The transaction is encoded before the mempool changes, so one that
+        cannot be encoded raises without leaving a trace.
+        """
+        digest = transaction.digest
+        self.pending_transactions.append(transaction)
+        self.pending_tx_hashes.append(digest)
+        # Applied right after this, what it replaces is kept for sealed_state
+        self.pending_undo.append(None if transaction.type == 'SESSION' else self.registry.get(transaction.uav_id))
+        
+        # Order the transaction on the continuous PoH clock
+        if self.poh_clock is not None:
+            self.poh_clock.mix(digest)
+        return len(self.pending_transactions)
+    
+    def drop_pending(self, start):
+        """Drop the pending transactions from position start on, e.g. after an operation failed halfway"""
+        del self.pending_transactions[start:]
+        del self.pending_tx_hashes[start:]
+        del self.pending_undo[start:]
+    
+    def register_uav(self, uav_id, public_key, model, firmware_version):
+        """Register a new UAV"""
+        if uav_id in self.registry:
+            return False, "UAV already registered"
+        
+        # Parse the key once up front, it is cached for authentication
+        self.verifier.invalidate(uav_id)
+        try:
+            self.verifier.load_key(uav_id, public_key)
+        except (ValueError, TypeError):
+            return False, "Invalid public key"
+        
+        # Create registration transaction
+        try:
+            transaction = Transaction.register(
+                uav_id, bytes.fromhex(public_key), model, firmware_version, int(self.clock())
+            )
+        except ValueError as e:
+            self.verifier.invalidate(uav_id)
+            return False, str(e)
+        
+        self.add_transaction(transaction)
+        self.apply_transaction(transaction)
+        
+        return True, "UAV registered successfully"
+    
+    def check_authentication(self, uav_id, nonce, timestamp):
+        """Run the cheap authentication checks that come before signature verification"""
+        # Reject stale or future timestamps before any lookups
+        if not self.used_nonces.is_fresh(timestamp):
+            return False, "Timestamp outside allowed window (potential replay attack)"
+        
+        # Check if UAV is registered
+        if uav_id not in self.registry:
+            return False, "UAV not registered"
+        if self.registry.is_revoked(uav_id):
+            return False, "UAV revoked"
+        
+        # A server-issued challenge proves itself, no lookup needed
+        if self.challenges is not None and not self.challenges.check(uav_id, nonce):
+            return False, "Invalid or expired challenge"
+        
+        # Check for replay attacks
+        if f"{uav_id}:{nonce}" in self.used_nonces:
+            return False, "Nonce already used (potential replay attack)"
+        
+        return True, None
+    
+    def authenticate_uav(self, uav_id, nonce, timestamp, signature, verified=False):
+        """Authenticate a UAV
+        
+        Pass verified=True when the signature was already checked, e.g. in a
+        batch by the block producer.
+        """
+        success, message = self.check_authentication(uav_id, nonce, timestamp)
+        if not success:
+            return False, message
+        
+        # Verify the Ed25519 signature over uav_id + nonce + timestamp
+        if not verified:
+            public_key = self.registry.public_key_hex(uav_id)
+            if not self.verifier.verify(uav_id, public_key, auth_message(uav_id, nonce, timestamp), signature):
+                return False, "Invalid signature"
+        
+        # Create authentication transaction
+        try:
+            transaction = Transaction.authenticate(uav_id, nonce, timestamp, bytes.fromhex(signature))
+        except ValueError as e:
+            return False, str(e)
+        
+        self.add_transaction(transaction)
+        self.apply_transaction(transaction)
+        
+        return True, "UAV authenticated successfully"
+    
+    def authenticate_batch(self, authentications):
+        """Authenticate several UAVs, verifying their signatures as one batch
+        
+        Items are (uav_id, nonce, timestamp, signature) tuples, returns one
+        (success, message) per item in the same order.
+        """
+        results = [
+            self.check_authentication(uav_id, nonce, timestamp)
+            for uav_id, nonce, timestamp, _ in authentications
+        ]
+        passed = [i for i, (success, _) in enumerate(results) if success]
+        
+        valid = self.verifier.verify_batch([
+            (uav_id, self.registry.public_key_hex(uav_id), auth_message(uav_id, nonce, timestamp), signature)
+            for uav_id, nonce, timestamp, signature in (authentications[i] for i in passed)
+        ])
+        
+        for i, signature_ok in zip(passed, valid):
+            if signature_ok:
+                # Replay checks run again, the same nonce may be in the batch twice
+                results[i] = self.authenticate_uav(*authentications[i], verified=True)
+            else:
+                results[i] = (False, "Invalid signature")
+        return results
+    
+    def record_session(self, uav_id, session_id, issued_at, last_seen, checks):
+        """Commit the summary of an ended session token, session_id is raw bytes
+        
+        Token checks are stateless and never touch the ledger, this is the one
+        transaction a session leaves behind. It does not change the registry.
+        """
+        if uav_id not in self.registry:
+            return False, "UAV not registered"
+        
+        self.add_transaction(Transaction.session(uav_id, session_id, issued_at, last_seen, checks))
+        return True, "Session recorded"
+    
+    def check_key_change(self, uav_id, timestamp, message, signature):
+        """Checks shared by revocation and key rotation, the change is signed with the current key"""
+        if not self.used_nonces.is_fresh(timestamp):
+            return False, "Timestamp outside allowed window (potential replay attack)"
+        if uav_id not in self.registry:
+            return False, "UAV not registered"
+        if self.registry.is_revoked(uav_id):
+            return False, "UAV revoked"
+        if not self.verifier.verify(uav_id, self.registry.public_key_hex(uav_id), message, signature):
+            return False, "Invalid signature"
+        return True, None
+    
+    def revoke_uav(self, uav_id, timestamp, signature):
+        """Revoke a UAV, signed with its own key, it can no longer authenticate or change keys"""
+        success, message = self.check_key_change(uav_id, timestamp, revoke_message(uav_id, timestamp), signature)
+        if not success:
+            return False, message
+        
+        transaction = Transaction.revoke(uav_id, timestamp, bytes.fromhex(signature))
+        self.add_transaction(transaction)
+        self.apply_transaction(transaction)
+        return True, "UAV revoked"
+    
+    def rotate_key(self, uav_id, public_key, timestamp, signature):
+        """Replace a UAV's key, signed with the key being replaced"""
+        if f"{uav_id}:rotate:{timestamp}" in self.used_nonces:
+            return False, "Key rotation already applied (potential replay attack)"
+        try:
+            load_public_key(public_key)
+        except (ValueError, TypeError):
+            return False, "Invalid public key"
+        
+        success, message = self.check_key_change(
+            uav_id, timestamp, rotate_key_message(uav_id, public_key, timestamp), signature
+        )
+        if not success:
+            return False, message
+        
+        transaction = Transaction.rotate_key(uav_id, bytes.fromhex(public_key), timestamp, bytes.fromhex(signature))
+        self.add_transaction(transaction)
+        self.apply_transaction(transaction)
+        return True, "Key rotated"
+    
+    def mine_block(self, max_transactions=None):
+        """Create a new block with pending transactions
+        
+        If max_transactions is given, only that many of the oldest pending
+        transactions are sealed and the rest stay pending for the next block.
+        
+        The block is written to the chain and block log before the PoH
+        sequence advances or the mempool changes, so a block that cannot be
+        encoded or stored leaves both as they were. Only the PoH clock, if
+        any, has already had the Merkle root mixed in by then.
+        """
+        if not self.pending_transactions:
+            return None
+            
+        latest_block = self.get_latest_block()
+        
+        if max_transactions is None:
+            max_transactions = len(self.pending_transactions)
+        transactions = self.pending_transactions[:max_transactions]
+        tx_hashes = self.pending_tx_hashes[:max_transactions]
+        
+        # Create a PoH tick that commits to the Merkle root of the transactions
+        root = merkle.merkle_root(tx_hashes)
+        if self.poh_clock is not None:
+            # Also commit to where on the clock the block was sealed
+            clock_count, clock_hash = self.poh_clock.mix(root)
+            poh_tick = self.poh.next_tick(root + U64.pack(clock_count) + clock_hash)
+        else:
+            poh_tick = self.poh.next_tick(root)
+        
+        # Create a new block
+        new_block = Block(
+            index=latest_block.index + 1,
+            prev_hash=latest_block.hash,
+            poh_tick=poh_tick,
+            transactions=transactions,
+            timestamp=int(self.clock()),
+            tx_hashes=tx_hashes,
+            merkle_root=root
+        )
+        
+        # Store the block first, the log rolls back a write that fails
+        self.chain.append(new_block)
+        self.poh.append(poh_tick)
+        
+        # Keep whatever did not fit in this block
+        self.pending_transactions = self.pending_transactions[max_transactions:]
+        self.pending_tx_hashes = self.pending_tx_hashes[max_transactions:]
+        self.pending_undo = self.pending_undo[max_transactions:]
+        
+        self._block_appended(new_block)
+        
+        return new_block
+    
+    def is_chain_valid(self, full=False, workers=None):
+        """Verify the integrity of the blockchain
+        
+        Block hashes, Merkle roots, links and PoH ticks are checked. Routine
+        checks only cover the blocks added since the last successful check.
+        With full=True the whole chain is audited again, split into segments
+        across a pool of worker processes. Pruned blocks are trusted through
+        the checkpoints, a full audit checks those against the headers and
+        verifies the blocks from the pruned height on.
+        """
+        if full:
+            bad_index = self.find_bad_checkpoint()
+            if bad_index is None:
+                bad_index = audit_chain(self.chain, self.block_log, workers, first=self.pruned_height)
+        else:
+            start = max(self.verified_height, self.pruned_height)
+            previous = self.chain[start - 1] if start else None
+            bad_index = verify_blocks((self.chain[i] for i in range(start, len(self.chain))), previous)
+        
+        if bad_index is not None:
+            self.verified_height = min(self.verified_height, bad_index)
+            return False
+        
+        self.set_verified_height(len(self.chain))
+        return True
+    
+    def find_bad_checkpoint(self):
+        """Height of the first checkpoint that breaks the checkpoint chain or misses its block, or None"""
+        position = verify_checkpoints(self.checkpoints)
+        for checkpoint in self.checkpoints[:position]:
+            if checkpoint.height >= len(self.chain) or not checkpoint.matches(self.chain[checkpoint.height]):
+                return checkpoint.height
+        return self.checkpoints[position].height if position is not None else None
+    
+    def set_verified_height(self, height):
+        """Move the validation watermark and persist it with the chain"""
+        if height == self.verified_height:
+            return
+        self.verified_height = height
+        if self.watermark is not None:
+            self.watermark.save({'height': height, 'hash': self.chain[height - 1].hash.hex()})
+    
+    def get_uav_status(self, uav_id):
+        """Get the registry entry of a UAV, or None if it is not registered"""
+        return self.registry.get(uav_id)
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import struct
+
+# height, block hash, PoH hash, state hash, previous checkpoint hash
+CHECKPOINT_FIELDS = struct.Struct('>Q32s32s32s32s')
+
+
+def state_hash(registered_uavs, used_nonces):
+    """Commit to the ledger state, the registry and the live nonces in their snapshot form"""
+    state = json.dumps(
+        {'registered_uavs': registered_uavs, 'used_nonces': used_nonces},
+        sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.sha256(state.encode('utf-8')).digest()
+
+
+class Checkpoint:
+    """Hash commitment to the chain and ledger state at a block height
+
+    Every checkpoint also commits to the one before it, so the checkpoints
+    form a hash chain of their own that outlives pruned block bodies.
+    """
+
+    __slots__ = ('height', 'block_hash', 'poh_hash', 'state_hash', 'prev_hash', 'hash')
+
+    def __init__(self, height, block_hash, poh_hash, state_hash, prev_hash=bytes(32), checkpoint_hash=None):
+        self.height = height
+        self.block_hash = block_hash
+        self.poh_hash = poh_hash
+        self.state_hash = state_hash
+        self.prev_hash = prev_hash
+        self.hash = checkpoint_hash or self.calculate_hash()
+
+    def calculate_hash(self):
+        """Hash the fixed-size checkpoint fields"""
+        return hashlib.sha256(CHECKPOINT_FIELDS.pack(
+            self.height, self.block_hash, self.poh_hash, self.state_hash, self.prev_hash
+        )).digest()
+
+    def matches(self, block):
+        """Check that a block is the one this checkpoint was taken at"""
+        return (block.index == self.height and block.hash == self.block_hash
+                and block.poh_tick.hash == self.poh_hash)
+
+    def to_dict(self):
+        """Convert the checkpoint to its hex/JSON form"""
+        return {
+            'height': self.height,
+            'block_hash': self.block_hash.hex(),
+            'poh_hash': self.poh_hash.hex(),
+            'state_hash': self.state_hash.hex(),
+            'prev_hash': self.prev_hash.hex(),
+            'hash': self.hash.hex()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a checkpoint from to_dict output, keeping the stored hash"""
+        return cls(
+            data['height'],
+            bytes.fromhex(data['block_hash']),
+            bytes.fromhex(data['poh_hash']),
+            bytes.fromhex(data['state_hash']),
+            bytes.fromhex(data['prev_hash']),
+            bytes.fromhex(data['hash'])
+        )
+
+
+def verify_checkpoints(checkpoints):
+    """Check the hashes and links of consecutive checkpoints, returns the first bad position or None"""
+    previous = None
+    for position, checkpoint in enumerate(checkpoints):
+        if checkpoint.hash != checkpoint.calculate_hash():
+            return position
+        if previous is not None and (checkpoint.prev_hash != previous.hash or checkpoint.height <= previous.height):
+            return position
+        previous = checkpoint
+    return None
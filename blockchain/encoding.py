@@ -0,0 +1,47 @@
+import struct
+
+# Fixed-width fields, all integers are big-endian
+U8 = struct.Struct('>B')
+U16 = struct.Struct('>H')
+U32 = struct.Struct('>I')
+U64 = struct.Struct('>Q')
+I64 = struct.Struct('>q')
+
+# Longest string or byte field that fits behind a 2 byte length
+MAX_FIELD_BYTES = 0xFFFF
+
+
+def check_str(name, value):
+    """Raise ValueError if a string is too long for pack_str"""
+    # Only long strings can take more than the limit once encoded
+    if len(value) > MAX_FIELD_BYTES // 4 and len(value.encode('utf-8')) > MAX_FIELD_BYTES:
+        raise ValueError(f"{name} is longer than {MAX_FIELD_BYTES} bytes")
+
+
+def pack_str(value):
+    """Encode a string as a 2 byte length followed by its UTF-8 bytes"""
+    data = value.encode('utf-8')
+    if len(data) > MAX_FIELD_BYTES:
+        raise ValueError(f"String of {len(data)} bytes is longer than {MAX_FIELD_BYTES} bytes")
+    return U16.pack(len(data)) + data
+
+
+def unpack_str(buffer, offset):
+    """Decode a string written with pack_str, returns (value, new offset)"""
+    (length,) = U16.unpack_from(buffer, offset)
+    offset += U16.size
+    return bytes(buffer[offset:offset + length]).decode('utf-8'), offset + length
+
+
+def pack_bytes(value):
+    """Encode variable length bytes as a 2 byte length followed by the data"""
+    if len(value) > MAX_FIELD_BYTES:
+        raise ValueError(f"Field of {len(value)} bytes is longer than {MAX_FIELD_BYTES} bytes")
+    return U16.pack(len(value)) + value
+
+
+def unpack_bytes(buffer, offset):
+    """Decode bytes written with pack_bytes, returns (value, new offset)"""
+    (length,) = U16.unpack_from(buffer, offset)
+    offset += U16.size
+    return bytes(buffer[offset:offset + length]), offset + length
@@ -0,0 +1,143 @@
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+from blockchain.encoding import U32, U64, pack_str, unpack_str
+
+# Format version, height covered by the index and hash of its last block
+HISTORY_HEADER = struct.Struct('>HQ32s')
+HISTORY_VERSION = 2
+
+
+class HistoryIndex:
+    """Secondary indexes from UAV to its transactions and from time to block height
+
+    For every uav_id the heights and positions of the transactions touching
+    it are kept in two parallel arrays, in chain order. block_times holds a
+    timestamp per height, clamped so it never decreases, which makes it a
+    sorted time index even if the clock stepped back between two blocks.
+    Both only ever grow at the end, so lookups are bisections and a page of
+    results costs O(log n + page), not O(chain).
+
+    Entries of pruned blocks can be dropped from the front, the number
+    dropped per UAV is kept so offsets handed out as cursors stay valid.
+    """
+
+    def __init__(self):
+        self.block_times = array('q')
+        self.uav_entries = {}  # uav_id -> (array of heights, array of positions)
+        self.uav_dropped = {}  # uav_id -> entries dropped from the front
+
+    @property
+    def height(self):
+        """Number of blocks covered by the index"""
+        return len(self.block_times)
+
+    def add_block(self, block):
+        """Index the next block, blocks must be added in height order"""
+        timestamp = block.timestamp
+        if self.block_times and timestamp < self.block_times[-1]:
+            timestamp = self.block_times[-1]
+        self.block_times.append(timestamp)
+
+        for position, tx in enumerate(block.transactions):
+            entries = self.uav_entries.get(tx.uav_id)
+            if entries is None:
+                entries = self.uav_entries[tx.uav_id] = (array('Q'), array('I'))
+            entries[0].append(block.index)
+            entries[1].append(position)
+
+    def prune(self, height):
+        """Drop the entries of the blocks below height
+
+        Shifts the entries readers page through, run it under the lock
+        readers take, Blockchain.prune holds Blockchain.lock.
+        """
+        for uav_id, (heights, positions) in self.uav_entries.items():
+            count = bisect_left(heights, height)
+            if count:
+                del heights[:count]
+                del positions[:count]
+                self.uav_dropped[uav_id] = self.uav_dropped.get(uav_id, 0) + count
+
+    def height_at(self, timestamp):
+        """First height whose block was sealed at or after timestamp"""
+        return bisect_left(self.block_times, timestamp)
+
+    def uav_history(self, uav_id, since=None, offset=0, limit=100):
+        """Get a page of (height, position) entries for a UAV
+
+        Entries start at the first block sealed at or after since and at no
+        less than offset, an index into the UAV's entries. Returns the page
+        and the offset of the next page, None on the last one.
+        """
+        entries = self.uav_entries.get(uav_id)
+        if entries is None:
+            return [], None
+        heights, positions = entries
+        dropped = self.uav_dropped.get(uav_id, 0)
+
+        start = max(offset - dropped, 0)
+        if since is not None:
+            start = max(start, bisect_left(heights, self.height_at(since)))
+        end = min(start + limit, len(heights))
+        page = [(heights[i], positions[i]) for i in range(start, end)]
+        return page, end + dropped if end < len(heights) else None
+
+    def to_bytes(self, block_hash):
+        """Serialize the index, block_hash is the hash of the last indexed block"""
+        parts = [HISTORY_HEADER.pack(HISTORY_VERSION, self.height, block_hash), _array_bytes(self.block_times),
+                 U32.pack(len(self.uav_entries))]
+        for uav_id, (heights, positions) in self.uav_entries.items():
+            parts.append(pack_str(uav_id))
+            parts.append(U64.pack(self.uav_dropped.get(uav_id, 0)))
+            parts.append(U64.pack(len(heights)))
+            parts.append(_array_bytes(heights))
+            parts.append(_array_bytes(positions))
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, payload):
+        """Deserialize an index written with to_bytes, returns (index, last block hash)
+
+        Raises ValueError for an index written in another format.
+        """
+        index = cls()
+        version, height, block_hash = HISTORY_HEADER.unpack_from(payload, 0)
+        if version != HISTORY_VERSION:
+            raise ValueError(f"Unsupported history index version {version}")
+        offset = HISTORY_HEADER.size
+        index.block_times, offset = _read_array('q', payload, offset, height)
+
+        (uav_count,) = U32.unpack_from(payload, offset)
+        offset += U32.size
+        for _ in range(uav_count):
+            uav_id, offset = unpack_str(payload, offset)
+            (dropped,) = U64.unpack_from(payload, offset)
+            (count,) = U64.unpack_from(payload, offset + U64.size)
+            offset += 2 * U64.size
+            if dropped:
+                index.uav_dropped[uav_id] = dropped
+            heights, offset = _read_array('Q', payload, offset, count)
+            positions, offset = _read_array('I', payload, offset, count)
+            index.uav_entries[uav_id] = (heights, positions)
+        return index, block_hash
+
+
+def _array_bytes(values):
+    """Raw bytes of an array, big-endian like the rest of the formats"""
+    if sys.byteorder == 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _read_array(typecode, payload, offset, count):
+    """Read count big-endian values into an array, returns (array, new offset)"""
+    values = array(typecode)
+    end = offset + count * values.itemsize
+    values.frombytes(payload[offset:end])
+    if sys.byteorder == 'little':
+        values.byteswap()
+    return values, end
@@ -0,0 +1,80 @@
+import time
+
+
+class NonceStore:
+    """Time-windowed replay protection for authentication nonces
+
+    Only timestamps within skew_window seconds of the server clock are
+    accepted, so a nonce only has to be remembered until its timestamp falls
+    out of that window. Nonces are grouped into generations of
+    bucket_seconds by timestamp and a whole generation is dropped once every
+    timestamp in it is stale, which keeps memory flat at the auth rate times
+    the window instead of growing with total history. clock returns the
+    current unix time and can be replaced by a simulated one.
+    """
+
+    def __init__(self, skew_window=300, bucket_seconds=30, clock=time.time):
+        self.skew_window = skew_window
+        self.bucket_seconds = bucket_seconds
+        self.clock = clock
+        self.seen = {}  # nonce key -> generation
+        self.generations = {}  # generation -> list of nonce keys
+        self._last_sweep = None
+
+    def __contains__(self, nonce_key):
+        return nonce_key in self.seen
+
+    def __len__(self):
+        return len(self.seen)
+
+    def is_fresh(self, timestamp, now=None):
+        """Check that a timestamp is inside the accepted skew window"""
+        if now is None:
+            now = int(self.clock())
+        return now - self.skew_window <= timestamp <= now + self.skew_window
+
+    def add(self, nonce_key, timestamp, now=None):
+        """Remember a nonce until its timestamp leaves the window"""
+        if now is None:
+            now = int(self.clock())
+        self.expire(now)
+
+        generation = int(timestamp) // self.bucket_seconds
+        self.seen[nonce_key] = generation
+        keys = self.generations.get(generation)
+        if keys is None:
+            keys = self.generations[generation] = []
+        keys.append(nonce_key)
+
+    def expire(self, now=None):
+        """Drop every generation whose timestamps are all outside the window"""
+        if now is None:
+            now = int(self.clock())
+
+        # Generations only go stale when the clock crosses a bucket boundary
+        current = now // self.bucket_seconds
+        if current == self._last_sweep:
+            return 0
+        self._last_sweep = current
+
+        oldest_fresh = now - self.skew_window
+        dropped = 0
+        for generation in [g for g in self.generations if (g + 1) * self.bucket_seconds <= oldest_fresh]:
+            for nonce_key in self.generations.pop(generation):
+                # A key may have been re-added to a newer generation
+                if self.seen.get(nonce_key) == generation:
+                    del self.seen[nonce_key]
+                    dropped += 1
+        return dropped
+
+    def restore(self, seen, now=None):
+        """Load nonces saved with to_dict and drop the ones that went stale"""
+        for nonce_key, generation in seen.items():
+            self.seen[nonce_key] = generation
+            self.generations.setdefault(generation, []).append(nonce_key)
+        self._last_sweep = None
+        self.expire(now)
+
+    def to_dict(self):
+        """Live nonces as nonce key -> generation"""
+        return dict(self.seen)
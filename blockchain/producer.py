@@ -0,0 +1,309 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from crypto.signatures import auth_message
+
+# Rejection of an authentication whose UAV changed keys while it waited for its block
+KEY_ROTATED = "Key rotated while the authentication was queued"
+
+
+class Receipt:
+    """Handle for a transaction that is waiting to be sealed into a block"""
+
+    def __init__(self, uav_id, tx_type):
+        self.receipt_id = uuid.uuid4().hex
+        self.uav_id = uav_id
+        self.tx_type = tx_type
+        self.tx_id = None
+        self.submitted_at = time.time()
+        self.block_number = None
+        self.success = None
+        self.message = None
+        self._done = threading.Event()
+
+    def is_sealed(self):
+        """Check if the transaction has been sealed into a block"""
+        return self.block_number is not None
+
+    def is_done(self):
+        """Check if the transaction was either sealed or rejected"""
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Wait for the sealing block, returns the block number or None on timeout"""
+        self._done.wait(timeout)
+        return self.block_number
+
+    def seal(self, block_number):
+        """Mark the transaction as sealed in the given block"""
+        self.block_number = block_number
+        self.success = True
+        self._done.set()
+
+    def reject(self, message):
+        """Mark the transaction as rejected before it made it into a block"""
+        self.success = False
+        self.message = message
+        self._done.set()
+
+    def to_dict(self):
+        """Convert receipt to dictionary"""
+        if self.is_sealed():
+            status = 'sealed'
+        elif self.success is False:
+            status = 'rejected'
+        else:
+            status = 'pending'
+
+        return {
+            'receipt_id': self.receipt_id,
+            'uav_id': self.uav_id,
+            'type': self.tx_type,
+            'tx_id': self.tx_id,
+            'status': status,
+            'block_number': self.block_number,
+            'message': self.message,
+            'submitted_at': self.submitted_at
+        }
+
+
+class PendingAuthentication:
+    """Authentication request queued for batch signature verification"""
+
+    def __init__(self, uav_id, nonce, timestamp, signature, public_key, receipt):
+        self.uav_id = uav_id
+        self.nonce = nonce
+        self.timestamp = timestamp
+        self.signature = signature
+        self.public_key = public_key
+        self.receipt = receipt
+
+
+class BlockProducer:
+    """Seals pending transactions into blocks on a size or time window
+
+    Instead of mining one block per request, transactions accumulate in
+    Blockchain.pending_transactions and a background thread seals them once
+    max_block_size transactions are waiting or the oldest one has waited
+    block_interval seconds. Every accepted transaction gets a Receipt that
+    callers can return immediately or wait on.
+
+    Authentications only pass the cheap checks on submission. Their
+    signatures are verified together as one batch right before sealing, and
+    the ones that fail are rejected through their receipt.
+    """
+
+    def __init__(self, blockchain, max_block_size=500, block_interval=1.0, max_receipts=100000):
+        self.blockchain = blockchain
+        self.max_block_size = max_block_size
+        self.block_interval = block_interval
+        self.max_receipts = max_receipts
+
+        # All blockchain mutations go through this lock so that
+        # pending_receipts stays aligned with pending_transactions.
+        # It wraps the chain's own lock, which chain readers take
+        self.lock = threading.Condition(blockchain.lock)
+        self.pending_receipts = []
+        self.pending_auths = []
+        self.receipts = OrderedDict()  # receipt_id -> Receipt
+        self.first_pending_at = None
+
+        # Only one batch is verified and sealed at a time
+        self.seal_lock = threading.Lock()
+
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Start the background sealing thread"""
+        with self.lock:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="block-producer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the sealing thread and seal whatever is still pending"""
+        with self.lock:
+            self._running = False
+            self.lock.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def register_uav(self, uav_id, public_key, model, firmware_version):
+        """Register a UAV, returns (success, message, receipt)"""
+        return self._apply('REGISTER', self.blockchain.register_uav, uav_id, public_key, model, firmware_version)
+
+    def revoke_uav(self, uav_id, timestamp, signature):
+        """Revoke a UAV, returns (success, message, receipt)"""
+        return self._apply('REVOKE', self.blockchain.revoke_uav, uav_id, timestamp, signature)
+
+    def rotate_key(self, uav_id, public_key, timestamp, signature):
+        """Replace a UAV's key, returns (success, message, receipt)"""
+        return self._apply('ROTATE_KEY', self.blockchain.rotate_key, uav_id, public_key, timestamp, signature)
+
+    def authenticate_uav(self, uav_id, nonce, timestamp, signature):
+        """Queue a UAV authentication, returns (success, message, receipt)
+
+        A successful return only means the request passed the cheap checks,
+        the receipt is rejected later if the signature does not verify.
+        """
+        with self.lock:
+            success, message = self.blockchain.check_authentication(uav_id, nonce, timestamp)
+            if not success:
+                return False, message, None
+            receipt = self._track(uav_id, 'AUTHENTICATE')
+            public_key = self.blockchain.registry.public_key_hex(uav_id)
+            self.pending_auths.append(
+                PendingAuthentication(uav_id, nonce, timestamp, signature, public_key, receipt)
+            )
+            return True, "Authentication queued", receipt
+
+    def register_batch(self, registrations):
+        """Register several UAVs at once, returns one (success, message, receipt) per item
+
+        Items are (uav_id, public_key, model, firmware_version) tuples. They
+        are queued under one lock acquisition, so they go into the same block
+        unless together with what is already pending they exceed max_block_size.
+        """
+        with self.lock:
+            return [self.register_uav(*registration) for registration in registrations]
+
+    def authenticate_batch(self, authentications):
+        """Queue several authentications at once, returns one (success, message, receipt) per item
+
+        Items are (uav_id, nonce, timestamp, signature) tuples, their
+        signatures are verified together with the rest of the next batch.
+        """
+        with self.lock:
+            return [self.authenticate_uav(*authentication) for authentication in authentications]
+
+    def record_sessions(self, summaries):
+        """Queue session summaries, returns one (success, message, receipt) per item
+
+        Items are (uav_id, session_id, issued_at, last_seen, checks) tuples.
+        """
+        with self.lock:
+            return [self._apply('SESSION', self.blockchain.record_session, *summary) for summary in summaries]
+
+    def get_receipt(self, receipt_id):
+        """Look up a receipt by id"""
+        with self.lock:
+            return self.receipts.get(receipt_id)
+
+    def pending_count(self):
+        """Number of transactions waiting for a block"""
+        with self.lock:
+            return len(self.pending_receipts) + len(self.pending_auths)
+
+    def flush(self):
+        """Verify and seal every pending transaction right away"""
+        while self.pending_count():
+            self.seal()
+
+    def seal(self):
+        """Verify the queued authentications as one batch and seal blocks
+
+        Returns the list of blocks that were created.
+        """
+        with self.seal_lock:
+            with self.lock:
+                batch = self.pending_auths
+                self.pending_auths = []
+
+            # Signature checks run without holding the lock so new requests keep flowing
+            results = self.blockchain.verifier.verify_batch([
+                (auth.uav_id, auth.public_key, auth_message(auth.uav_id, auth.nonce, auth.timestamp), auth.signature)
+                for auth in batch
+            ])
+
+            with self.lock:
+                for auth, valid in zip(batch, results):
+                    if not valid:
+                        auth.receipt.reject("Invalid signature")
+                        continue
+                    # Checked against the key at queueing time, which may have been rotated since
+                    if self.blockchain.registry.public_key_hex(auth.uav_id) != auth.public_key:
+                        auth.receipt.reject(KEY_ROTATED)
+                        continue
+
+                    # Replay checks run again, the same nonce may be queued twice
+                    success, message = self.blockchain.authenticate_uav(
+                        auth.uav_id, auth.nonce, auth.timestamp, auth.signature, verified=True
+                    )
+                    if success:
+                        auth.receipt.tx_id = self.blockchain.pending_tx_hashes[-1].hex()
+                        self.pending_receipts.append(auth.receipt)
+                    else:
+                        auth.receipt.reject(message)
+
+                blocks = []
+                while self.pending_receipts:
+                    blocks.append(self._mine())
+
+                self.first_pending_at = time.monotonic() if self.pending_auths else None
+                return blocks
+
+    def _apply(self, tx_type, apply, uav_id, *args):
+        """Apply a transaction that needs no batched signature check, returns (success, message, receipt)"""
+        with self.lock:
+            success, message = apply(uav_id, *args)
+            if not success:
+                return False, message, None
+            receipt = self._track(uav_id, tx_type)
+            receipt.tx_id = self.blockchain.pending_tx_hashes[-1].hex()
+            self.pending_receipts.append(receipt)
+            return True, message, receipt
+
+    def _track(self, uav_id, tx_type):
+        """Create a receipt for a transaction that was just accepted"""
+        receipt = Receipt(uav_id, tx_type)
+        self.receipts[receipt.receipt_id] = receipt
+
+        if self.first_pending_at is None:
+            self.first_pending_at = time.monotonic()
+
+        # Drop the oldest receipts once we hold too many
+        while len(self.receipts) > self.max_receipts:
+            self.receipts.popitem(last=False)
+
+        self.lock.notify_all()
+        return receipt
+
+    def _mine(self):
+        """Seal up to max_block_size pending transactions into a block"""
+        block = self.blockchain.mine_block(self.max_block_size)
+
+        sealed = self.pending_receipts[:len(block.transactions)]
+        self.pending_receipts = self.pending_receipts[len(block.transactions):]
+
+        for receipt in sealed:
+            receipt.seal(block.index)
+
+        return block
+
+    def _is_due(self):
+        """Check if the size or time window has been reached"""
+        pending = len(self.pending_receipts) + len(self.pending_auths)
+        if not pending:
+            return False
+        waited = time.monotonic() - self.first_pending_at
+        return pending >= self.max_block_size or waited >= self.block_interval
+
+    def _run(self):
+        """Background loop that seals blocks on the size or time window"""
+        while True:
+            with self.lock:
+                while self._running and not self._is_due():
+                    if self.first_pending_at is None:
+                        self.lock.wait()
+                    else:
+                        self.lock.wait(max(0, self.block_interval - (time.monotonic() - self.first_pending_at)))
+                if not self._running:
+                    return
+            self.seal()
@@ -0,0 +1,196 @@
+import sys
+from array import array
+
+KEY_SIZE = 32
+# last_auth of a UAV that never authenticated
+NEVER = -1
+
+
+class StringTable:
+    """Interned strings numbered in order of first use"""
+
+    def __init__(self):
+        self.values = []
+        self.numbers = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def intern(self, value):
+        """Number of a string, adding it if it is new"""
+        number = self.numbers.get(value)
+        if number is None:
+            number = self.numbers[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        return number
+
+
+class UavRegistry:
+    """Registered UAVs kept in columns, one row per UAV
+
+    Raw public keys are packed into one bytearray, timestamps and the
+    numbers of the interned model and firmware strings into arrays, so a
+    UAV costs its id and a few dozen bytes instead of a dict of strings.
+    For every model and firmware version the rows that have it are listed,
+    and the UAVs not revoked are counted, so fleet-wide queries only touch
+    the UAVs they return. Revoking a UAV or rotating its key overwrites its
+    row in place.
+    """
+
+    FIELDS = ('model', 'firmware_version')
+
+    def __init__(self):
+        self.rows = {}  # uav_id -> row
+        self.uav_ids = []
+        self.keys = bytearray()
+        self.last_auth = array('q')
+        self.revoked = bytearray()
+        self.tables = {field: StringTable() for field in self.FIELDS}
+        self.values = {field: array('I') for field in self.FIELDS}  # row -> string number
+        self.index = {field: [] for field in self.FIELDS}  # string number -> array of rows
+        self.active = {field: array('I') for field in self.FIELDS}  # string number -> UAVs not revoked
+
+    def __len__(self):
+        return len(self.uav_ids)
+
+    def __contains__(self, uav_id):
+        return uav_id in self.rows
+
+    def register(self, uav_id, public_key, model, firmware_version):
+        """Add a UAV, public_key is raw bytes"""
+        row = len(self.uav_ids)
+        self.uav_ids.append(uav_id)
+        self.keys += public_key
+        self.last_auth.append(NEVER)
+        self.revoked.append(0)
+        for field, value in zip(self.FIELDS, (model, firmware_version)):
+            number = self.tables[field].intern(value)
+            if number == len(self.index[field]):
+                self.index[field].append(array('I'))
+                self.active[field].append(0)
+            self.values[field].append(number)
+            self.index[field][number].append(row)
+            self.active[field][number] += 1
+        # Readers on other threads only find the row once it is complete
+        self.rows[uav_id] = row
+        return row
+
+    def public_key(self, uav_id):
+        """Raw public key of a UAV"""
+        row = self.rows[uav_id]
+        return bytes(self.keys[row * KEY_SIZE:(row + 1) * KEY_SIZE])
+
+    def public_key_hex(self, uav_id):
+        """Public key of a UAV as hex, the form signatures are checked with"""
+        return self.public_key(uav_id).hex()
+
+    def is_revoked(self, uav_id):
+        return bool(self.revoked[self.rows[uav_id]])
+
+    def key_state(self, uav_id):
+        """The (public_key, revoked) pair session checks need, or None"""
+        row = self.rows.get(uav_id)
+        if row is None:
+            return None
+        return bytes(self.keys[row * KEY_SIZE:(row + 1) * KEY_SIZE]), bool(self.revoked[row])
+
+    def set_last_auth(self, uav_id, timestamp):
+        self.last_auth[self.rows[uav_id]] = timestamp
+
+    def revoke(self, uav_id):
+        """Mark a UAV as revoked, it stays registered under its id"""
+        row = self.rows[uav_id]
+        if self.revoked[row]:
+            return
+        self.revoked[row] = 1
+        for field in self.FIELDS:
+            self.active[field][self.values[field][row]] -= 1
+
+    def rotate_key(self, uav_id, public_key):
+        """Replace the public key of a UAV, public_key is raw bytes"""
+        row = self.rows[uav_id]
+        self.keys[row * KEY_SIZE:(row + 1) * KEY_SIZE] = public_key
+
+    def status(self, uav_id):
+        """The (last_auth, firmware_version, revoked) tuple readers see, or None"""
+        row = self.rows.get(uav_id)
+        if row is None:
+            return None
+        last_auth = self.last_auth[row]
+        return (
+            None if last_auth == NEVER else last_auth,
+            self.tables['firmware_version'].values[self.values['firmware_version'][row]],
+            bool(self.revoked[row])
+        )
+
+    def get(self, uav_id):
+        """Registry entry of a UAV in dictionary form, or None"""
+        row = self.rows.get(uav_id)
+        return None if row is None else self._entry(row)
+
+    def find(self, model=None, firmware_version=None, include_revoked=False, cursor=0, limit=100):
+        """Page through the UAVs with a model and/or firmware version, in registration order
+
+        With both, the shorter of the two row lists is scanned. Returns the
+        uav_ids and the cursor of the next page, None on the last one.
+        """
+        candidates = []
+        for field, value in zip(self.FIELDS, (model, firmware_version)):
+            if value is None:
+                continue
+            number = self.tables[field].numbers.get(value)
+            if number is None:
+                return {'uav_ids': [], 'next_cursor': None}
+            candidates.append((field, number))
+        if not candidates:
+            raise ValueError("Give a model or a firmware version")
+
+        field, number = min(candidates, key=lambda candidate: len(self.index[candidate[0]][candidate[1]]))
+        rows = self.index[field][number]
+        uav_ids = []
+        position = cursor
+        while position < len(rows) and len(uav_ids) < limit:
+            row = rows[position]
+            position += 1
+            if self.revoked[row] and not include_revoked:
+                continue
+            if all(self.values[other][row] == other_number for other, other_number in candidates):
+                uav_ids.append(self.uav_ids[row])
+        return {'uav_ids': uav_ids, 'next_cursor': position if position < len(rows) else None}
+
+    def counts(self, field):
+        """UAVs not revoked per model or per firmware version"""
+        if field not in self.FIELDS:
+            raise ValueError(f"Counts are kept by {' and '.join(self.FIELDS)}")
+        return {
+            value: count
+            for value, count in zip(self.tables[field].values, self.active[field]) if count
+        }
+
+    def to_dict(self):
+        """Snapshot form, uav_id -> entry, revoked is only written for revoked UAVs"""
+        return {uav_id: self._entry(row) for row, uav_id in enumerate(self.uav_ids)}
+
+    @classmethod
+    def from_dict(cls, entries):
+        """Rebuild a registry from to_dict output"""
+        registry = cls()
+        for uav_id, entry in entries.items():
+            registry.register(uav_id, bytes.fromhex(entry['public_key']), entry['model'], entry['firmware_version'])
+            if entry['last_auth'] is not None:
+                registry.set_last_auth(uav_id, entry['last_auth'])
+            if entry.get('revoked'):
+                registry.revoke(uav_id)
+        return registry
+
+    def _entry(self, row):
+        last_auth = self.last_auth[row]
+        entry = {
+            'public_key': self.keys[row * KEY_SIZE:(row + 1) * KEY_SIZE].hex(),
+            'model': self.tables['model'].values[self.values['model'][row]],
+            'firmware_version': self.tables['firmware_version'].values[self.values['firmware_version'][row]],
+            'last_auth': None if last_auth == NEVER else last_auth
+        }
+        if self.revoked[row]:
+            entry['revoked'] = True
+        return entry
@@ -0,0 +1,363 @@
+import json
+import mmap
+import os
+import shutil
+import struct
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+# Every record in the block log is a 4 byte big-endian length followed by the payload
+RECORD_HEADER = struct.Struct('>I')
+
+
+class BlockLog:
+    """Append-only, length-prefixed log of serialized blocks
+
+    Appends are written to the OS right away but only fsynced every
+    sync_every records or sync_interval seconds, whichever comes first, so a
+    crash can lose at most that window of blocks. A torn record at the end of
+    the file is cut off when the log is opened.
+    """
+
+    def __init__(self, path, sync_every=32, sync_interval=1.0):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+
+        self.offsets = array('Q')  # byte offset of every record
+        self._recover()
+
+        self.file = open(self.path, 'ab')
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def append(self, payload):
+        """Append a record, returns its byte offset
+
+        A write that fails is cut off again, so the log never holds a torn
+        record in front of later ones.
+        """
+        offset = self.file.tell()
+        try:
+            self.file.write(RECORD_HEADER.pack(len(payload)))
+            self.file.write(payload)
+            self.file.flush()
+        except OSError:
+            self._rollback(offset)
+            raise
+        self.offsets.append(offset)
+
+        self.unsynced += 1
+        if self.unsynced >= self.sync_every or time.monotonic() - self.last_sync >= self.sync_interval:
+            self.sync()
+        return offset
+
+    def _rollback(self, offset):
+        """Drop whatever a failed append left after offset, buffered bytes included"""
+        try:
+            self.file.close()
+        except OSError:
+            pass
+        os.truncate(self.path, offset)
+        self.file = open(self.path, 'ab')
+
+    def sync(self):
+        """Force appended records to disk"""
+        if self.unsynced:
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def size(self):
+        """Number of bytes written to the log so far"""
+        return self.file.tell()
+
+    def read(self, start=0):
+        """Iterate over record payloads starting at the given record number"""
+        if start >= len(self.offsets):
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self.offsets[start])
+            for _ in range(start, len(self.offsets)):
+                (length,) = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+                yield f.read(length)
+
+    def read_record(self, index):
+        """Read the payload of one record straight from the file"""
+        with open(self.path, 'rb') as f:
+            f.seek(self.offsets[index])
+            (length,) = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+            return f.read(length)
+
+    def truncate(self, count):
+        """Cut the log down to its first count records"""
+        if count >= len(self.offsets):
+            return
+        self.sync()
+        self.file.close()
+        with open(self.path, 'r+b') as f:
+            f.truncate(self.offsets[count])
+            os.fsync(f.fileno())
+        del self.offsets[count:]
+        self.file = open(self.path, 'ab')
+
+    def drop_front(self, count):
+        """Drop the first count records by copying the rest to a new file and swapping it in"""
+        if count <= 0:
+            return
+        self.sync()
+        self.file.close()
+        start = self.offsets[count] if count < len(self.offsets) else os.path.getsize(self.path)
+
+        tmp_path = self.path + '.tmp'
+        with open(self.path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            src.seek(start)
+            shutil.copyfileobj(src, dst, 1 << 20)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_path, self.path)
+
+        self.offsets = array('Q', (offset - start for offset in self.offsets[count:]))
+        self.file = open(self.path, 'ab')
+
+    def close(self):
+        """Sync and close the log"""
+        self.sync()
+        self.file.close()
+
+    def _recover(self):
+        """Index the existing records and cut off a torn write at the end"""
+        if not os.path.exists(self.path):
+            return
+
+        size = os.path.getsize(self.path)
+        offset = 0
+        with open(self.path, 'rb') as f:
+            while offset + RECORD_HEADER.size <= size:
+                (length,) = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+                if offset + RECORD_HEADER.size + length > size:
+                    break
+                self.offsets.append(offset)
+                offset += RECORD_HEADER.size + length
+                f.seek(offset)
+
+        if offset < size:
+            with open(self.path, 'r+b') as f:
+                f.truncate(offset)
+
+
+class SnapshotStore:
+    """Atomically replaced JSON snapshot of the derived ledger state"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def save(self, state):
+        """Write the snapshot to a temp file and swap it in"""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """Load the last snapshot, or None if there is none"""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+
+class BlobStore:
+    """Atomically replaced binary file, for derived indexes too large for JSON"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def save(self, payload):
+        """Write the payload to a temp file and swap it in"""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """Load the last payload, or None if there is none"""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+
+class ChainView:
+    """List-like view of the chain backed by a memory-mapped block log
+
+    Only the offset index and a small LRU of recently used blocks stay in
+    memory. Block bodies are decoded from the mapped file on demand, so
+    resident memory does not grow with the length of the chain. The writer
+    and reader threads share the map and the LRU under one lock.
+
+    With a headers log the oldest blocks can be pruned: their records move
+    from the block log to the headers log as header-only blocks, and the
+    block log then starts at block number base.
+    """
+
+    def __init__(self, block_log, encode, decode, cache_size=256, headers=None):
+        self.block_log = block_log
+        self.headers = headers
+        self.encode = encode  # Block -> bytes
+        self.decode = decode  # bytes -> Block
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # index -> Block
+        self.lock = threading.Lock()
+
+        self._file = None
+        self._map = None
+        self._mapped_size = 0
+
+        if headers is not None and len(headers) and len(block_log):
+            # A crash during pruning can leave headers for blocks the block log still holds
+            headers.truncate(self.decode(block_log.read_record(0)).index)
+        # Number of the first block whose body is still stored
+        self.base = len(headers) if headers is not None else 0
+
+    def __len__(self):
+        return self.base + len(self.block_log)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("block index out of range")
+
+        with self.lock:
+            if index < self.base:
+                return self.decode(self.headers.read_record(index))
+
+            block = self.cache.get(index)
+            if block is not None:
+                self.cache.move_to_end(index)
+                return block
+
+            block = self.decode(self._read(index))
+            self._remember(index, block)
+            return block
+
+    def read_raw(self, index):
+        """Get the stored bytes of a block without decoding it or touching the LRU"""
+        with self.lock:
+            if index < self.base:
+                return self.headers.read_record(index)
+            return self._read(index)
+
+    def body_offset(self, index):
+        """Byte offset of a stored block's record in the block log"""
+        return self.block_log.offsets[index - self.base]
+
+    def prune(self, end, encode_header, archive=None):
+        """Keep only the headers of the blocks below end
+
+        The stored records of the pruned blocks are appended to the archive
+        file object if one is given, otherwise they are dropped.
+        """
+        with self.lock:
+            base = self.base
+            if end <= base:
+                return 0
+            for index in range(base, end):
+                payload = self._read(index)
+                if archive is not None:
+                    archive.write(RECORD_HEADER.pack(len(payload)))
+                    archive.write(payload)
+                self.headers.append(encode_header(self.decode(payload)))
+            if archive is not None:
+                archive.flush()
+                os.fsync(archive.fileno())
+            # Headers are durable before the bodies go, so a crash in between only duplicates them
+            self.headers.sync()
+
+            self._unmap()
+            self.block_log.drop_front(end - base)
+            self.base = end
+            for index in [i for i in self.cache if i < end]:
+                del self.cache[index]
+            return end - base
+
+    def append(self, block):
+        """Write a block to the log and keep it as a hot block"""
+        payload = self.encode(block)
+        with self.lock:
+            self.block_log.append(payload)
+            self._remember(len(self) - 1, block)
+
+    def close(self):
+        """Release the memory map"""
+        with self.lock:
+            self._unmap()
+
+    def _unmap(self):
+        """Close the map and its file"""
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = None
+            self._file = None
+            self._mapped_size = 0
+
+    def _remember(self, index, block):
+        """Put a block into the LRU"""
+        self.cache[index] = block
+        self.cache.move_to_end(index)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def _read(self, index):
+        """Read the raw record for a stored block from the memory map"""
+        offset = self.block_log.offsets[index - self.base]
+
+        # Remap once the log has grown past the mapped region
+        if offset + RECORD_HEADER.size > self._mapped_size:
+            self._remap()
+        (length,) = RECORD_HEADER.unpack_from(self._map, offset)
+        start = offset + RECORD_HEADER.size
+        if start + length > self._mapped_size:
+            self._remap()
+            (length,) = RECORD_HEADER.unpack_from(self._map, offset)
+        return self._map[start:start + length]
+
+    def _remap(self):
+        """Map the whole block log as it is now"""
+        self._unmap()
+        self._file = open(self.block_log.path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mapped_size = len(self._map)
+
+
+class TickView:
+    """Read-only view of the PoH ticks stored inside the blocks of a chain"""
+
+    def __init__(self, chain):
+        self.chain = chain
+
+    def __len__(self):
+        return len(self.chain)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [block.poh_tick for block in self.chain[index]]
+        return self.chain[index].poh_tick
@@ -0,0 +1,173 @@
+import hashlib
+import struct
+import sys
+
+from crypto.merkle import LEAF_PREFIX
+from blockchain.encoding import U8, U32, check_str, pack_str, unpack_str
+
+# Wire codes for the transaction types
+TX_TYPES = {'REGISTER': 1, 'AUTHENTICATE': 2, 'SESSION': 3, 'REVOKE': 4, 'ROTATE_KEY': 5}
+TX_TYPE_NAMES = {code: name for name, code in TX_TYPES.items()}
+
+REGISTER_FIELDS = struct.Struct('>q32s')  # timestamp, raw public key
+AUTHENTICATE_FIELDS = struct.Struct('>q64s')  # timestamp, raw signature
+SESSION_FIELDS = struct.Struct('>q16sqI')  # last seen, session id, issued at, checks
+REVOKE_FIELDS = struct.Struct('>q64s')  # timestamp, raw signature by the revoked key
+ROTATE_KEY_FIELDS = struct.Struct('>q32s64s')  # timestamp, new raw public key, raw signature by the old key
+
+
+class Transaction:
+    """A ledger transaction with a canonical binary encoding
+
+    Keys and signatures are kept as raw bytes. The hex and dict forms are
+    only produced by to_dict for the HTTP layer.
+    """
+
+    __slots__ = ('type', 'uav_id', 'timestamp', 'public_key', 'model', 'firmware_version',
+                 'nonce', 'signature', 'session_id', 'issued_at', 'checks', '_digest')
+
+    def __init__(self, type, uav_id, timestamp, public_key=None, model=None, firmware_version=None,
+                 nonce=None, signature=None, session_id=None, issued_at=None, checks=None):
+        self.type = type
+        self.uav_id = sys.intern(uav_id)
+        self.timestamp = timestamp
+        self.public_key = public_key
+        self.model = model
+        self.firmware_version = firmware_version
+        self.nonce = nonce
+        self.signature = signature
+        self.session_id = session_id
+        self.issued_at = issued_at
+        self.checks = checks
+        self._digest = None
+
+    @classmethod
+    def register(cls, uav_id, public_key, model, firmware_version, timestamp):
+        """Build a REGISTER transaction, public_key is raw bytes
+
+        Raises ValueError if a string field is too long to be encoded.
+        """
+        check_str('uav_id', uav_id)
+        check_str('model', model)
+        check_str('firmware_version', firmware_version)
+        return cls('REGISTER', uav_id, timestamp, public_key=public_key, model=model,
+                   firmware_version=firmware_version)
+
+    @classmethod
+    def authenticate(cls, uav_id, nonce, timestamp, signature):
+        """Build an AUTHENTICATE transaction, signature is raw bytes
+
+        Raises ValueError if a string field is too long to be encoded.
+        """
+        check_str('uav_id', uav_id)
+        check_str('nonce', nonce)
+        return cls('AUTHENTICATE', uav_id, timestamp, nonce=nonce, signature=signature)
+
+    @classmethod
+    def session(cls, uav_id, session_id, issued_at, last_seen, checks):
+        """Build a SESSION transaction summarizing the token checks of one session"""
+        return cls('SESSION', uav_id, last_seen, session_id=session_id, issued_at=issued_at, checks=checks)
+
+    @classmethod
+    def revoke(cls, uav_id, timestamp, signature):
+        """Build a REVOKE transaction, signature is raw bytes"""
+        return cls('REVOKE', uav_id, timestamp, signature=signature)
+
+    @classmethod
+    def rotate_key(cls, uav_id, public_key, timestamp, signature):
+        """Build a ROTATE_KEY transaction, public_key and signature are raw bytes"""
+        return cls('ROTATE_KEY', uav_id, timestamp, public_key=public_key, signature=signature)
+
+    @property
+    def digest(self):
+        """Raw sha256 Merkle leaf hash of the canonical encoding, computed once"""
+        if self._digest is None:
+            self._digest = hashlib.sha256(LEAF_PREFIX + self.encode()).digest()
+        return self._digest
+
+    @property
+    def tx_id(self):
+        """Transaction id as shown to API clients"""
+        return self.digest.hex()
+
+    def encode(self):
+        """Canonical encoding with the uav_id inline, this is what gets hashed"""
+        return U8.pack(TX_TYPES[self.type]) + pack_str(self.uav_id) + self._encode_fields()
+
+    def encode_interned(self, uav_ref):
+        """Block storage encoding that refers to the uav_id by its index in the block's table"""
+        return U8.pack(TX_TYPES[self.type]) + U32.pack(uav_ref) + self._encode_fields()
+
+    @classmethod
+    def decode(cls, buffer, offset=0):
+        """Decode a canonical encoding, returns (transaction, new offset)"""
+        (code,) = U8.unpack_from(buffer, offset)
+        uav_id, offset = unpack_str(buffer, offset + U8.size)
+        return cls._decode_fields(TX_TYPE_NAMES[code], uav_id, buffer, offset)
+
+    @classmethod
+    def decode_interned(cls, buffer, offset, uav_ids):
+        """Decode a block storage encoding, returns (transaction, new offset)"""
+        (code,) = U8.unpack_from(buffer, offset)
+        (uav_ref,) = U32.unpack_from(buffer, offset + U8.size)
+        return cls._decode_fields(TX_TYPE_NAMES[code], uav_ids[uav_ref], buffer, offset + U8.size + U32.size)
+
+    def to_dict(self):
+        """Convert transaction to the dictionary form used by the API"""
+        data = {
+            'type': self.type,
+            'uav_id': self.uav_id
+        }
+        if self.type == 'REGISTER':
+            data['public_key'] = self.public_key.hex()
+            data['model'] = self.model
+            data['firmware_version'] = self.firmware_version
+        elif self.type == 'AUTHENTICATE':
+            data['nonce'] = self.nonce
+            data['signature'] = self.signature.hex()
+        elif self.type == 'SESSION':
+            data['session_id'] = self.session_id.hex()
+            data['issued_at'] = self.issued_at
+            data['checks'] = self.checks
+        elif self.type == 'REVOKE':
+            data['signature'] = self.signature.hex()
+        elif self.type == 'ROTATE_KEY':
+            data['public_key'] = self.public_key.hex()
+            data['signature'] = self.signature.hex()
+        data['timestamp'] = self.timestamp
+        return data
+
+    def _encode_fields(self):
+        """Encode everything after the type and uav_id"""
+        if self.type == 'REGISTER':
+            return (REGISTER_FIELDS.pack(self.timestamp, self.public_key)
+                    + pack_str(self.model) + pack_str(self.firmware_version))
+        if self.type == 'SESSION':
+            return SESSION_FIELDS.pack(self.timestamp, self.session_id, self.issued_at, self.checks)
+        if self.type == 'REVOKE':
+            return REVOKE_FIELDS.pack(self.timestamp, self.signature)
+        if self.type == 'ROTATE_KEY':
+            return ROTATE_KEY_FIELDS.pack(self.timestamp, self.public_key, self.signature)
+        return AUTHENTICATE_FIELDS.pack(self.timestamp, self.signature) + pack_str(self.nonce)
+
+    @classmethod
+    def _decode_fields(cls, tx_type, uav_id, buffer, offset):
+        """Decode everything after the type and uav_id"""
+        if tx_type == 'REGISTER':
+            timestamp, public_key = REGISTER_FIELDS.unpack_from(buffer, offset)
+            model, offset = unpack_str(buffer, offset + REGISTER_FIELDS.size)
+            firmware_version, offset = unpack_str(buffer, offset)
+            return cls.register(uav_id, public_key, model, firmware_version, timestamp), offset
+        if tx_type == 'SESSION':
+            last_seen, session_id, issued_at, checks = SESSION_FIELDS.unpack_from(buffer, offset)
+            return cls.session(uav_id, session_id, issued_at, last_seen, checks), offset + SESSION_FIELDS.size
+        if tx_type == 'REVOKE':
+            timestamp, signature = REVOKE_FIELDS.unpack_from(buffer, offset)
+            return cls.revoke(uav_id, timestamp, signature), offset + REVOKE_FIELDS.size
+        if tx_type == 'ROTATE_KEY':
+            timestamp, public_key, signature = ROTATE_KEY_FIELDS.unpack_from(buffer, offset)
+            return cls.rotate_key(uav_id, public_key, timestamp, signature), offset + ROTATE_KEY_FIELDS.size
+
+        timestamp, signature = AUTHENTICATE_FIELDS.unpack_from(buffer, offset)
+        nonce, offset = unpack_str(buffer, offset + AUTHENTICATE_FIELDS.size)
+        return cls.authenticate(uav_id, nonce, timestamp, signature), offset
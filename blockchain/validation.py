@@ -0,0 +1,106 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from crypto.poh import GENESIS_HASH, hash_tick, verify_tick
+from blockchain.encoding import U64
+from blockchain.storage import RECORD_HEADER
+
+# A block's tick data is its Merkle root, followed by the PoH clock count and
+# hash at sealing when the node runs a PoHClock
+ROOT_SIZE = 32
+CLOCK_SUFFIX_SIZE = U64.size + 32
+
+
+def verify_block(block, previous=None):
+    """Verify a block on its own and against the block before it
+
+    Checks the header hash, the Merkle root of the transactions, the link to
+    the previous block and the PoH tick, which must follow the previous
+    block's tick (or the PoH genesis hash for the genesis block) and commit
+    to the block's Merkle root.
+    """
+    # Check block hash and transactions
+    if block.hash != block.calculate_hash():
+        return False
+    if block.merkle_root != block.calculate_merkle_root():
+        return False
+
+    tick = block.poh_tick
+    if previous is None:
+        if block.index != 0 or tick.prev_hash != GENESIS_HASH:
+            return False
+        return tick.hash == hash_tick(tick.prev_hash, tick.data)
+
+    # Check link to previous block
+    if block.index != previous.index + 1 or block.prev_hash != previous.hash:
+        return False
+
+    # The tick must commit to these transactions, not just follow the last tick
+    data = tick.data
+    if not data or len(data) not in (ROOT_SIZE, ROOT_SIZE + CLOCK_SUFFIX_SIZE):
+        return False
+    if data[:ROOT_SIZE] != block.merkle_root:
+        return False
+    return verify_tick(previous.poh_tick, tick)
+
+
+def verify_blocks(blocks, previous=None):
+    """Verify consecutive blocks, returns the index of the first bad block or None"""
+    for block in blocks:
+        if not verify_block(block, previous):
+            return block.index
+        previous = block
+    return None
+
+
+def verify_log_range(path, offset, count, previous, decode):
+    """Verify count blocks read straight from the block log at a byte offset
+
+    Runs in a pool worker, which reads the log itself instead of receiving
+    every block through a pipe.
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for _ in range(count):
+            (length,) = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+            block = decode(f.read(length))
+            if not verify_block(block, previous):
+                return block.index
+            previous = block
+    return None
+
+
+def audit_chain(chain, block_log=None, workers=None, segment_size=None, first=0):
+    """Verify the whole chain from block first on across a process pool
+
+    Every block can be checked given only the block before it, so the chain
+    is split into segments that are verified independently. Returns the
+    index of the first bad block or None.
+    """
+    workers = workers or os.cpu_count() or 1
+    length = len(chain)
+    if segment_size is None:
+        segment_size = max(1, -(-(length - first) // (workers * 4)))
+
+    # Small chains or a single worker are not worth the pool
+    if workers == 1 or length - first <= segment_size:
+        return verify_blocks((chain[i] for i in range(first, length)), chain[first - 1] if first else None)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for start in range(first, length, segment_size):
+            count = min(segment_size, length - start)
+            previous = chain[start - 1] if start else None
+            if block_log is not None:
+                futures.append(executor.submit(
+                    verify_log_range, block_log.path, chain.body_offset(start), count, previous, chain.decode
+                ))
+            else:
+                futures.append(executor.submit(verify_blocks, chain[start:start + count], previous))
+
+        # Segments are in chain order, so the first failure is the earliest bad block
+        for future in futures:
+            bad_index = future.result()
+            if bad_index is not None:
+                return bad_index
+    return None
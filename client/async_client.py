@@ -0,0 +1,112 @@
+import asyncio
+import random
+
+import httpx
+
+# Responses worth retrying, the server or a proxy in front of it was overloaded
+RETRY_STATUS = (502, 503, 504)
+
+
+class AsyncUAVClient:
+    """Asynchronous client that talks to the server for many UAV identities
+
+    One AsyncUAVClient holds a pool of keep-alive connections and is shared
+    by a whole swarm; the identities are UAVClient objects, which only do key
+    handling and signing here. At most max_concurrency requests are in
+    flight, the rest wait for a slot.
+
+    Requests are retried with exponential backoff and jitter when the
+    connection fails or the server answers 502/503/504. A retried
+    authentication is signed again with a fresh nonce, since the first
+    attempt may have been accepted and its nonce is then used up. A retried
+    registration can likewise come back as "UAV already registered".
+    """
+
+    def __init__(self, server_url, max_connections=100, max_concurrency=100, retries=3, backoff=0.1,
+                 timeout=10.0, transport=None):
+        """Initialize the client, transport can be e.g. an httpx.ASGITransport for in-process use"""
+        self.server_url = server_url
+        self.retries = retries
+        self.backoff = backoff
+        self.limit = asyncio.Semaphore(max_concurrency)
+        self.http = httpx.AsyncClient(
+            base_url=server_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Close the pooled connections"""
+        await self.http.aclose()
+
+    async def register(self, uav, model, firmware_version):
+        """Register a UAV identity"""
+        return await self._request(
+            "POST", "/api/v1/uav/register", lambda: uav.registration_data(model, firmware_version),
+            "Failed to register UAV"
+        )
+
+    async def authenticate(self, uav):
+        """Authenticate a UAV identity with a freshly signed nonce"""
+        return await self._request(
+            "POST", "/api/v1/uav/authenticate", uav.authentication_data,
+            "Failed to authenticate UAV"
+        )
+
+    async def authenticate_many(self, uavs):
+        """Authenticate several identities concurrently, returns the results in order"""
+        return await asyncio.gather(*(self.authenticate(uav) for uav in uavs))
+
+    async def register_batch(self, uavs, model, firmware_version):
+        """Register a fleet in one request"""
+        return await self._request(
+            "POST", "/api/v1/uav/register:batch",
+            lambda: {"registrations": [uav.registration_data(model, firmware_version) for uav in uavs]},
+            "Failed to register UAVs"
+        )
+
+    async def authenticate_batch(self, uavs):
+        """Authenticate a fleet in one request, each identity signs its own nonce"""
+        return await self._request(
+            "POST", "/api/v1/uav/authenticate:batch",
+            lambda: {"authentications": [uav.authentication_data() for uav in uavs]},
+            "Failed to authenticate UAVs"
+        )
+
+    async def get_status(self, uav_id):
+        """Get a UAV's status"""
+        return await self._request("GET", f"/api/v1/uav/status/{uav_id}", None, "Failed to get UAV status")
+
+    async def _request(self, method, path, build_body, failure):
+        """Send a request with retries, build_body is called again for every attempt"""
+        async with self.limit:
+            for attempt in range(self.retries + 1):
+                try:
+                    response = await self.http.request(
+                        method, path, json=build_body() if build_body else None
+                    )
+                    if response.status_code not in RETRY_STATUS or attempt == self.retries:
+                        return response.json()
+                except httpx.TransportError as e:
+                    if attempt == self.retries:
+                        return {
+                            "success": False,
+                            "message": f"{failure}: {str(e) or type(e).__name__}",
+                            "data": None
+                        }
+                except ValueError as e:
+                    return {
+                        "success": False,
+                        "message": f"{failure}: {str(e)}",
+                        "data": None
+                    }
+
+                # Exponential backoff with full jitter so retrying clients spread out
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
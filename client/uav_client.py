@@ -1,136 +1,359 @@
-import requests
-import json
-import time
-import hashlib
-import uuid
-import base64
-from cryptography.hazmat.primitives.asymmetric import ed25519
-from cryptography.hazmat.primitives import serialization
-
-class UAVClient:
-    """Client for the UAV authentication system"""
-    
-    def __init__(self, server_url, uav_id=None, private_key=None):
-        """Initialize the UAV client"""
-        self.server_url = server_url
-        self.uav_id = uav_id or f"uav-{uuid.uuid4()}"
-        
-        # Generate or use provided key
-        if private_key:
-            if isinstance(private_key, str):
-                private_key = bytes.fromhex(private_key)
-            self.private_key = ed25519.Ed25519PrivateKey.from_private_bytes(private_key)
-        else:
-            self.private_key = ed25519.Ed25519PrivateKey.generate()
-            
-        # Get public key
-        self.public_key = self.private_key.public_key()
-    
-    def get_public_key_hex(self):
-        """Get the public key as hex string"""
-        return self.public_key.public_bytes(
-            encoding=serialization.Encoding.Raw,
-            format=serialization.PublicFormat.Raw
-        ).hex()
-    
-    def sign_message(self, message):
-        """Sign a message with the private key"""
-        if isinstance(message, str):
-            message = message.encode('utf-8')
-        signature = self.private_key.sign(message)
-        return signature.hex()
-    
-    def register(self, model, firmware_version):
-        """Register this UAV with the system"""
-        registration_data = {
-            "uav_id": self.uav_id,
-            "public_key": self.get_public_key_hex(),
-            "model": model,
-            "firmware_version": firmware_version
-        }
-        
-        try:
-            response = requests.post(
-                f"{self.server_url}/api/v1/uav/register",
-                json=registration_data
-            )
-            return response.json()
-        except Exception as e:
-            return {
-                "success": False,
-                "message": f"Failed to register UAV: {str(e)}",
-                "data": None
-            }
-    
-    def authenticate(self):
-        """Authenticate this UAV with the system"""
-        # Generate a unique nonce
-        nonce = uuid.uuid4().hex
-        timestamp = int(time.time())
-        
-        # Create message to sign
-        message = f"{self.uav_id}{nonce}{timestamp}"
-        signature = self.sign_message(message)
-        
-        authentication_data = {
-            "uav_id": self.uav_id,
-            "nonce": nonce,
-            "timestamp": timestamp,
-            "signature": signature
-        }
-        
-        try:
-            response = requests.post(
-                f"{self.server_url}/api/v1/uav/authenticate",
-                json=authentication_data
-            )
-            return response.json()
-        except Exception as e:
-            return {
-                "success": False,
-                "message": f"Failed to authenticate UAV: {str(e)}",
-                "data": None
-            }
-    
-    def get_status(self):
-        """Get this UAV's status"""
-        try:
-            response = requests.get(
-                f"{self.server_url}/api/v1/uav/status/{self.uav_id}"
-            )
-            return response.json()
-        except Exception as e:
-            return {
-                "success": False,
-                "message": f"Failed to get UAV status: {str(e)}",
-                "data": None
-            }
-    
-    def save_keys(self, filename):
-        """Save keys to a file for later use"""
-        private_bytes = self.private_key.private_bytes(
-            encoding=serialization.Encoding.Raw,
-            format=serialization.PrivateFormat.Raw,
-            encryption_algorithm=serialization.NoEncryption()
-        )
-        
-        key_data = {
-            "uav_id": self.uav_id,
-            "private_key": private_bytes.hex(),
-            "public_key": self.get_public_key_hex()
-        }
-        
-        with open(filename, 'w') as f:
-            json.dump(key_data, f, indent=2)
-    
-    @classmethod
-    def load_from_file(cls, filename, server_url):
-        """Load a client from saved keys"""
-        with open(filename, 'r') as f:
-            key_data = json.load(f)
-        
-        return cls(
-            server_url=server_url,
-            uav_id=key_data["uav_id"],
-            private_key=key_data["private_key"]
-        )
\ No newline at end of file
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import json
+import threading
+import time
+import hashlib
+import uuid
+import base64
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from cryptography.hazmat.primitives import serialization
+
+# Connections kept open per host by each pooled session
+POOL_SIZE = 32
+# Attempts for requests that failed before reaching the server
+RETRIES = 3
+
+_shared_session = None
+_thread_sessions = threading.local()
+
+
+def create_session(pool_size=POOL_SIZE, retries=RETRIES, backoff=0.1):
+    """Create a keep-alive session with connection pooling
+    
+    Failed connections are retried with exponential backoff, and so are
+    GET requests answered with 502/503/504. POST requests are never resent
+    once they reached the server, because a resent authentication would be
+    rejected as a replay.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=(502, 503, 504),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def thread_session():
+    """Pooled session of the calling thread, used by clients that were not given their own
+    
+    requests.Session is not thread-safe, so every thread gets its own. The
+    clients used from one thread still share its connections.
+    """
+    session = getattr(_thread_sessions, 'session', None)
+    if session is None:
+        session = _thread_sessions.session = create_session()
+    return session
+
+
+def shared_session():
+    """One session for the whole process, for clients that opt in with session=shared_session()
+    
+    Only safe while the clients that share it are used from one thread at a time.
+    """
+    global _shared_session
+    if _shared_session is None:
+        _shared_session = create_session()
+    return _shared_session
+
+
+class UAVClient:
+    """Client for the UAV authentication system"""
+    
+    def __init__(self, server_url, uav_id=None, private_key=None, session=None):
+        """Initialize the UAV client
+        
+        Requests go through session, by default the pooled session of the
+        thread that makes the request, so a fleet driven from one thread
+        reuses the same connections and clients can be used from any thread.
+        """
+        self.server_url = server_url
+        self.uav_id = uav_id or f"uav-{uuid.uuid4()}"
+        self._session = session
+        # Issued by the server on authentication when session tokens are enabled
+        self.session_token = None
+        
+        # Generate or use provided key
+        if private_key:
+            if isinstance(private_key, str):
+                private_key = bytes.fromhex(private_key)
+            self.private_key = ed25519.Ed25519PrivateKey.from_private_bytes(private_key)
+        else:
+            self.private_key = ed25519.Ed25519PrivateKey.generate()
+            
+        # Get public key
+        self.public_key = self.private_key.public_key()
+    
+    @property
+    def session(self):
+        """Session for requests made from the calling thread"""
+        return self._session or thread_session()
+    
+    def get_public_key_hex(self):
+        """Get the public key as hex string"""
+        return self.public_key.public_bytes(
+            encoding=serialization.Encoding.Raw,
+            format=serialization.PublicFormat.Raw
+        ).hex()
+    
+    def sign_message(self, message):
+        """Sign a message with the private key"""
+        if isinstance(message, str):
+            message = message.encode('utf-8')
+        signature = self.private_key.sign(message)
+        return signature.hex()
+    
+    def registration_data(self, model, firmware_version):
+        """Build the registration request body for this UAV"""
+        return {
+            "uav_id": self.uav_id,
+            "public_key": self.get_public_key_hex(),
+            "model": model,
+            "firmware_version": firmware_version
+        }
+    
+    def authentication_data(self, nonce=None):
+        """Build a signed authentication request body, with a fresh nonce unless given a challenge"""
+        # Generate a unique nonce
+        nonce = nonce or uuid.uuid4().hex
+        timestamp = int(time.time())
+        
+        # Create message to sign
+        message = f"{self.uav_id}{nonce}{timestamp}"
+        signature = self.sign_message(message)
+        
+        return {
+            "uav_id": self.uav_id,
+            "nonce": nonce,
+            "timestamp": timestamp,
+            "signature": signature
+        }
+    
+    def register(self, model, firmware_version):
+        """Register this UAV with the system"""
+        registration_data = self.registration_data(model, firmware_version)
+        
+        try:
+            response = self.session.post(
+                f"{self.server_url}/api/v1/uav/register",
+                json=registration_data
+            )
+            return response.json()
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Failed to register UAV: {str(e)}",
+                "data": None
+            }
+    
+    def authenticate(self, nonce=None):
+        """Authenticate this UAV with the system, signing nonce if given"""
+        authentication_data = self.authentication_data(nonce)
+        
+        try:
+            response = self.session.post(
+                f"{self.server_url}/api/v1/uav/authenticate",
+                json=authentication_data
+            )
+            result = response.json()
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Failed to authenticate UAV: {str(e)}",
+                "data": None
+            }
+        
+        if result.get("success"):
+            self.session_token = result["data"].get("session_token")
+        return result
+    
+    def authenticate_with_challenge(self):
+        """Fetch a challenge and authenticate with it, both over the same kept-alive connection"""
+        try:
+            response = self.session.get(f"{self.server_url}/api/v1/uav/{self.uav_id}/challenge")
+            challenge = response.json()
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Failed to get challenge: {str(e)}",
+                "data": None
+            }
+        
+        if not challenge.get("success"):
+            return challenge
+        return self.authenticate(challenge["data"]["nonce"])
+    
+    def verify_session(self, token=None):
+        """Check a session token, by default the one from the last authentication"""
+        token = token or self.session_token
+        if not token:
+            return {
+                "success": False,
+                "message": "No session token, authenticate first",
+                "data": None
+            }
+        
+        try:
+            response = self.session.post(
+                f"{self.server_url}/api/v1/session/verify",
+                json={"token": token}
+            )
+            return response.json()
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Failed to verify session: {str(e)}",
+                "data": None
+            }
+    
+    def revoke(self):
+        """Revoke this UAV, after which it can no longer authenticate"""
+        timestamp = int(time.time())
+        revocation_data = {
+            "uav_id": self.uav_id,
+            "timestamp": timestamp,
+            "signature": self.sign_message(f"revoke:{self.uav_id}{timestamp}")
+        }
+        
+        try:
+            response = self.session.post(
+                f"{self.server_url}/api/v1/uav/revoke",
+                json=revocation_data
+            )
+            return response.json()
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Failed to revoke UAV: {str(e)}",
+                "data": None
+            }
+    
+    def rotate_key(self, private_key=None):
+        """Replace this UAV's key, signed with the current one, and switch to the new key on success"""
+        new_private_key = private_key or ed25519.Ed25519PrivateKey.generate()
+        public_key = new_private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.Raw,
+            format=serialization.PublicFormat.Raw
+        ).hex()
+        timestamp = int(time.time())
+        rotation_data = {
+            "uav_id": self.uav_id,
+            "public_key": public_key,
+            "timestamp": timestamp,
+            "signature": self.sign_message(f"rotate:{self.uav_id}{public_key}{timestamp}")
+        }
+        
+        try:
+            response = self.session.post(
+                f"{self.server_url}/api/v1/uav/rotate-key",
+                json=rotation_data
+            )
+            result = response.json()
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Failed to rotate key: {str(e)}",
+                "data": None
+            }
+        
+        if result.get("success"):
+            self.private_key = new_private_key
+            self.public_key = new_private_key.public_key()
+        return result
+    
+    @staticmethod
+    def register_batch(server_url, clients, model, firmware_version, session=None):
+        """Register a fleet of UAVs in one request
+        
+        Every client in the list is registered with the same model and
+        firmware version. The response has one result per UAV, in order.
+        """
+        batch_data = {
+            "registrations": [client.registration_data(model, firmware_version) for client in clients]
+        }
+        
+        try:
+            response = (session or thread_session()).post(
+                f"{server_url}/api/v1/uav/register:batch",
+                json=batch_data
+            )
+            return response.json()
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Failed to register UAVs: {str(e)}",
+                "data": None
+            }
+    
+    @staticmethod
+    def authenticate_batch(server_url, clients, session=None):
+        """Authenticate a fleet of UAVs in one request, each signs its own nonce"""
+        batch_data = {
+            "authentications": [client.authentication_data() for client in clients]
+        }
+        
+        try:
+            response = (session or thread_session()).post(
+                f"{server_url}/api/v1/uav/authenticate:batch",
+                json=batch_data
+            )
+            return response.json()
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Failed to authenticate UAVs: {str(e)}",
+                "data": None
+            }
+    
+    def get_status(self):
+        """Get this UAV's status"""
+        try:
+            response = self.session.get(
+                f"{self.server_url}/api/v1/uav/status/{self.uav_id}"
+            )
+            return response.json()
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Failed to get UAV status: {str(e)}",
+                "data": None
+            }
+    
+    def save_keys(self, filename):
+        """Save keys to a file for later use"""
+        private_bytes = self.private_key.private_bytes(
+            encoding=serialization.Encoding.Raw,
+            format=serialization.PrivateFormat.Raw,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        
+        key_data = {
+            "uav_id": self.uav_id,
+            "private_key": private_bytes.hex(),
+            "public_key": self.get_public_key_hex()
+        }
+        
+        with open(filename, 'w') as f:
+            json.dump(key_data, f, indent=2)
+    
+    @classmethod
+    def load_from_file(cls, filename, server_url, session=None):
+        """Load a client from saved keys"""
+        with open(filename, 'r') as f:
+            key_data = json.load(f)
+        
+        return cls(
+            server_url=server_url,
+            uav_id=key_data["uav_id"],
+            private_key=key_data["private_key"],
+            session=session
+        )
@@ -0,0 +1,51 @@
+import hashlib
+import hmac
+import itertools
+import os
+import struct
+import time
+
+# Counter and expiry of a challenge, followed by the truncated MAC
+CHALLENGE_FIELDS = struct.Struct('>Qq')
+MAC_SIZE = 16
+CHALLENGE_LENGTH = 2 * (CHALLENGE_FIELDS.size + MAC_SIZE)
+
+
+class ChallengeIssuer:
+    """Issues authentication nonces that carry their own proof of origin
+
+    A challenge is the hex of a counter, an expiry time and an HMAC-SHA256
+    over the uav_id, counter and expiry. Checking one only needs the key, so
+    nothing is stored when it is issued, and every process that shares the
+    key can check the challenges of every other. The counter starts at a
+    random offset so processes never hand the same UAV the same challenge.
+    """
+
+    def __init__(self, key=None, ttl=30):
+        """key is the raw HMAC key, a new one is generated without one"""
+        self.key = key or os.urandom(32)
+        self.ttl = ttl
+        self._counter = itertools.count(int.from_bytes(os.urandom(4), 'big') << 32)
+
+    def issue(self, uav_id, now=None):
+        """Issue a challenge for a UAV, returns (nonce, expires_at)"""
+        expires_at = int(now or time.time()) + self.ttl
+        fields = CHALLENGE_FIELDS.pack(next(self._counter), expires_at)
+        return (fields + self._mac(uav_id, fields)).hex(), expires_at
+
+    def check(self, uav_id, nonce, now=None):
+        """Check that a nonce is an unexpired challenge issued for this UAV"""
+        if len(nonce) != CHALLENGE_LENGTH:
+            return False
+        try:
+            raw = bytes.fromhex(nonce)
+        except ValueError:
+            return False
+        fields, mac = raw[:CHALLENGE_FIELDS.size], raw[CHALLENGE_FIELDS.size:]
+        if not hmac.compare_digest(mac, self._mac(uav_id, fields)):
+            return False
+        _, expires_at = CHALLENGE_FIELDS.unpack(fields)
+        return expires_at > (now or time.time())
+
+    def _mac(self, uav_id, fields):
+        return hmac.new(self.key, uav_id.encode('utf-8') + fields, hashlib.sha256).digest()[:MAC_SIZE]
@@ -0,0 +1,73 @@
+import hashlib
+
+# Leaves and inner nodes are hashed with different prefixes so one can never pass for the other
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+# Root of a block without transactions
+EMPTY_ROOT = hashlib.sha256(b'').digest()
+
+
+def hash_leaf(data):
+    """Hash encoded leaf data into a raw Merkle leaf"""
+    return hashlib.sha256(LEAF_PREFIX + data).digest()
+
+
+def hash_pair(left, right):
+    """Hash two raw child nodes into their parent"""
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def merkle_root(leaf_hashes):
+    """Compute the Merkle root of a list of raw leaf hashes
+
+    An unpaired node at the end of a level is carried up unchanged.
+    """
+    if not leaf_hashes:
+        return EMPTY_ROOT
+
+    level = list(leaf_hashes)
+    while len(level) > 1:
+        next_level = [hash_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            next_level.append(level[-1])
+        level = next_level
+    return level[0]
+
+
+def merkle_proof(leaf_hashes, index):
+    """Build the inclusion proof for the leaf at index
+
+    Returns a list of {'hash', 'position'} steps from the leaf up to the
+    root, position says on which side the sibling goes.
+    """
+    if index < 0 or index >= len(leaf_hashes):
+        raise IndexError("leaf index out of range")
+
+    proof = []
+    level = list(leaf_hashes)
+    while len(level) > 1:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append({
+                'hash': level[sibling],
+                'position': 'left' if sibling < index else 'right'
+            })
+
+        next_level = [hash_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            next_level.append(level[-1])
+        level = next_level
+        index //= 2
+    return proof
+
+
+def verify_proof(leaf_hash, proof, root):
+    """Check an inclusion proof from merkle_proof against a Merkle root"""
+    current = leaf_hash
+    for step in proof:
+        if step['position'] == 'left':
+            current = hash_pair(step['hash'], current)
+        else:
+            current = hash_pair(current, step['hash'])
+    return current == root
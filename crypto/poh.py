@@ -1,76 +1,374 @@
-import hashlib
-import time
-import json
-
-class ProofOfHistory:
-    """Implements a simplified Proof of History mechanism"""
-    
-    def __init__(self):
-        """Initialize with a genesis hash"""
-        self.current_hash = hashlib.sha256("UAV Authentication System Genesis".encode()).hexdigest()
-        self.ticks = []
-        self.tick_count = 0
-        
-    def tick(self, data=None):
-        """Generate a new tick in the PoH sequence"""
-        prev_hash = self.current_hash
-        timestamp = int(time.time())
-        
-        # Combine previous hash with data (if any)
-        message = prev_hash
-        if data:
-            if isinstance(data, dict) or isinstance(data, list):
-                message += json.dumps(data, sort_keys=True)
-            else:
-                message += str(data)
-        
-        # Generate new hash
-        new_hash = hashlib.sha256(message.encode()).hexdigest()
-        self.current_hash = new_hash
-        self.tick_count += 1
-        
-        # Create tick record
-        tick = {
-            'sequence': self.tick_count,
-            'prev_hash': prev_hash,
-            'hash': new_hash,
-            'data': data,
-            'timestamp': timestamp
-        }
-        
-        self.ticks.append(tick)
-        return tick
-    
-    def verify_sequence(self, start_idx=0, end_idx=None):
-        """Verify that a sequence of ticks is valid"""
-        if end_idx is None:
-            end_idx = len(self.ticks)
-        
-        if start_idx >= end_idx or start_idx < 0 or end_idx > len(self.ticks):
-            return False
-        
-        for i in range(start_idx + 1, end_idx):
-            prev_tick = self.ticks[i-1]
-            curr_tick = self.ticks[i]
-            
-            # Verify prev_hash matches
-            if curr_tick['prev_hash'] != prev_tick['hash']:
-                return False
-                
-            # Verify sequence number
-            if curr_tick['sequence'] != prev_tick['sequence'] + 1:
-                return False
-                
-            # Verify hash calculation
-            message = prev_tick['hash']
-            if curr_tick['data']:
-                if isinstance(curr_tick['data'], dict) or isinstance(curr_tick['data'], list):
-                    message += json.dumps(curr_tick['data'], sort_keys=True)
-                else:
-                    message += str(curr_tick['data'])
-            
-            expected_hash = hashlib.sha256(message.encode()).hexdigest()
-            if curr_tick['hash'] != expected_hash:
-                return False
-                
-        return True
\ No newline at end of file
+import bisect
+import hashlib
+import os
+import struct
+import threading
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+# Starting point of every PoH sequence, all PoH hashes are raw 32-byte digests
+GENESIS_HASH = hashlib.sha256("UAV Authentication System Genesis".encode()).digest()
+
+# sequence, timestamp, prev_hash, hash and the length of the data that follows
+TICK_FIELDS = struct.Struct('>Qq32s32sH')
+
+def hash_tick(prev_hash, data=None):
+    """Hash the previous PoH hash together with the tick data (if any)"""
+    if data:
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        return hashlib.sha256(prev_hash + data).digest()
+    return hashlib.sha256(prev_hash).digest()
+
+def verify_tick(prev_tick, tick):
+    """Verify that a tick correctly follows the previous one"""
+    # Verify prev_hash matches
+    if tick.prev_hash != prev_tick.hash:
+        return False
+    
+    # Verify sequence number
+    if tick.sequence != prev_tick.sequence + 1:
+        return False
+    
+    # Verify hash calculation
+    return tick.hash == hash_tick(prev_tick.hash, tick.data)
+
+class Tick:
+    """A single PoH tick with a fixed-width binary encoding"""
+    
+    __slots__ = ('sequence', 'prev_hash', 'hash', 'data', 'timestamp')
+    
+    def __init__(self, sequence, prev_hash, hash, data, timestamp):
+        self.sequence = sequence
+        self.prev_hash = prev_hash
+        self.hash = hash
+        self.data = data
+        self.timestamp = timestamp
+    
+    def encode(self):
+        """Encode the tick as fixed-width fields followed by its data"""
+        data = self.data or b''
+        return TICK_FIELDS.pack(self.sequence, self.timestamp, self.prev_hash, self.hash, len(data)) + data
+    
+    @classmethod
+    def decode(cls, buffer, offset=0):
+        """Decode a tick written with encode, returns (tick, new offset)"""
+        sequence, timestamp, prev_hash, tick_hash, length = TICK_FIELDS.unpack_from(buffer, offset)
+        offset += TICK_FIELDS.size
+        data = bytes(buffer[offset:offset + length]) or None
+        return cls(sequence, prev_hash, tick_hash, data, timestamp), offset + length
+    
+    def to_dict(self):
+        """Convert tick to the dictionary form used by the API"""
+        return {
+            'sequence': self.sequence,
+            'prev_hash': self.prev_hash.hex(),
+            'hash': self.hash.hex(),
+            'data': self.data.hex() if self.data else None,
+            'timestamp': self.timestamp
+        }
+
+# Ticks being verified by a pool worker, handed over once when the worker starts
+_worker_ticks = None
+
+def _init_worker(ticks):
+    """Pool initializer, with fork the ticks are inherited instead of pickled"""
+    global _worker_ticks
+    _worker_ticks = ticks
+
+def find_invalid_tick(ticks, start_idx, end_idx):
+    """Check ticks[start_idx:end_idx] against their predecessors
+    
+    Returns the index of the first tick that does not follow the one before
+    it, or None if the whole range is valid.
+    """
+    for i in range(start_idx, end_idx):
+        if not verify_tick(ticks[i-1], ticks[i]):
+            return i
+    return None
+
+def _verify_worker_segment(start_idx, end_idx):
+    """Verify one segment of the ticks held by this worker"""
+    return find_invalid_tick(_worker_ticks, start_idx, end_idx)
+
+class ProofOfHistory:
+    """Implements a simplified Proof of History mechanism"""
+    
+    def __init__(self, ticks=None, clock=time.time):
+        """Initialize with a genesis hash
+        
+        ticks can be a read-only view of ticks that are stored elsewhere, e.g.
+        inside persisted blocks. New ticks are then not recorded here. clock
+        returns the unix time that ticks are stamped with.
+        """
+        self.clock = clock
+        self.current_hash = GENESIS_HASH
+        self.external_ticks = ticks is not None
+        self.ticks = ticks if ticks is not None else []
+        self.tick_count = 0
+        # Ticks before this one were pruned down to their hashes and are trusted through a checkpoint
+        self.trusted_index = 0
+        
+    def tick(self, data=None):
+        """Generate a new tick in the PoH sequence"""
+        prev_hash = self.current_hash
+        timestamp = int(self.clock())
+        
+        # Combine previous hash with data (if any)
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        new_hash = hash_tick(prev_hash, data)
+        self.current_hash = new_hash
+        self.tick_count += 1
+        
+        # Create tick record
+        tick = Tick(self.tick_count, prev_hash, new_hash, data or None, timestamp)
+        
+        if not self.external_ticks:
+            self.ticks.append(tick)
+        return tick
+    
+    def next_tick(self, data=None):
+        """The tick that tick(data) would generate, without advancing the sequence
+        
+        Pass it to append once whatever commits to it has been built.
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        return Tick(self.tick_count + 1, self.current_hash, hash_tick(self.current_hash, data),
+                    data or None, int(self.clock()))
+    
+    def append(self, tick):
+        """Continue the sequence with a tick generated elsewhere, e.g. by a leader node"""
+        if not self.external_ticks:
+            self.ticks.append(tick)
+        self.current_hash = tick.hash
+        self.tick_count = tick.sequence
+    
+    def restore(self, ticks):
+        """Continue the sequence from previously recorded ticks"""
+        if not self.external_ticks:
+            self.ticks = list(ticks)
+        self.current_hash = ticks[-1].hash
+        self.tick_count = ticks[-1].sequence
+    
+    def verify_sequence(self, start_idx=None, end_idx=None):
+        """Verify that a sequence of ticks is valid, by default from the trusted tick on"""
+        if start_idx is None:
+            start_idx = self.trusted_index
+        if end_idx is None:
+            end_idx = len(self.ticks)
+        
+        if start_idx >= end_idx or start_idx < 0 or end_idx > len(self.ticks):
+            return False
+        
+        for i in range(start_idx + 1, end_idx):
+            if not verify_tick(self.ticks[i-1], self.ticks[i]):
+                return False
+                
+        return True
+    
+    def verify_parallel(self, start_idx=0, end_idx=None, workers=None, segment_size=None):
+        """Verify a range of ticks on multiple cores
+        
+        Generating the sequence is inherently serial, but each tick can be
+        checked given only the tick before it. The range is split into
+        segments that are verified in a process pool. Returns the index of the
+        first bad tick, or None if the range is valid.
+        """
+        if end_idx is None:
+            end_idx = len(self.ticks)
+        if start_idx < 0 or end_idx > len(self.ticks) or start_idx >= end_idx:
+            raise IndexError("tick range out of bounds")
+        
+        # The first tick of the range is only checked against the next one
+        first = start_idx + 1
+        count = end_idx - first
+        workers = workers or os.cpu_count() or 1
+        if segment_size is None:
+            segment_size = max(1, -(-count // (workers * 4)))
+        
+        if workers == 1 or count <= segment_size:
+            return find_invalid_tick(self.ticks, first, end_idx)
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self.ticks,)) as executor:
+            futures = [
+                executor.submit(_verify_worker_segment, start, min(start + segment_size, end_idx))
+                for start in range(first, end_idx, segment_size)
+            ]
+            
+            # Segments are in sequence order, so the first failure is the earliest bad tick
+            for future in futures:
+                bad_index = future.result()
+                if bad_index is not None:
+                    for pending in futures:
+                        pending.cancel()
+                    return bad_index
+        return None
+
+
+def verify_clock_segment(start_count, start_hash, end_count, end_hash, events):
+    """Recompute a PoH clock segment between two checkpoints
+    
+    events is a list of (count, event_hash) mixed in after start_count and up
+    to end_count, all hashes are raw 32-byte digests.
+    """
+    sha256 = hashlib.sha256
+    current = start_hash
+    count = start_count
+    for event_count, event_hash in events:
+        for _ in range(event_count - count - 1):
+            current = sha256(current).digest()
+        current = sha256(current + event_hash).digest()
+        count = event_count
+    for _ in range(end_count - count):
+        current = sha256(current).digest()
+    return current == end_hash
+
+class PoHClock:
+    """Continuous Proof of History clock
+    
+    A background thread runs a tight sha256 loop over raw 32-byte digests.
+    Only every checkpoint_every-th hash is kept, as (count, hash) in compact
+    arrays, and events such as transaction hashes are mixed into the sequence
+    as they arrive. Their order can be proven by recomputing the hashes
+    between two checkpoints, without a Python dict per tick. Only the latest
+    max_checkpoints checkpoints and the events after the oldest of them are
+    kept, so memory stays flat however long the clock runs.
+    """
+    
+    def __init__(self, checkpoint_every=100000, ticks_per_second=None, batch_size=1000, max_checkpoints=4096):
+        """ticks_per_second caps the hash rate, None runs as fast as possible"""
+        self.checkpoint_every = checkpoint_every
+        self.ticks_per_second = ticks_per_second
+        self.batch_size = batch_size
+        self.max_checkpoints = max_checkpoints
+        
+        self.current = GENESIS_HASH
+        self.count = 0
+        self.checkpoint_counts = array('Q', [0])
+        self.checkpoint_hashes = bytearray(self.current)
+        self.event_counts = array('Q')
+        self.event_hashes = bytearray()
+        
+        self.hashes_per_second = 0.0
+        self.lock = threading.Lock()
+        self._running = False
+        self._thread = None
+    
+    def start(self):
+        """Start hashing in a background thread"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="poh-clock", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the background thread"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def advance(self, hashes):
+        """Run the hash chain forward by a number of plain hashes"""
+        with self.lock:
+            sha256 = hashlib.sha256
+            current = self.current
+            while hashes:
+                # Hash up to the next checkpoint without any bookkeeping in the loop
+                steps = min(hashes, self.checkpoint_every - self.count % self.checkpoint_every)
+                for _ in range(steps):
+                    current = sha256(current).digest()
+                self.count += steps
+                hashes -= steps
+                if self.count % self.checkpoint_every == 0:
+                    self._checkpoint(current)
+            self.current = current
+    
+    def mix(self, event_hash):
+        """Mix a raw event hash into the sequence, returns (count, raw hash)"""
+        with self.lock:
+            self.current = hashlib.sha256(self.current + event_hash).digest()
+            self.count += 1
+            self.event_counts.append(self.count)
+            self.event_hashes += event_hash
+            if self.count % self.checkpoint_every == 0:
+                self._checkpoint(self.current)
+            return self.count, self.current
+    
+    def position(self):
+        """Current (count, hash hex) of the clock"""
+        with self.lock:
+            return self.count, self.current.hex()
+    
+    def get_checkpoint(self, index):
+        """Get checkpoint index as (count, raw hash)"""
+        return self.checkpoint_counts[index], bytes(self.checkpoint_hashes[index * 32:(index + 1) * 32])
+    
+    def get_events(self, start_count, end_count):
+        """Events mixed in after start_count and up to end_count, as (count, raw hash)"""
+        first = bisect.bisect_right(self.event_counts, start_count)
+        last = bisect.bisect_right(self.event_counts, end_count)
+        return [
+            (self.event_counts[i], bytes(self.event_hashes[i * 32:(i + 1) * 32]))
+            for i in range(first, last)
+        ]
+    
+    def verify(self, workers=None):
+        """Verify every checkpoint segment on multiple cores
+        
+        Returns the index of the first checkpoint that does not follow from
+        the one before it, or None if the recorded history is valid.
+        """
+        with self.lock:
+            segments = []
+            for i in range(1, len(self.checkpoint_counts)):
+                start_count, start_hash = self.get_checkpoint(i - 1)
+                end_count, end_hash = self.get_checkpoint(i)
+                segments.append((start_count, start_hash, end_count, end_hash, self.get_events(start_count, end_count)))
+        
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(segments) <= 1:
+            results = [verify_clock_segment(*segment) for segment in segments]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(verify_clock_segment, *zip(*segments)))
+        
+        for i, valid in enumerate(results):
+            if not valid:
+                return i + 1
+        return None
+    
+    def _checkpoint(self, current):
+        """Record the hash at the current count, called with the lock held"""
+        self.checkpoint_counts.append(self.count)
+        self.checkpoint_hashes += current
+        
+        # Events before the oldest checkpoint can no longer be proven, drop both together
+        dropped = len(self.checkpoint_counts) - self.max_checkpoints
+        if dropped > 0:
+            del self.checkpoint_counts[:dropped]
+            del self.checkpoint_hashes[:dropped * 32]
+            stale = bisect.bisect_right(self.event_counts, self.checkpoint_counts[0])
+            del self.event_counts[:stale]
+            del self.event_hashes[:stale * 32]
+    
+    def _run(self):
+        """Background hashing loop, optionally paced to ticks_per_second"""
+        window_started = time.perf_counter()
+        window_count = self.count
+        while self._running:
+            batch_started = time.perf_counter()
+            self.advance(self.batch_size)
+            
+            now = time.perf_counter()
+            if now - window_started >= 1.0:
+                self.hashes_per_second = (self.count - window_count) / (now - window_started)
+                window_started = now
+                window_count = self.count
+            
+            if self.ticks_per_second:
+                time.sleep(max(0.0, self.batch_size / self.ticks_per_second - (now - batch_started)))
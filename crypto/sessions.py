@@ -0,0 +1,121 @@
+import base64
+import hashlib
+import os
+import struct
+import time
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from blockchain.encoding import pack_str, unpack_str
+
+# session id, issued at, expires at, key id, followed by the uav_id
+SESSION_FIELDS = struct.Struct('>16sqq8s')
+KEY_ID_SIZE = 8
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def key_id(public_key):
+    """Short fingerprint of a raw public key, binds a token to the key it was earned with"""
+    return hashlib.sha256(public_key).digest()[:KEY_ID_SIZE]
+
+
+class Session:
+    """The claims of a session token"""
+
+    __slots__ = ('uav_id', 'session_id', 'issued_at', 'expires_at', 'key_id')
+
+    def __init__(self, uav_id, session_id, issued_at, expires_at, key_id):
+        self.uav_id = uav_id
+        self.session_id = session_id
+        self.issued_at = issued_at
+        self.expires_at = expires_at
+        self.key_id = key_id
+
+    def encode(self):
+        """Binary form of the claims, this is what gets signed"""
+        return SESSION_FIELDS.pack(self.session_id, self.issued_at, self.expires_at, self.key_id) + pack_str(self.uav_id)
+
+    @classmethod
+    def decode(cls, payload):
+        """Decode claims written with encode"""
+        session_id, issued_at, expires_at, key_id = SESSION_FIELDS.unpack_from(payload, 0)
+        uav_id, _ = unpack_str(payload, SESSION_FIELDS.size)
+        return cls(uav_id, session_id, issued_at, expires_at, key_id)
+
+    def to_dict(self):
+        return {
+            'uav_id': self.uav_id,
+            'session_id': self.session_id.hex(),
+            'issued_at': self.issued_at,
+            'expires_at': self.expires_at,
+            'key_id': self.key_id.hex()
+        }
+
+
+class SessionSigner:
+    """Issues and checks short-lived session tokens signed with the server's Ed25519 key
+
+    A token is the base64url claims and signature joined by a dot. Checking
+    one needs only the public key and the clock, no lookups, so ground
+    infrastructure can check tokens itself without calling the server.
+    Tokens carry the key_id of the UAV key they were earned with, which
+    lets the server end them when the UAV is revoked or rotates its key.
+    """
+
+    def __init__(self, private_key=None, ttl=300):
+        """private_key is a raw 32-byte Ed25519 seed, a new key is generated without one"""
+        if private_key:
+            self.private_key = ed25519.Ed25519PrivateKey.from_private_bytes(private_key)
+        else:
+            self.private_key = ed25519.Ed25519PrivateKey.generate()
+        self.public_key = self.private_key.public_key()
+        self.ttl = ttl
+
+    def public_key_hex(self):
+        """Raw public key as hex, what token checkers need"""
+        return self.public_key.public_bytes(
+            encoding=serialization.Encoding.Raw,
+            format=serialization.PublicFormat.Raw
+        ).hex()
+
+    def issue(self, uav_id, public_key, now=None):
+        """Start a session for a UAV that just authenticated with raw public_key, returns (token, session)"""
+        issued_at = int(now or time.time())
+        session = Session(uav_id, os.urandom(16), issued_at, issued_at + self.ttl, key_id(public_key))
+        claims = session.encode()
+        token = f"{_b64encode(claims)}.{_b64encode(self.private_key.sign(claims))}"
+        return token, session
+
+    def verify(self, token, now=None):
+        """Check a token's signature and expiry, returns its Session or None
+
+        This does not know about revocations or key rotations, check the
+        session against the UAV's current key with is_current.
+        """
+        try:
+            claims_text, signature_text = token.split('.')
+            claims = _b64decode(claims_text)
+            self.public_key.verify(_b64decode(signature_text), claims)
+            session = Session.decode(claims)
+        except (ValueError, InvalidSignature, struct.error):
+            return None
+        if session.expires_at <= (now or time.time()):
+            return None
+        return session
+
+    @staticmethod
+    def is_current(session, key_state):
+        """Whether a verified session still stands, key_state is the UAV's (public_key, revoked) or None"""
+        if key_state is None:
+            return False
+        public_key, revoked = key_state
+        return not revoked and key_id(public_key) == session.key_id
@@ -0,0 +1,181 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+# Keys parsed inside process pool workers, those cannot share the parent's cache
+_worker_keys = OrderedDict()
+_WORKER_CACHE_SIZE = 10000
+
+
+def auth_message(uav_id, nonce, timestamp):
+    """Build the message a UAV signs when authenticating"""
+    return f"{uav_id}{nonce}{timestamp}".encode('utf-8')
+
+
+def revoke_message(uav_id, timestamp):
+    """Build the message a UAV signs to revoke its own key"""
+    return f"revoke:{uav_id}{timestamp}".encode('utf-8')
+
+
+def rotate_key_message(uav_id, public_key_hex, timestamp):
+    """Build the message a UAV signs with its current key to replace it"""
+    return f"rotate:{uav_id}{public_key_hex}{timestamp}".encode('utf-8')
+
+
+def load_public_key(public_key_hex):
+    """Parse a hex encoded raw Ed25519 public key"""
+    return ed25519.Ed25519PublicKey.from_public_bytes(bytes.fromhex(public_key_hex))
+
+
+def verify_signature(public_key, message, signature_hex):
+    """Verify an Ed25519 signature given as hex against a parsed public key"""
+    try:
+        public_key.verify(bytes.fromhex(signature_hex), message)
+        return True
+    except (InvalidSignature, ValueError):
+        return False
+
+
+def _verify_chunk(items):
+    """Verify (public_key_hex, message, signature_hex) items in a pool worker"""
+    results = []
+    for public_key_hex, message, signature_hex in items:
+        public_key = _worker_keys.get(public_key_hex)
+        if public_key is None:
+            try:
+                public_key = load_public_key(public_key_hex)
+            except ValueError:
+                results.append(False)
+                continue
+            _worker_keys[public_key_hex] = public_key
+            if len(_worker_keys) > _WORKER_CACHE_SIZE:
+                _worker_keys.popitem(last=False)
+        results.append(verify_signature(public_key, message, signature_hex))
+    return results
+
+
+class VerifyingKeyCache:
+    """Bounded LRU cache of parsed Ed25519 public keys keyed by uav_id"""
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.keys = OrderedDict()  # uav_id -> (public_key_hex, Ed25519PublicKey)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def get(self, uav_id, public_key_hex):
+        """Get the parsed key for a UAV, parsing and caching it on a miss"""
+        with self.lock:
+            entry = self.keys.get(uav_id)
+            # A different hex key means the UAV was registered again
+            if entry is not None and entry[0] == public_key_hex:
+                self.keys.move_to_end(uav_id)
+                self.hits += 1
+                return entry[1]
+
+        public_key = load_public_key(public_key_hex)
+
+        with self.lock:
+            self.misses += 1
+            self.keys[uav_id] = (public_key_hex, public_key)
+            self.keys.move_to_end(uav_id)
+            while len(self.keys) > self.max_size:
+                self.keys.popitem(last=False)
+        return public_key
+
+    def invalidate(self, uav_id):
+        """Forget the cached key for a UAV"""
+        with self.lock:
+            self.keys.pop(uav_id, None)
+
+
+class SignatureVerifier:
+    """Verifies UAV signatures with a key cache and an optional worker pool
+
+    executor can be None to verify in the calling thread, "thread" or
+    "process" to fan batches out to a pool of the given number of workers.
+    """
+
+    def __init__(self, cache_size=10000, executor=None, workers=None):
+        self.key_cache = VerifyingKeyCache(cache_size)
+        self.executor_type = executor
+        self.workers = workers or 4
+
+        if executor == "thread":
+            self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        elif executor == "process":
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        elif executor is None:
+            self.executor = None
+        else:
+            raise ValueError(f"Unknown verification executor: {executor}")
+
+    def load_key(self, uav_id, public_key_hex):
+        """Parse and cache a UAV's key, raises ValueError if it is malformed"""
+        return self.key_cache.get(uav_id, public_key_hex)
+
+    def invalidate(self, uav_id):
+        """Forget the cached key for a UAV, e.g. on re-registration"""
+        self.key_cache.invalidate(uav_id)
+
+    def verify(self, uav_id, public_key_hex, message, signature_hex):
+        """Verify a single signature"""
+        if self.executor is not None:
+            return self.verify_batch([(uav_id, public_key_hex, message, signature_hex)])[0]
+        return self._verify_local(uav_id, public_key_hex, message, signature_hex)
+
+    def verify_batch(self, items):
+        """Verify a list of (uav_id, public_key_hex, message, signature_hex) items
+
+        Returns a list of booleans in the same order. With a pool configured
+        the batch is split into one chunk per worker.
+        """
+        if not items:
+            return []
+
+        if self.executor is None:
+            return [self._verify_local(*item) for item in items]
+
+        chunk_size = max(1, -(-len(items) // self.workers))
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+        if self.executor_type == "process":
+            # Workers keep their own key cache, send them the hex keys
+            raw_chunks = [[(pk, msg, sig) for _, pk, msg, sig in chunk] for chunk in chunks]
+            chunk_results = self.executor.map(_verify_chunk, raw_chunks)
+        else:
+            chunk_results = self.executor.map(
+                lambda chunk: [self._verify_local(*item) for item in chunk], chunks
+            )
+
+        results = []
+        for chunk_result in chunk_results:
+            results.extend(chunk_result)
+        return results
+
+    async def verify_batch_async(self, items):
+        """Verify a batch without blocking the event loop"""
+        # The default executor waits on our pool, so the pool itself stays free for chunks
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.verify_batch, items)
+
+    def shutdown(self):
+        """Stop the worker pool"""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def _verify_local(self, uav_id, public_key_hex, message, signature_hex):
+        """Verify a signature in the calling thread using the key cache"""
+        try:
+            public_key = self.key_cache.get(uav_id, public_key_hex)
+        except ValueError:
+            return False
+        return verify_signature(public_key, message, signature_hex)
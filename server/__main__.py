@@ -0,0 +1,88 @@
+import argparse
+import os
+
+import uvicorn
+
+# Seconds to let requests finish on shutdown, replication streams to followers never finish by themselves
+GRACEFUL_SHUTDOWN = 5
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the UAV authentication server without auto reload")
+    parser.add_argument("--host", default="0.0.0.0", help="Bind address (default: 0.0.0.0)")
+    parser.add_argument("--port", type=int, default=8080, help="Port (default: 8080)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="HTTP worker processes, with more than one they share a separate ledger process (default: 1)")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="Ledger partitions by uav_id, each in its own process (default: 1)")
+    parser.add_argument("--log-level", default="warning", help="Uvicorn log level (default: warning)")
+    parser.add_argument("--follow", metavar="LEADER_URL",
+                        help="Run as a read-only follower that replicates the chain of this leader")
+
+    args = parser.parse_args()
+
+    if args.follow:
+        if args.workers != 1 or args.shards != 1:
+            parser.error("a follower runs with a single worker and shard")
+        os.environ["UAV_FOLLOW"] = args.follow
+
+    # Every worker has to sign session tokens and check challenges with the same keys
+    os.environ.setdefault("UAV_SESSION_KEY", os.urandom(32).hex())
+    os.environ.setdefault("UAV_CHALLENGE_KEY", os.urandom(32).hex())
+
+    if args.shards > 1:
+        run_sharded(args)
+        return
+
+    if args.workers == 1:
+        # The server reads its mode when imported, so this has to be set before uvicorn loads it
+        os.environ.setdefault("UAV_LEDGER_WRITER", "1")
+        uvicorn.run("server.server:app", host=args.host, port=args.port,
+                    log_level=args.log_level, access_log=False, timeout_graceful_shutdown=GRACEFUL_SHUTDOWN)
+        return
+
+    from server.ledger import start_ledger_process
+
+    authkey = os.urandom(32)
+    manager = start_ledger_process(authkey)
+    ledger_host, ledger_port = manager.address
+    os.environ["UAV_LEDGER_ADDRESS"] = f"{ledger_host}:{ledger_port}"
+    os.environ["UAV_LEDGER_AUTHKEY"] = authkey.hex()
+    try:
+        uvicorn.run("server.server:app", host=args.host, port=args.port, workers=args.workers,
+                    log_level=args.log_level, access_log=False, timeout_graceful_shutdown=GRACEFUL_SHUTDOWN)
+    finally:
+        manager.get_ledger().close()
+        manager.shutdown()
+
+
+def run_sharded(args):
+    """Start one ledger process per shard and the global PoH anchor, then the HTTP workers"""
+    from server import config
+    from server.ledger import start_ledger_process
+    from server.sharding import start_anchor_process
+
+    authkey = os.urandom(32)
+    managers = [start_ledger_process(authkey, shard) for shard in range(args.shards)]
+    addresses = [manager.address for manager in managers]
+    anchor = start_anchor_process(addresses, authkey, config.ANCHOR_INTERVAL, config.DATA_DIR)
+    os.environ["UAV_SHARD_ADDRESSES"] = ",".join(f"{host}:{port}" for host, port in addresses)
+    os.environ["UAV_ANCHOR_ADDRESS"] = "{}:{}".format(*anchor.address)
+    os.environ["UAV_LEDGER_AUTHKEY"] = authkey.hex()
+    # config is already loaded here, and with one worker uvicorn imports the server into this process
+    config.SHARD_ADDRESSES = os.environ["UAV_SHARD_ADDRESSES"].split(",")
+    config.ANCHOR_ADDRESS = os.environ["UAV_ANCHOR_ADDRESS"]
+    config.LEDGER_AUTHKEY = os.environ["UAV_LEDGER_AUTHKEY"]
+    try:
+        uvicorn.run("server.server:app", host=args.host, port=args.port, workers=args.workers,
+                    log_level=args.log_level, access_log=False, timeout_graceful_shutdown=GRACEFUL_SHUTDOWN)
+    finally:
+        anchor.get_anchor().close()
+        anchor.shutdown()
+        for manager in managers:
+            manager.get_ledger().close()
+            manager.shutdown()
+
+
+if __name__ == "__main__":
+    main()
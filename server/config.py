@@ -0,0 +1,97 @@
+import os
+
+from blockchain.blockchain import Blockchain
+from crypto.challenges import ChallengeIssuer
+from crypto.signatures import SignatureVerifier
+from crypto.poh import PoHClock
+
+# Block producer mode seals transactions in batches instead of one block per request
+BLOCK_PRODUCER = os.environ.get("UAV_BLOCK_PRODUCER", "0") == "1"
+BLOCK_SIZE = int(os.environ.get("UAV_BLOCK_SIZE", "500"))
+BLOCK_INTERVAL = float(os.environ.get("UAV_BLOCK_INTERVAL", "1.0"))
+# How long a request waits for its sealing block before returning a pending receipt
+SEAL_TIMEOUT = float(os.environ.get("UAV_SEAL_TIMEOUT", "5.0"))
+# Ledger writer mode: one asyncio task owns the ledger and seals whatever is queued
+LEDGER_WRITER = os.environ.get("UAV_LEDGER_WRITER", "0") == "1"
+LEDGER_QUEUE = int(os.environ.get("UAV_LEDGER_QUEUE", "10000"))
+# Set by the multi-worker launcher, HTTP workers then use the shared ledger process
+LEDGER_ADDRESS = os.environ.get("UAV_LEDGER_ADDRESS") or None
+LEDGER_AUTHKEY = os.environ.get("UAV_LEDGER_AUTHKEY", "")
+# Set by the launcher in sharded mode: one ledger address per shard, comma separated, and the global PoH anchor
+SHARD_ADDRESSES = [address for address in os.environ.get("UAV_SHARD_ADDRESSES", "").split(",") if address]
+ANCHOR_ADDRESS = os.environ.get("UAV_ANCHOR_ADDRESS") or None
+# Seconds between global PoH anchors of the shard heads
+ANCHOR_INTERVAL = float(os.environ.get("UAV_ANCHOR_INTERVAL", "1.0"))
+# Largest number of items accepted by the batch endpoints
+MAX_BATCH = int(os.environ.get("UAV_MAX_BATCH", "1000"))
+# Lifetime in seconds of the session tokens issued on authentication (0 disables them), and the
+# hex Ed25519 seed they are signed with, generated per process when unset
+SESSION_TTL = int(os.environ.get("UAV_SESSION_TTL", "0"))
+SESSION_KEY = os.environ.get("UAV_SESSION_KEY") or None
+# Lifetime in seconds of server-issued authentication challenges (0 lets UAVs pick their own nonces),
+# and the hex HMAC key they are issued with, generated per process when unset
+CHALLENGE_TTL = int(os.environ.get("UAV_CHALLENGE_TTL", "0"))
+CHALLENGE_KEY = os.environ.get("UAV_CHALLENGE_KEY") or None
+# Sealed blocks buffered per event feed subscriber before a slow one is cut off
+EVENT_BUFFER = int(os.environ.get("UAV_EVENT_BUFFER", "1000"))
+# Largest page returned by the history and block listing endpoints
+MAX_PAGE = int(os.environ.get("UAV_MAX_PAGE", "1000"))
+# Serialized status responses kept for polling clients
+STATUS_CACHE = int(os.environ.get("UAV_STATUS_CACHE", "100000"))
+# Time the hot-path stages from startup, can also be toggled at runtime
+METRICS_TIMING = os.environ.get("UAV_METRICS_TIMING", "0") == "1"
+# Serve the endpoints that toggle stage timing and the sampling profiler at runtime
+DEBUG_ENDPOINTS = os.environ.get("UAV_DEBUG_ENDPOINTS", "0") == "1"
+# Leader URL when this node is a read-only follower, and the blocks per bulk fetch
+FOLLOW = os.environ.get("UAV_FOLLOW") or None
+REPLICATION_BATCH = int(os.environ.get("UAV_REPLICATION_BATCH", "500"))
+# Accepted clock skew for authentication timestamps, nonces are remembered this long
+NONCE_WINDOW = int(os.environ.get("UAV_NONCE_WINDOW", "300"))
+# Signature verification pool: unset for inline, "thread" or "process"
+VERIFY_EXECUTOR = os.environ.get("UAV_VERIFY_EXECUTOR") or None
+VERIFY_WORKERS = int(os.environ.get("UAV_VERIFY_WORKERS", "4"))
+# Directory for the block log and state snapshots, the chain is in-memory only when unset
+DATA_DIR = os.environ.get("UAV_DATA_DIR") or None
+SNAPSHOT_EVERY = int(os.environ.get("UAV_SNAPSHOT_EVERY", "100"))
+# Blocks kept with their bodies, older ones are pruned to headers (0 keeps everything), and where pruned bodies go
+RETAIN_BLOCKS = int(os.environ.get("UAV_RETAIN_BLOCKS", "0"))
+ARCHIVE_DIR = os.environ.get("UAV_ARCHIVE_DIR") or None
+# Continuous PoH clock, hashes per second cap and checkpoint spacing
+POH_CLOCK = os.environ.get("UAV_POH_CLOCK", "0") == "1"
+POH_RATE = int(os.environ.get("UAV_POH_RATE", "200000")) or None
+POH_CHECKPOINT_EVERY = int(os.environ.get("UAV_POH_CHECKPOINT_EVERY", "100000"))
+POH_MAX_CHECKPOINTS = int(os.environ.get("UAV_POH_MAX_CHECKPOINTS", "4096"))
+
+
+def parse_address(address):
+    """Turn a "host:port" string into the (host, port) tuple multiprocessing managers take"""
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+def create_challenge_issuer():
+    """Build the ChallengeIssuer described by the environment, None when challenges are off"""
+    if not CHALLENGE_TTL:
+        return None
+    return ChallengeIssuer(bytes.fromhex(CHALLENGE_KEY) if CHALLENGE_KEY else None, CHALLENGE_TTL)
+
+
+def create_blockchain(genesis=None, shard=None):
+    """Build the Blockchain described by the environment, the PoH clock is not started yet
+
+    Followers pass the genesis block of their leader. A shard keeps its
+    chain in its own subdirectory of the data directory.
+    """
+    verifier = SignatureVerifier(executor=VERIFY_EXECUTOR, workers=VERIFY_WORKERS)
+    poh_clock = PoHClock(POH_CHECKPOINT_EVERY, POH_RATE, max_checkpoints=POH_MAX_CHECKPOINTS) if POH_CLOCK else None
+    return Blockchain(
+        nonce_window=NONCE_WINDOW,
+        verifier=verifier,
+        storage_dir=os.path.join(DATA_DIR, f"shard-{shard}") if DATA_DIR and shard is not None else DATA_DIR,
+        snapshot_every=SNAPSHOT_EVERY,
+        poh_clock=poh_clock,
+        genesis=genesis,
+        retain_blocks=RETAIN_BLOCKS,
+        archive_dir=ARCHIVE_DIR,
+        challenges=create_challenge_issuer()
+    )
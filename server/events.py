@@ -0,0 +1,167 @@
+import asyncio
+import json
+
+# Event types a subscriber can ask for
+EVENT_TYPES = ('block', 'register', 'authenticate', 'session', 'revoke', 'rotate_key')
+# Seconds between keep-alive comments on an idle stream
+KEEPALIVE_INTERVAL = 15.0
+
+
+def format_event(event_type, height, data):
+    """Encode one server-sent event, the id is the block height to resume from"""
+    payload = json.dumps(data, separators=(',', ':'))
+    return f"id: {height}\nevent: {event_type}\ndata: {payload}\n\n".encode('utf-8')
+
+
+def block_events(block):
+    """Encode the events of a sealed block once, as (event type, uav_id, bytes)
+
+    The block event comes first, then one event per transaction in block
+    order. Resuming from a height means starting at the block after it.
+    """
+    resume = block.index + 1
+    events = [('block', None, format_event('block', resume, {
+        'index': block.index,
+        'hash': block.hash.hex(),
+        'prev_hash': block.prev_hash.hex(),
+        'poh_hash': block.poh_tick.hash.hex(),
+        'merkle_root': block.merkle_root.hex(),
+        'timestamp': block.timestamp,
+        'transactions': len(block.transactions)
+    }))]
+    tx_hashes = block.get_tx_hashes()
+    for position, tx in enumerate(block.transactions):
+        event_type = tx.type.lower()
+        events.append((event_type, tx.uav_id, format_event(event_type, resume, {
+            'tx_id': tx_hashes[position].hex(),
+            'block_number': block.index,
+            'position': position,
+            'block_time': block.timestamp,
+            **tx.to_dict()
+        })))
+    return events
+
+
+class Subscription:
+    """One consumer of the feed with a bounded buffer of sealed blocks
+
+    A consumer that falls buffer_size blocks behind is cut off instead of
+    holding up the writer. It is sent a lagged event with the height to
+    resume from and can reconnect from there.
+    """
+
+    def __init__(self, event_types, uav_id, buffer_size):
+        self.event_types = event_types
+        self.uav_id = uav_id
+        self.queue = asyncio.Queue(buffer_size)
+        self.lagged = False
+
+    def select(self, events):
+        """Pick the events this subscriber asked for"""
+        return [
+            payload for event_type, uav_id, payload in events
+            if event_type in self.event_types and (self.uav_id is None or uav_id in (None, self.uav_id))
+        ]
+
+    def offer(self, item):
+        """Queue a block's events without waiting, returns False once the subscriber has lagged"""
+        if self.lagged:
+            return False
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            self.lagged = True
+            return False
+
+
+class EventHub:
+    """Fans sealed blocks out to feed subscribers on the event loop
+
+    publish is called by whichever thread appended the block. The events of
+    a block are encoded there, once for all subscribers and only if there
+    are any, and handed to the event loop, which puts them on every
+    subscriber's buffer without ever blocking.
+    """
+
+    def __init__(self, buffer_size=1000):
+        self.buffer_size = buffer_size
+        self.subscribers = set()
+        self.loop = None
+        self.dropped = 0  # subscribers cut off for lagging
+
+    def start(self, loop):
+        """Deliver to subscribers on this event loop"""
+        self.loop = loop
+
+    def close(self):
+        """End every open stream"""
+        for subscription in self.subscribers:
+            # A full buffer ends with a lagged event once it is drained
+            subscription.lagged = True
+            if not subscription.queue.full():
+                subscription.queue.put_nowait(None)
+        self.subscribers = set()
+
+    def subscribe(self, event_types, uav_id=None):
+        """Register a subscriber, called on the event loop"""
+        subscription = Subscription(event_types, uav_id, self.buffer_size)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscribers.discard(subscription)
+
+    def publish(self, block):
+        """Block listener, hands a sealed block to the event loop"""
+        if not self.subscribers or self.loop is None:
+            return
+        self.loop.call_soon_threadsafe(self._deliver, block.index, block_events(block))
+
+    def _deliver(self, height, events):
+        for subscription in list(self.subscribers):
+            if not subscription.offer((height, events)):
+                self.subscribers.discard(subscription)
+                self.dropped += 1
+
+
+async def event_stream(hub, blockchain, subscription, start):
+    """Yield the events of the blocks from start on, then of every newly sealed block
+
+    Blocks already in the chain are read back first, then the subscriber's
+    buffer is drained, skipping blocks the catch-up already covered.
+    """
+    loop = asyncio.get_running_loop()
+    height = start
+    try:
+        end = len(blockchain.chain)
+        while height < end:
+            blocks = await loop.run_in_executor(None, blockchain.chain.__getitem__, slice(height, min(height + 100, end)))
+            for block in blocks:
+                payloads = subscription.select(block_events(block))
+                if payloads:
+                    yield b''.join(payloads)
+            height += len(blocks)
+
+        while True:
+            try:
+                item = await asyncio.wait_for(subscription.queue.get(), KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield b': keepalive\n\n'
+                continue
+            if item is None:
+                return
+            block_height, events = item
+            if block_height >= height:
+                height = block_height + 1
+                payloads = subscription.select(events)
+                if payloads:
+                    yield b''.join(payloads)
+            if subscription.lagged and subscription.queue.empty():
+                yield format_event('lagged', height, {
+                    'message': "Subscriber fell too far behind, reconnect with from set to resume",
+                    'resume_from': height
+                })
+                return
+    finally:
+        hub.unsubscribe(subscription)
@@ -0,0 +1,513 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.managers import BaseManager
+
+from crypto.signatures import auth_message
+from blockchain.producer import KEY_ROTATED, BlockProducer
+from server import config
+from server.read_model import LedgerSnapshot, ThroughputWindows
+
+logger = logging.getLogger(__name__)
+
+
+class LedgerWriter:
+    """Single writer for the ledger, fed by an asyncio queue
+
+    Request handlers never touch the Blockchain themselves. They enqueue an
+    operation and await its result, and one task drains the queue, so
+    whatever piles up while a block is being sealed goes into the next block.
+    Applying transactions, mining and writing the block log run on one
+    dedicated thread and signature checks in the verifier's pool, so the
+    event loop keeps serving while a block is produced.
+
+    Readers get a LedgerSnapshot that is only ever replaced, never
+    mutated, so reads need no locks. The snapshot is published after every
+    sealed block, and every publish_interval seconds while idle so the
+    sliding-window rates keep moving. Per-UAV status is read straight from
+    the registry columns, which are only ever appended to or overwritten
+    one value at a time.
+    """
+
+    def __init__(self, blockchain, max_block_size=500, max_queue=10000, publish_interval=1.0):
+        self.blockchain = blockchain
+        self.max_block_size = max_block_size
+        self.max_queue = max_queue
+        self.publish_interval = publish_interval
+
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ledger-writer")
+        self.windows = ThroughputWindows()
+        self.snapshot = LedgerSnapshot(blockchain, 0, self.windows)
+
+        self.queue = None
+        self._task = None
+
+    async def start(self):
+        """Start the writer task on the running event loop"""
+        self.queue = asyncio.Queue(self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Finish the queued operations and stop the writer task"""
+        if self._task is None:
+            return
+        await self.queue.put(None)
+        await self._task
+        self._task = None
+        self.executor.shutdown()
+
+    async def register_uav(self, uav_id, public_key, model, firmware_version):
+        """Register a UAV and wait for its block, returns a result dictionary"""
+        return await self._submit('REGISTER', (uav_id, public_key, model, firmware_version))
+
+    async def authenticate_uav(self, uav_id, nonce, timestamp, signature):
+        """Authenticate a UAV and wait for its block, returns a result dictionary"""
+        return await self._submit('AUTHENTICATE', (uav_id, nonce, timestamp, signature))
+
+    async def register_batch(self, registrations):
+        """Register several UAVs in one block, returns one result dictionary per item"""
+        return await self._submit('BATCH', [('REGISTER', registration) for registration in registrations])
+
+    async def authenticate_batch(self, authentications):
+        """Authenticate several UAVs in one block, returns one result dictionary per item"""
+        return await self._submit('BATCH', [('AUTHENTICATE', authentication) for authentication in authentications])
+
+    async def record_sessions(self, summaries):
+        """Commit session summaries in one block, returns one result dictionary per item"""
+        return await self._submit('BATCH', [('SESSION', summary) for summary in summaries])
+
+    async def revoke_uav(self, uav_id, timestamp, signature):
+        """Revoke a UAV and wait for its block, returns a result dictionary"""
+        return await self._submit('REVOKE', (uav_id, timestamp, signature))
+
+    async def rotate_key(self, uav_id, public_key, timestamp, signature):
+        """Replace a UAV's key and wait for its block, returns a result dictionary"""
+        return await self._submit('ROTATE_KEY', (uav_id, public_key, timestamp, signature))
+
+    async def get_snapshot(self):
+        """Get the latest published snapshot"""
+        return self.snapshot
+
+    async def get_uav_status(self, uav_id):
+        """Get the (last_auth, firmware_version, revoked) of a UAV"""
+        return self.blockchain.registry.status(uav_id)
+
+    async def get_key_state(self, uav_id):
+        """Get the (public_key, revoked) of a UAV"""
+        return self.blockchain.registry.key_state(uav_id)
+
+    async def find_uavs(self, model, firmware_version, include_revoked, cursor, limit):
+        """Get a page of the UAVs with a model and/or firmware version"""
+        return self.blockchain.registry.find(model, firmware_version, include_revoked, cursor, limit)
+
+    async def count_uavs(self, field):
+        """Count the UAVs not revoked per model or firmware version"""
+        return self.blockchain.registry.counts(field)
+
+    async def _submit(self, op, args):
+        """Queue an operation and wait for the writer to finish it"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((op, args, future))
+        return await future
+
+    async def _run(self):
+        """Drain the queue batch by batch until stopped"""
+        loop = asyncio.get_running_loop()
+        running = True
+        while running:
+            try:
+                batch = [await asyncio.wait_for(self.queue.get(), self.publish_interval)]
+            except asyncio.TimeoutError:
+                await loop.run_in_executor(self.executor, self._publish)
+                continue
+            size = self._size(batch[0])
+            while size < self.max_block_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                size += self._size(batch[-1])
+
+            # None is the stop marker, everything queued before it still gets sealed
+            if None in batch:
+                running = False
+                batch = [item for item in batch if item is not None]
+            if not batch:
+                continue
+
+            try:
+                await self._process(batch)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _size(self, item):
+        """Number of transactions a queued item can add to the block"""
+        if item is not None and item[0] == 'BATCH':
+            return len(item[1])
+        return 1
+
+    async def _process(self, batch):
+        """Apply one batch of operations and seal it into a block"""
+        loop = asyncio.get_running_loop()
+        results, auths = await loop.run_in_executor(self.executor, self._apply, batch)
+
+        valid = []
+        if auths:
+            valid = await self.blockchain.verifier.verify_batch_async([
+                (uav_id, public_key, auth_message(uav_id, nonce, timestamp), signature)
+                for _, (uav_id, nonce, timestamp, signature), public_key in auths
+            ])
+
+        await loop.run_in_executor(self.executor, self._seal, results, auths, valid)
+
+        for future, result in results:
+            if not future.done():
+                future.set_result(result)
+
+    def _apply(self, batch):
+        """Apply registrations and pre-check authentications, runs on the writer thread
+
+        Returns the (future, result) pairs, where the result of a BATCH item
+        is a list, and the authentications still waiting for their signature check.
+        """
+        results = []
+        auths = []
+        for op, args, future in batch:
+            if op == 'BATCH':
+                result = [self._apply_one(item_op, item_args, auths) for item_op, item_args in args]
+            else:
+                result = self._apply_one(op, args, auths)
+            results.append((future, result))
+        return results, auths
+
+    def _apply_one(self, op, args, auths):
+        """Apply one transaction or pre-check one authentication, returns its result dictionary
+
+        An operation that raises only fails its own item. Blockchain
+        operations validate and encode before they change anything, so at
+        most its transaction is left in the mempool, where it is dropped
+        again, and the rest of the batch is sealed as acknowledged.
+        """
+        pending = len(self.blockchain.pending_transactions)
+        try:
+            return self._apply_op(op, args, auths)
+        except Exception as e:
+            return self._failed(op, args, pending, e)
+
+    def _apply_op(self, op, args, auths):
+        """Body of _apply_one"""
+        apply = {
+            'REGISTER': self.blockchain.register_uav,
+            'SESSION': self.blockchain.record_session,
+            'REVOKE': self.blockchain.revoke_uav,
+            'ROTATE_KEY': self.blockchain.rotate_key
+        }.get(op)
+        if apply is not None:
+            success, message = apply(*args)
+            result = {'success': success, 'message': message, 'uav_id': args[0]}
+            if success:
+                result['tx_id'] = self.blockchain.pending_tx_hashes[-1].hex()
+            return result
+
+        uav_id, nonce, timestamp, _ = args
+        success, message = self.blockchain.check_authentication(uav_id, nonce, timestamp)
+        result = {'success': success, 'message': message, 'uav_id': uav_id}
+        if success:
+            public_key = self.blockchain.registry.public_key_hex(uav_id)
+            auths.append((result, args, public_key))
+        return result
+
+    def _seal(self, results, auths, valid):
+        """Apply verified authentications, mine the block and publish, runs on the writer thread"""
+        for (result, args, public_key), signature_ok in zip(auths, valid):
+            if not signature_ok:
+                result['success'] = False
+                result['message'] = "Invalid signature"
+                continue
+            # A rotation later in the same batch is already applied
+            if self.blockchain.registry.public_key_hex(args[0]) != public_key:
+                result['success'] = False
+                result['message'] = KEY_ROTATED
+                continue
+
+            # Replay checks run again, the same nonce may be in the batch twice
+            pending = len(self.blockchain.pending_transactions)
+            try:
+                success, message = self.blockchain.authenticate_uav(*args, verified=True)
+            except Exception as e:
+                result.update(self._failed('AUTHENTICATE', args, pending, e))
+                continue
+            result['success'] = success
+            result['message'] = message
+            if success:
+                result['tx_id'] = self.blockchain.pending_tx_hashes[-1].hex()
+
+        # Readers on other threads take the chain lock, pruning happens while mining
+        with self.blockchain.lock:
+            block = self.blockchain.mine_block()
+        for _, outcome in results:
+            for result in (outcome if isinstance(outcome, list) else [outcome]):
+                if result['success']:
+                    result['block_number'] = block.index
+
+        self._publish()
+
+    def _failed(self, op, args, pending, error):
+        """Result of an operation that raised, after dropping what it added to the mempool"""
+        logger.exception("%s for %s failed", op, args[0])
+        self.blockchain.drop_pending(pending)
+        return {'success': False, 'message': f"Internal error: {error}", 'uav_id': args[0]}
+
+    def _publish(self):
+        """Replace the published snapshot, runs on the writer thread"""
+        self.snapshot = LedgerSnapshot(self.blockchain, self.queue.qsize(), self.windows)
+
+
+class LedgerService:
+    """Ledger hosted in its own process and shared by several HTTP workers
+
+    Calls arrive on the manager's per-connection threads and are batched
+    into blocks by a BlockProducer.
+    """
+
+    def __init__(self, blockchain, producer, seal_timeout):
+        self.blockchain = blockchain
+        self.producer = producer
+        self.seal_timeout = seal_timeout
+        self.windows = ThroughputWindows()
+
+    def register_uav(self, uav_id, public_key, model, firmware_version):
+        """Register a UAV and wait for its block, returns a result dictionary"""
+        success, message, receipt = self.producer.register_uav(uav_id, public_key, model, firmware_version)
+        return self._result(success, message, receipt, uav_id)
+
+    def authenticate_uav(self, uav_id, nonce, timestamp, signature):
+        """Authenticate a UAV and wait for its block, returns a result dictionary"""
+        success, message, receipt = self.producer.authenticate_uav(uav_id, nonce, timestamp, signature)
+        return self._result(success, message, receipt, uav_id)
+
+    def register_batch(self, registrations):
+        """Register several UAVs and wait for their block, returns one result dictionary per item"""
+        outcomes = self.producer.register_batch(registrations)
+        return [self._result(*outcome, registration[0]) for outcome, registration in zip(outcomes, registrations)]
+
+    def authenticate_batch(self, authentications):
+        """Authenticate several UAVs and wait for their block, returns one result dictionary per item"""
+        outcomes = self.producer.authenticate_batch(authentications)
+        return [self._result(*outcome, authentication[0]) for outcome, authentication in zip(outcomes, authentications)]
+
+    def record_sessions(self, summaries):
+        """Commit session summaries and wait for their block, returns one result dictionary per item"""
+        outcomes = self.producer.record_sessions(summaries)
+        return [self._result(*outcome, summary[0]) for outcome, summary in zip(outcomes, summaries)]
+
+    def revoke_uav(self, uav_id, timestamp, signature):
+        """Revoke a UAV and wait for its block, returns a result dictionary"""
+        success, message, receipt = self.producer.revoke_uav(uav_id, timestamp, signature)
+        return self._result(success, message, receipt, uav_id)
+
+    def rotate_key(self, uav_id, public_key, timestamp, signature):
+        """Replace a UAV's key and wait for its block, returns a result dictionary"""
+        success, message, receipt = self.producer.rotate_key(uav_id, public_key, timestamp, signature)
+        return self._result(success, message, receipt, uav_id)
+
+    def get_snapshot(self):
+        """Get a snapshot of the ledger statistics"""
+        with self.producer.lock:
+            return LedgerSnapshot(self.blockchain, self.producer.pending_count(), self.windows)
+
+    def get_uav_status(self, uav_id):
+        """Get the (last_auth, firmware_version, revoked) of a UAV"""
+        with self.producer.lock:
+            return self.blockchain.registry.status(uav_id)
+
+    def get_key_state(self, uav_id):
+        """Get the (public_key, revoked) of a UAV"""
+        with self.producer.lock:
+            return self.blockchain.registry.key_state(uav_id)
+
+    def find_uavs(self, model, firmware_version, include_revoked, cursor, limit):
+        """Get a page of the UAVs with a model and/or firmware version"""
+        with self.producer.lock:
+            return self.blockchain.registry.find(model, firmware_version, include_revoked, cursor, limit)
+
+    def count_uavs(self, field):
+        """Count the UAVs not revoked per model or firmware version"""
+        with self.producer.lock:
+            return self.blockchain.registry.counts(field)
+
+    def get_head(self):
+        """Height, hash and PoH hash of the latest block, what the global PoH anchors"""
+        with self.producer.lock:
+            block = self.blockchain.get_latest_block()
+            return block.index, block.hash, block.poh_tick.hash
+
+    def get_uav_history(self, uav_id, since, cursor, limit):
+        """Get a page of a UAV's sealed transactions, pruning would shift the history index under us"""
+        with self.producer.lock:
+            return self.blockchain.get_uav_history(uav_id, since, cursor, limit)
+
+    def get_blocks(self, start_time, end_time, cursor, limit):
+        """Get a page of block headers in a time range"""
+        with self.producer.lock:
+            return self.blockchain.get_blocks(start_time, end_time, cursor, limit)
+
+    def close(self):
+        """Seal what is pending and close the block log"""
+        self.producer.stop()
+        if self.blockchain.poh_clock:
+            self.blockchain.poh_clock.stop()
+        self.blockchain.verifier.shutdown()
+        self.blockchain.close()
+
+    def _result(self, success, message, receipt, uav_id):
+        """Wait for the receipt and turn it into a result dictionary"""
+        result = {'success': success, 'message': message, 'uav_id': uav_id}
+        if not success:
+            return result
+
+        block_number = receipt.wait(self.seal_timeout)
+        if receipt.success is False:
+            result['success'] = False
+            result['message'] = receipt.message
+        else:
+            result['block_number'] = block_number
+            result['tx_id'] = receipt.tx_id
+        return result
+
+
+class LedgerManager(BaseManager):
+    """Multiprocessing manager that serves the LedgerService to HTTP workers"""
+
+
+# The service instance inside the ledger process
+_service = None
+
+
+def _get_service():
+    return _service
+
+
+def _start_service(shard=None):
+    """Manager process initializer that builds the ledger (or one shard of it) from the environment"""
+    global _service
+    blockchain = config.create_blockchain(shard=shard)
+    if blockchain.poh_clock:
+        blockchain.poh_clock.start()
+    producer = BlockProducer(blockchain, config.BLOCK_SIZE, config.BLOCK_INTERVAL)
+    producer.start()
+    _service = LedgerService(blockchain, producer, config.SEAL_TIMEOUT)
+
+
+LedgerManager.register('get_ledger', callable=_get_service)
+
+
+def start_ledger_process(authkey, shard=None):
+    """Start the shared ledger process, or the process of one shard, returns the running manager"""
+    manager = LedgerManager(address=('127.0.0.1', 0), authkey=authkey)
+    manager.start(initializer=_start_service, initargs=(shard,))
+    return manager
+
+
+class RemoteLedger:
+    """Async client for the shared ledger process, used by each HTTP worker
+
+    Proxy calls block until the ledger process has sealed the transaction, so
+    they run on a thread pool sized for the number of in-flight requests. The
+    statistics snapshot is refreshed in the background so stats reads are
+    served locally.
+    """
+
+    def __init__(self, address, authkey, max_calls=256, refresh_interval=0.5):
+        self.address = address
+        self.authkey = authkey
+        self.refresh_interval = refresh_interval
+        self.executor = ThreadPoolExecutor(max_workers=max_calls, thread_name_prefix="ledger-client")
+        self.manager = None
+        self.ledger = None
+        self.snapshot = None
+        self._task = None
+
+    async def start(self):
+        """Connect to the ledger process and start refreshing the snapshot"""
+        self.manager = LedgerManager(address=self.address, authkey=self.authkey)
+        self.manager.connect()
+        self.ledger = self.manager.get_ledger()
+        self.snapshot = await self._call(self.ledger.get_snapshot)
+        self._task = asyncio.create_task(self._refresh())
+
+    async def stop(self):
+        """Stop refreshing the snapshot"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.executor.shutdown(wait=False)
+
+    async def register_uav(self, uav_id, public_key, model, firmware_version):
+        """Register a UAV through the ledger process"""
+        return await self._call(self.ledger.register_uav, uav_id, public_key, model, firmware_version)
+
+    async def authenticate_uav(self, uav_id, nonce, timestamp, signature):
+        """Authenticate a UAV through the ledger process"""
+        return await self._call(self.ledger.authenticate_uav, uav_id, nonce, timestamp, signature)
+
+    async def register_batch(self, registrations):
+        """Register several UAVs through the ledger process"""
+        return await self._call(self.ledger.register_batch, registrations)
+
+    async def authenticate_batch(self, authentications):
+        """Authenticate several UAVs through the ledger process"""
+        return await self._call(self.ledger.authenticate_batch, authentications)
+
+    async def record_sessions(self, summaries):
+        """Commit session summaries through the ledger process"""
+        return await self._call(self.ledger.record_sessions, summaries)
+
+    async def revoke_uav(self, uav_id, timestamp, signature):
+        """Revoke a UAV through the ledger process"""
+        return await self._call(self.ledger.revoke_uav, uav_id, timestamp, signature)
+
+    async def rotate_key(self, uav_id, public_key, timestamp, signature):
+        """Replace a UAV's key through the ledger process"""
+        return await self._call(self.ledger.rotate_key, uav_id, public_key, timestamp, signature)
+
+    async def get_snapshot(self):
+        """Get the locally cached snapshot"""
+        return self.snapshot
+
+    async def get_uav_status(self, uav_id):
+        """Get the (last_auth, firmware_version, revoked) of a UAV from the ledger process"""
+        return await self._call(self.ledger.get_uav_status, uav_id)
+
+    async def get_key_state(self, uav_id):
+        """Get the (public_key, revoked) of a UAV from the ledger process"""
+        return await self._call(self.ledger.get_key_state, uav_id)
+
+    async def find_uavs(self, model, firmware_version, include_revoked, cursor, limit):
+        """Get a page of the UAVs with a model and/or firmware version from the ledger process"""
+        return await self._call(self.ledger.find_uavs, model, firmware_version, include_revoked, cursor, limit)
+
+    async def count_uavs(self, field):
+        """Count the UAVs not revoked per model or firmware version in the ledger process"""
+        return await self._call(self.ledger.count_uavs, field)
+
+    async def get_uav_history(self, uav_id, since, cursor, limit):
+        """Get a page of a UAV's sealed transactions from the ledger process"""
+        return await self._call(self.ledger.get_uav_history, uav_id, since, cursor, limit)
+
+    async def get_blocks(self, start_time, end_time, cursor, limit):
+        """Get a page of block headers from the ledger process"""
+        return await self._call(self.ledger.get_blocks, start_time, end_time, cursor, limit)
+
+    async def _call(self, method, *args):
+        """Run a blocking proxy call without blocking the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, method, *args)
+
+    async def _refresh(self):
+        """Periodically fetch a fresh snapshot"""
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                self.snapshot = await self._call(self.ledger.get_snapshot)
+            except Exception:
+                # Keep serving the last snapshot, the next refresh will try again
+                pass
@@ -0,0 +1,316 @@
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as Tally
+
+# Upper bounds in seconds, from a single PoH tick to a slow block
+STAGE_BUCKETS = (0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Rejections the ledger reports as possible replays
+REPLAY_MARKER = "potential replay attack"
+
+
+def _format_labels(labelname, value, extra=None):
+    """Render the {name="value"} part of a sample line"""
+    pairs = []
+    if labelname is not None:
+        pairs.append(f'{labelname}="{value}"')
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonic counter, optionally split by one label"""
+
+    kind = 'counter'
+
+    def __init__(self, name, description, labelname=None):
+        self.name = name
+        self.description = description
+        self.labelname = labelname
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, label=None, amount=1):
+        """Add amount to the counter of a label"""
+        with self.lock:
+            self.values[label] = self.values.get(label, 0) + amount
+
+    def samples(self):
+        """Yield the sample lines of the text format"""
+        for label, value in sorted(self.values.items(), key=lambda item: str(item[0])):
+            yield f"{self.name}{_format_labels(self.labelname, label)} {value}"
+
+
+class Gauge:
+    """Value that is set to the current reading, usually right before a scrape"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.value = 0
+
+    def set(self, value):
+        """Replace the current reading"""
+        self.value = value
+
+    def samples(self):
+        """Yield the sample lines of the text format"""
+        yield f"{self.name} {self.value}"
+
+
+class Histogram:
+    """Cumulative bucket histogram, optionally split by one label"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, description, labelname=None, buckets=STAGE_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelname = labelname
+        self.buckets = buckets
+        self.children = {}  # label -> [bucket counts..., +Inf count, sum]
+        self.lock = threading.Lock()
+
+    def observe(self, value, label=None):
+        """Count one value into its bucket"""
+        slot = bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.children.get(label)
+            if counts is None:
+                counts = self.children[label] = [0] * (len(self.buckets) + 2)
+            counts[slot] += 1
+            counts[-1] += value
+
+    def samples(self):
+        """Yield the sample lines of the text format"""
+        for label, counts in sorted(self.children.items(), key=lambda item: str(item[0])):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelname, label, f'le="{bound}"')
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelname, label)} {counts[-1]}"
+            yield f"{self.name}_count{_format_labels(self.labelname, label)} {cumulative}"
+
+
+class Registry:
+    """The metrics of one process, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        """Register a metric, returns it"""
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Render all metrics in registration order"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+def resident_memory():
+    """Resident set size of this process in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # No procfs, fall back to the peak RSS, in KiB on Linux and bytes on macOS
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def hot_path_targets():
+    """The stages timed by default: PoH, hashing, mining, signatures and the FastAPI request layer"""
+    import fastapi.routing
+    from blockchain.blockchain import Block, Blockchain
+    from crypto.poh import ProofOfHistory
+    from crypto.signatures import SignatureVerifier
+
+    return [
+        # Blocks are sealed on next_tick, tick itself only makes the genesis tick
+        (ProofOfHistory, 'next_tick', 'poh_tick'),
+        (Block, 'calculate_hash', 'block_hash'),
+        (Blockchain, 'mine_block', 'mine_block'),
+        (SignatureVerifier, 'verify', 'signature_verify'),
+        (SignatureVerifier, 'verify_batch', 'signature_verify_batch'),
+        # Request parsing and pydantic validation, then response encoding
+        (fastapi.routing, 'solve_dependencies', 'request_validation'),
+        (fastapi.routing, 'serialize_response', 'response_serialization'),
+    ]
+
+
+class StageTimer:
+    """Times hot-path stages by swapping timed wrappers onto their functions
+
+    While disabled the original functions are in place, so the stages run
+    without any overhead. targets is a list of (owner, attribute, stage)
+    where owner is a class or module.
+    """
+
+    def __init__(self, histogram, targets):
+        self.histogram = histogram
+        self.targets = targets
+        self.originals = {}
+
+    @property
+    def enabled(self):
+        return bool(self.originals)
+
+    def enable(self):
+        """Wrap every target, a no-op if already enabled"""
+        for owner, attribute, stage in self.targets:
+            key = (owner, attribute)
+            if key in self.originals:
+                continue
+            original = owner.__dict__[attribute]
+            self.originals[key] = original
+            setattr(owner, attribute, self._wrap(original, stage))
+
+    def disable(self):
+        """Put the original functions back"""
+        for (owner, attribute), original in self.originals.items():
+            setattr(owner, attribute, original)
+        self.originals = {}
+
+    def _wrap(self, func, stage):
+        observe = self.histogram.observe
+        clock = time.perf_counter
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def timed_async(*args, **kwargs):
+                started = clock()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    observe(clock() - started, stage)
+            return timed_async
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            started = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(clock() - started, stage)
+        return timed
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads from a background thread while running
+
+    Stacks are aggregated per function in the collapsed format flame graph
+    tools read ("outer;inner count"). Nothing runs while it is stopped.
+    """
+
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = Tally()
+        self.sample_count = 0
+        self.started_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, interval=None):
+        """Start sampling, earlier samples are discarded"""
+        if self.running:
+            return
+        if interval:
+            self.interval = interval
+        self.samples = Tally()
+        self.sample_count = 0
+        self.started_at = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling, the samples are kept for report"""
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def report(self, limit=100):
+        """The most frequent collapsed stacks, one per line"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.samples.most_common(limit))
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.samples[';'.join(reversed(stack))] += 1
+            self.sample_count += 1
+
+
+class ServerMetrics:
+    """Counters, gauges and stage histograms of the server process"""
+
+    def __init__(self, stage_targets):
+        self.registry = Registry()
+        self.registrations = self.registry.add(Counter(
+            'uav_registrations_total', 'Registration requests by outcome', 'result'))
+        self.authentications = self.registry.add(Counter(
+            'uav_authentications_total', 'Authentication requests by outcome', 'result'))
+        self.replays = self.registry.add(Counter(
+            'uav_replay_rejections_total', 'Authentications rejected as possible replays'))
+        self.session_checks = self.registry.add(Counter(
+            'uav_session_checks_total', 'Session token checks by outcome', 'result'))
+        self.chain_length = self.registry.add(Gauge('uav_chain_length', 'Blocks in the chain'))
+        self.mempool_depth = self.registry.add(Gauge('uav_mempool_depth', 'Transactions waiting for a block'))
+        self.live_nonces = self.registry.add(Gauge('uav_nonce_store_size', 'Nonces remembered for replay checks'))
+        self.registered_uavs = self.registry.add(Gauge('uav_registered_uavs', 'Registered UAVs'))
+        self.memory = self.registry.add(Gauge('process_resident_memory_bytes', 'Resident memory size in bytes'))
+        self.stages = self.registry.add(Histogram(
+            'uav_stage_seconds', 'Time spent in hot-path stages, recorded while stage timing is enabled', 'stage'))
+        self.timer = StageTimer(self.stages, stage_targets)
+        self.profiler = SamplingProfiler()
+
+    def record_registration(self, success):
+        self.registrations.inc('accepted' if success else 'rejected')
+
+    def record_authentication(self, success, message):
+        self.authentications.inc('accepted' if success else 'rejected')
+        if not success and message and REPLAY_MARKER in message:
+            self.replays.inc()
+
+    def record_session_check(self, valid):
+        self.session_checks.inc('valid' if valid else 'invalid')
+
+    def render(self, snapshot):
+        """Update the gauges from a ledger snapshot and render everything"""
+        self.chain_length.set(snapshot.blocks)
+        self.mempool_depth.set(snapshot.pending_transactions)
+        self.live_nonces.set(snapshot.live_nonces)
+        self.registered_uavs.set(snapshot.registered_uavs)
+        self.memory.set(resident_memory())
+        return self.registry.render()
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict, deque
+
+# Sliding windows for the transaction rate, in seconds
+RATE_WINDOWS = (10, 60, 300)
+
+
+class ThroughputWindows:
+    """Transaction and authentication counts of recent blocks, for sliding-window rates
+
+    Only the blocks sealed since the last observe are read, blocks older
+    than the longest window are dropped.
+    """
+
+    def __init__(self, windows=RATE_WINDOWS):
+        self.windows = windows
+        self.blocks = deque()  # (timestamp, transactions, authentications)
+        self.height = None
+
+    def observe(self, blockchain, now=None):
+        """Take in the blocks sealed since the last call"""
+        now = now or time.time()
+        horizon = now - max(self.windows)
+        chain = blockchain.chain
+        height = len(chain)
+
+        start = self.height
+        if start is None:
+            # First call, walk back over the blocks still inside the windows
+            start = height
+            while start > 1 and chain[start - 1].timestamp > horizon:
+                start -= 1
+        for index in range(start, height):
+            block = chain[index]
+            auths = sum(1 for tx in block.transactions if tx.type == 'AUTHENTICATE')
+            self.blocks.append((block.timestamp, len(block.transactions), auths))
+        self.height = height
+
+        while self.blocks and self.blocks[0][0] <= horizon:
+            self.blocks.popleft()
+
+    def rates(self, now=None):
+        """Transactions per second over every window and authentications in the last minute"""
+        now = now or time.time()
+        tx_per_second = {}
+        for window in self.windows:
+            count = sum(transactions for timestamp, transactions, _ in self.blocks if timestamp > now - window)
+            tx_per_second[f'{window}s'] = round(count / window, 2)
+        auths = sum(authentications for timestamp, _, authentications in self.blocks if timestamp > now - 60)
+        return tx_per_second, auths
+
+
+class LedgerSnapshot:
+    """Immutable view of the ledger statistics, replaced after every sealed block"""
+
+    __slots__ = ('blocks', 'registered_uavs', 'last_block_time', 'pending_transactions',
+                 'live_nonces', 'startup_seconds', 'replayed_blocks', 'tx_per_second',
+                 'auths_last_minute', 'created_at', 'shards')
+
+    def __init__(self, blockchain, pending_transactions=0, windows=None):
+        self.blocks = len(blockchain.chain)
+        self.registered_uavs = len(blockchain.registry)
+        self.last_block_time = blockchain.get_latest_block().timestamp
+        self.pending_transactions = pending_transactions
+        self.live_nonces = len(blockchain.used_nonces)
+        self.startup_seconds = blockchain.startup_seconds
+        self.replayed_blocks = blockchain.replayed_blocks
+        self.created_at = time.time()
+        self.shards = 1
+        if windows is not None:
+            windows.observe(blockchain, self.created_at)
+            self.tx_per_second, self.auths_last_minute = windows.rates(self.created_at)
+        else:
+            self.tx_per_second, self.auths_last_minute = None, None
+
+    @classmethod
+    def combine(cls, snapshots):
+        """Sum the snapshots of several shards into one"""
+        combined = cls.__new__(cls)
+        for field in ('blocks', 'registered_uavs', 'pending_transactions', 'live_nonces', 'replayed_blocks'):
+            setattr(combined, field, sum(getattr(snapshot, field) for snapshot in snapshots))
+        combined.last_block_time = max(snapshot.last_block_time for snapshot in snapshots)
+        combined.startup_seconds = max(snapshot.startup_seconds for snapshot in snapshots)
+        combined.created_at = min(snapshot.created_at for snapshot in snapshots)
+        combined.shards = len(snapshots)
+
+        rates = [snapshot.tx_per_second for snapshot in snapshots if snapshot.tx_per_second is not None]
+        if rates:
+            combined.tx_per_second = {window: round(sum(rate[window] for rate in rates), 2) for window in rates[0]}
+            combined.auths_last_minute = sum(snapshot.auths_last_minute for snapshot in snapshots)
+        else:
+            combined.tx_per_second, combined.auths_last_minute = None, None
+        return combined
+
+    def to_dict(self):
+        """Convert snapshot to the stats dictionary used by the API"""
+        return {
+            'blocks': self.blocks,
+            'registered_uavs': self.registered_uavs,
+            'last_block_time': self.last_block_time,
+            'pending_transactions': self.pending_transactions,
+            'live_nonces': self.live_nonces,
+            'startup_seconds': self.startup_seconds,
+            'replayed_blocks': self.replayed_blocks,
+            'tx_per_second': self.tx_per_second,
+            'auths_last_minute': self.auths_last_minute,
+            'shards': self.shards,
+            'as_of': int(self.created_at)
+        }
+
+
+class SnapshotCache:
+    """Snapshots of a Blockchain used directly by the server, not through a ledger writer
+
+    A new snapshot is only built when the height or the number of pending
+    transactions changed, or at most once a second so the rates move on.
+    """
+
+    def __init__(self, blockchain):
+        self.blockchain = blockchain
+        self.windows = ThroughputWindows()
+        self.key = None
+        self.snapshot = None
+
+    def get(self):
+        """Get the snapshot for the current chain state"""
+        key = (len(self.blockchain.chain), len(self.blockchain.pending_transactions), int(time.time()))
+        if key != self.key:
+            self.snapshot = LedgerSnapshot(self.blockchain, key[1], self.windows)
+            self.key = key
+        return self.snapshot
+
+
+class ResponseCache:
+    """Serialized JSON response bodies and their ETags, rebuilt only when their source changes
+
+    Every entry remembers the object it was built from, a snapshot or a
+    status tuple. As long as the same (or an equal) object is passed again
+    the cached bytes are served without building or encoding anything.
+    """
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (source, etag, body)
+
+    def get(self, key, source, build):
+        """Get (etag, body) for key, build() makes the response dictionary when source changed"""
+        entry = self.entries.get(key)
+        if entry is not None and (entry[0] is source or entry[0] == source):
+            self.entries.move_to_end(key)
+            return entry[1], entry[2]
+
+        body = json.dumps(build(), separators=(',', ':')).encode('utf-8')
+        etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        self.entries[key] = (source, etag, body)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return etag, body
+
+
+def etag_matches(if_none_match, etag):
+    """Check an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in if_none_match.split(','))
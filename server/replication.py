@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from blockchain.blockchain import Block
+from blockchain.storage import RECORD_HEADER
+from blockchain.validation import verify_block
+
+logger = logging.getLogger(__name__)
+
+BLOCKS_PATH = "/api/v1/replication/blocks"
+STREAM_PATH = "/api/v1/replication/stream"
+# Header with the leader's chain height on bulk fetches
+HEIGHT_HEADER = "X-Chain-Height"
+# Status the leader answers with when the requested blocks are pruned
+PRUNED_STATUS = 410
+# How often an open stream looks for new blocks, and sends a heartbeat while there are none
+STREAM_POLL_INTERVAL = 0.02
+HEARTBEAT_INTERVAL = 5.0
+
+
+class ReplicationError(Exception):
+    """The leader sent something the follower cannot apply"""
+
+
+def split_records(buffer):
+    """Split length-prefixed records off the front of a buffer, returns (payloads, rest)
+
+    A zero-length record is a heartbeat and is skipped.
+    """
+    payloads = []
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(buffer):
+        (length,) = RECORD_HEADER.unpack_from(buffer, offset)
+        end = offset + RECORD_HEADER.size + length
+        if end > len(buffer):
+            break
+        if length:
+            payloads.append(bytes(buffer[offset + RECORD_HEADER.size:end]))
+        offset = end
+    return payloads, buffer[offset:]
+
+
+async def block_stream(blockchain, start, batch_size):
+    """Yield the blocks from start on as records, then every new block as it is sealed
+
+    The stream ends if pruning overtakes it, a follower that reconnects is
+    then told the blocks it needs are gone.
+    """
+    loop = asyncio.get_running_loop()
+    height = start
+    idle = 0.0
+    while True:
+        end = min(height + batch_size, len(blockchain.chain))
+        if height < end:
+            records = await loop.run_in_executor(None, blockchain.get_block_records, height, end - height)
+            if records is None:
+                return
+            height = end
+            idle = 0.0
+            yield records
+            continue
+
+        await asyncio.sleep(STREAM_POLL_INTERVAL)
+        idle += STREAM_POLL_INTERVAL
+        if idle >= HEARTBEAT_INTERVAL:
+            idle = 0.0
+            yield RECORD_HEADER.pack(0)
+
+
+def check_pruned(response):
+    """Stop replication if the leader no longer has the blocks the follower needs"""
+    if response.status_code == PRUNED_STATUS:
+        raise ReplicationError(f"Leader has pruned the blocks this follower needs: {response.json()['message']}")
+
+
+def fetch_genesis(leader_url, timeout=10.0):
+    """Fetch and check the leader's genesis block, a fresh follower starts its chain from it"""
+    response = httpx.get(f"{leader_url}{BLOCKS_PATH}", params={"from": 0, "limit": 1}, timeout=timeout)
+    response.raise_for_status()
+    payloads, _ = split_records(response.content)
+    if not payloads:
+        raise ReplicationError("Leader returned no genesis block")
+
+    genesis = Block.from_bytes(payloads[0])
+    if not verify_block(genesis):
+        raise ReplicationError("Leader's genesis block failed verification")
+    return genesis
+
+
+class Follower:
+    """Keeps a local Blockchain in sync with a leader node
+
+    A lagging follower first catches up with bulk range fetches of up to
+    batch_size blocks, then holds a stream open over which the leader pushes
+    every block it seals. Each block is verified with the hash, Merkle root,
+    link and PoH checks before it is applied, on a single thread so the
+    event loop keeps serving reads. Connection errors are retried every
+    retry_interval seconds, a block that fails verification stops
+    replication since the chains have diverged.
+    """
+
+    def __init__(self, blockchain, leader_url, batch_size=500, retry_interval=1.0, timeout=30.0):
+        self.blockchain = blockchain
+        self.leader_url = leader_url
+        self.batch_size = batch_size
+        self.retry_interval = retry_interval
+
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="follower")
+        # The stream sends a heartbeat while idle, a longer silence means the leader is gone
+        self.http = httpx.AsyncClient(base_url=leader_url, timeout=timeout)
+        self.leader_height = None
+        self.streaming = False
+        self.applied_blocks = 0
+        self.last_applied_at = None
+        self.error = None
+        self._task = None
+
+    async def start(self):
+        """Start following in the background"""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop following and wait for the block being applied"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.http.aclose()
+        self.executor.shutdown()
+
+    def status(self):
+        """Replication state for the status endpoint"""
+        height = len(self.blockchain.chain)
+        return {
+            'role': 'follower',
+            'leader': self.leader_url,
+            'height': height,
+            'leader_height': self.leader_height,
+            'lag': max(0, self.leader_height - height) if self.leader_height is not None else None,
+            'streaming': self.streaming,
+            'applied_blocks': self.applied_blocks,
+            'last_applied_at': self.last_applied_at,
+            'error': self.error
+        }
+
+    async def _run(self):
+        """Catch up, then stream, reconnecting until the chains diverge"""
+        while True:
+            try:
+                await self._catch_up()
+                await self._stream()
+            except ReplicationError as e:
+                self.error = str(e)
+                logger.error("Replication stopped: %s", e)
+                return
+            except (httpx.HTTPError, ValueError) as e:
+                self.error = f"Leader unreachable: {str(e) or type(e).__name__}"
+                logger.warning("Replication interrupted, retrying: %s", self.error)
+            finally:
+                self.streaming = False
+            await asyncio.sleep(self.retry_interval)
+
+    async def _catch_up(self):
+        """Fetch blocks in bulk until a fetch comes back short"""
+        while True:
+            response = await self.http.get(
+                BLOCKS_PATH, params={"from": len(self.blockchain.chain), "limit": self.batch_size}
+            )
+            check_pruned(response)
+            response.raise_for_status()
+            self.leader_height = int(response.headers.get(HEIGHT_HEADER, 0)) or None
+            payloads, _ = split_records(response.content)
+            await self._apply(payloads)
+            if len(payloads) < self.batch_size:
+                return
+
+    async def _stream(self):
+        """Apply blocks as the leader pushes them"""
+        params = {"from": len(self.blockchain.chain)}
+        async with self.http.stream("GET", STREAM_PATH, params=params) as response:
+            if response.status_code == PRUNED_STATUS:
+                await response.aread()
+            check_pruned(response)
+            response.raise_for_status()
+            self.streaming = True
+            self.error = None
+            buffer = b''
+            async for chunk in response.aiter_bytes():
+                payloads, buffer = split_records(buffer + chunk)
+                if payloads:
+                    await self._apply(payloads)
+                    self.leader_height = max(self.leader_height or 0, len(self.blockchain.chain))
+        raise httpx.RemoteProtocolError("Leader closed the block stream")
+
+    async def _apply(self, payloads):
+        """Decode, verify and apply blocks on the follower thread"""
+        if payloads:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self._apply_blocks, payloads)
+
+    def _apply_blocks(self, payloads):
+        """Apply blocks in order, skipping ones already in the chain"""
+        for payload in payloads:
+            block = Block.from_bytes(payload)
+            height = len(self.blockchain.chain)
+            if block.index < height:
+                # Already applied, e.g. sent again after a reconnect
+                continue
+            if block.index > height:
+                raise httpx.RemoteProtocolError(f"Expected block {height}, leader sent block {block.index}")
+            # Readers on other threads take the chain lock, pruning happens while applying
+            with self.blockchain.lock:
+                applied = self.blockchain.apply_block(block)
+            if not applied:
+                raise ReplicationError(f"Block {block.index} from the leader failed verification")
+            self.applied_blocks += 1
+            self.last_applied_at = time.time()
@@ -1,137 +1,996 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import uvicorn
-import time
-import uuid
-import sys
-import os
-
-app = FastAPI(
-    title="UAV Authentication System API",
-    description="Blockchain-based authentication system for UAVs using Proof of History",
-    version="1.0.0",
-    contact={
-        "name": "Muntasir-Mamun7",
-        "email": "munmamun9@gmail.com"
-    },
-)
-# Add parent directory to path so we can import modules
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from blockchain.blockchain import Blockchain
-
-app = FastAPI(title="UAV Authentication System")
-blockchain = Blockchain()
-
-class UavRegistration(BaseModel):
-    uav_id: str
-    public_key: str
-    model: str
-    firmware_version: str
-
-class UavAuthentication(BaseModel):
-    uav_id: str
-    nonce: str
-    timestamp: int
-    signature: str
-
-@app.get("/")
-def read_root():
-    return "UAV Authentication System API is running..."
-
-@app.get("/api/v1/blockchain/stats")
-def get_blockchain_stats():
-    """Get blockchain statistics"""
-    return {
-        "success": True,
-        "message": "Blockchain statistics",
-        "data": {
-            "blocks": len(blockchain.chain),
-            "registered_uavs": len(blockchain.registered_uavs),
-            "last_block_time": blockchain.get_latest_block().timestamp
-        }
-    }
-
-@app.post("/api/v1/uav/register")
-def register_uav(registration: UavRegistration):
-    """Register a new UAV"""
-    success, message = blockchain.register_uav(
-        registration.uav_id,
-        registration.public_key,
-        registration.model,
-        registration.firmware_version
-    )
-    
-    if not success:
-        return {
-            "success": False,
-            "message": message,
-            "data": None
-        }
-    
-    # Mine a new block with the registration transaction
-    block = blockchain.mine_block()
-    
-    return {
-        "success": True,
-        "message": f"UAV {registration.uav_id} successfully registered",
-        "data": {
-            "block_number": block.index,
-            "uav_id": registration.uav_id
-        }
-    }
-
-@app.post("/api/v1/uav/authenticate")
-def authenticate_uav(authentication: UavAuthentication):
-    """Authenticate a UAV"""
-    success, message = blockchain.authenticate_uav(
-        authentication.uav_id,
-        authentication.nonce,
-        authentication.timestamp,
-        authentication.signature
-    )
-    
-    if not success:
-        return {
-            "success": False,
-            "message": message,
-            "data": None
-        }
-    
-    # Mine a new block with the authentication transaction
-    block = blockchain.mine_block()
-    
-    return {
-        "success": True,
-        "message": f"UAV {authentication.uav_id} successfully authenticated",
-        "data": {
-            "block_number": block.index,
-            "uav_id": authentication.uav_id,
-            "timestamp": authentication.timestamp
-        }
-    }
-
-@app.get("/api/v1/uav/status/{uav_id}")
-def get_uav_status(uav_id: str):
-    """Get UAV status"""
-    status = blockchain.get_uav_status(uav_id)
-    
-    if not status:
-        return {
-            "success": False,
-            "message": f"UAV {uav_id} is not registered",
-            "data": None
-        }
-    
-    return {
-        "success": True,
-        "message": f"UAV {uav_id} status",
-        "data": {
-            "uav_id": uav_id,
-            "last_authenticated": status["last_auth"],
-            "firmware": status["firmware_version"]
-        }
-    }
-
-if __name__ == "__main__":
-    uvicorn.run("server:app", host="0.0.0.0", port=8080, reload=True)
\ No newline at end of file
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import List, Optional
+import uvicorn
+import asyncio
+import threading
+import time
+import uuid
+import sys
+import os
+
+app = FastAPI(
+    title="UAV Authentication System API",
+    description="Blockchain-based authentication system for UAVs using Proof of History",
+    version="1.0.0",
+    contact={
+        "name": "Muntasir-Mamun7",
+        "email": "munmamun9@gmail.com"
+    },
+)
+# Add parent directory to path so we can import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blockchain.producer import BlockProducer
+from crypto.sessions import SessionSigner
+from server import config
+from server.events import EVENT_TYPES, EventHub, event_stream
+from server.ledger import LedgerWriter, RemoteLedger
+from server.metrics import ServerMetrics, hot_path_targets
+from server.read_model import ResponseCache, SnapshotCache, etag_matches
+from server.replication import HEIGHT_HEADER, Follower, block_stream, fetch_genesis
+from server.sessions import FLUSH_INTERVAL, SessionTracker
+from server.sharding import ShardedLedger
+
+app = FastAPI(title="UAV Authentication System")
+follower = None
+if config.SHARD_ADDRESSES:
+    # HTTP worker of a sharded launch, every shard of the ledger lives in its own process
+    ledger = ShardedLedger(
+        [config.parse_address(address) for address in config.SHARD_ADDRESSES],
+        bytes.fromhex(config.LEDGER_AUTHKEY),
+        config.parse_address(config.ANCHOR_ADDRESS) if config.ANCHOR_ADDRESS else None
+    )
+    blockchain = None
+    producer = None
+elif config.LEDGER_ADDRESS:
+    # HTTP worker of a multi-worker launch, the ledger lives in its own process
+    ledger = RemoteLedger(config.parse_address(config.LEDGER_ADDRESS), bytes.fromhex(config.LEDGER_AUTHKEY))
+    blockchain = None
+    producer = None
+elif config.FOLLOW:
+    # Read-only replica, every block comes from the leader
+    blockchain = config.create_blockchain(genesis=fetch_genesis(config.FOLLOW))
+    follower = Follower(blockchain, config.FOLLOW, config.REPLICATION_BATCH)
+    producer = None
+    ledger = None
+else:
+    blockchain = config.create_blockchain()
+    producer = BlockProducer(blockchain, config.BLOCK_SIZE, config.BLOCK_INTERVAL) if config.BLOCK_PRODUCER else None
+    ledger = LedgerWriter(blockchain, config.BLOCK_SIZE, config.LEDGER_QUEUE) if config.LEDGER_WRITER else None
+sharded = isinstance(ledger, ShardedLedger)
+snapshots = SnapshotCache(blockchain) if blockchain and not ledger else None
+# Stats and status bodies are encoded once per change and then served as bytes
+responses = ResponseCache(config.STATUS_CACHE)
+verifier = blockchain.verifier if blockchain else None
+poh_clock = blockchain.poh_clock if blockchain else None
+metrics = ServerMetrics(hot_path_targets())
+events = EventHub(config.EVENT_BUFFER)
+if blockchain:
+    blockchain.block_listeners.append(events.publish)
+# Session tokens let ground infrastructure re-check a UAV without a ledger write per check
+sessions = None
+if config.SESSION_TTL:
+    sessions = SessionSigner(bytes.fromhex(config.SESSION_KEY) if config.SESSION_KEY else None, config.SESSION_TTL)
+session_usage = SessionTracker()
+session_flusher = None
+# Challenges are checked by the ledger, which shares the key in multi-worker mode
+challenges = blockchain.challenges if blockchain else config.create_challenge_issuer()
+if config.METRICS_TIMING:
+    metrics.timer.enable()
+# Inline mode runs handlers on the threadpool, adding a transaction and mining its block is one step.
+# It is the chain's own lock, so reads of the chain and history that take it never see a block half added or pruned
+write_lock = blockchain.lock if blockchain else threading.RLock()
+
+# Longest string fields accepted from clients, stored strings can take at most 65535 bytes
+MAX_NAME_LENGTH = 256
+# Hex of a raw Ed25519 public key and signature
+PUBLIC_KEY_LENGTH = 64
+SIGNATURE_LENGTH = 128
+
+class UavRegistration(BaseModel):
+    uav_id: str = Field(max_length=MAX_NAME_LENGTH)
+    public_key: str = Field(max_length=PUBLIC_KEY_LENGTH)
+    model: str = Field(max_length=MAX_NAME_LENGTH)
+    firmware_version: str = Field(max_length=MAX_NAME_LENGTH)
+
+class UavAuthentication(BaseModel):
+    uav_id: str = Field(max_length=MAX_NAME_LENGTH)
+    nonce: str = Field(max_length=MAX_NAME_LENGTH)
+    timestamp: int
+    signature: str = Field(max_length=SIGNATURE_LENGTH)
+
+class UavRevocation(BaseModel):
+    uav_id: str = Field(max_length=MAX_NAME_LENGTH)
+    timestamp: int
+    signature: str = Field(max_length=SIGNATURE_LENGTH)
+
+class UavKeyRotation(BaseModel):
+    uav_id: str = Field(max_length=MAX_NAME_LENGTH)
+    public_key: str = Field(max_length=PUBLIC_KEY_LENGTH)
+    timestamp: int
+    signature: str = Field(max_length=SIGNATURE_LENGTH)
+
+class SessionToken(BaseModel):
+    token: str = Field(max_length=4096)
+
+class UavRegistrationBatch(BaseModel):
+    registrations: List[UavRegistration]
+
+class UavAuthenticationBatch(BaseModel):
+    authentications: List[UavAuthentication]
+
+@app.on_event("startup")
+async def start_producer():
+    global session_flusher
+    events.start(asyncio.get_running_loop())
+    if poh_clock:
+        poh_clock.start()
+    if producer:
+        producer.start()
+    if ledger:
+        await ledger.start()
+    if follower:
+        await follower.start()
+    if sessions and not follower:
+        session_flusher = asyncio.create_task(flush_sessions())
+
+@app.on_event("shutdown")
+async def stop_producer():
+    metrics.profiler.stop()
+    events.close()
+    if follower:
+        await follower.stop()
+    if session_flusher:
+        session_flusher.cancel()
+        # Sessions still running are summarized as they stand
+        await commit_sessions(session_usage.due(everything=True))
+    if ledger:
+        await ledger.stop()
+    if producer:
+        producer.stop()
+    if poh_clock:
+        poh_clock.stop()
+    if blockchain:
+        verifier.shutdown()
+        blockchain.close()
+
+def commit_receipt(receipt, wait):
+    """Build the block part of a response in block producer mode"""
+    block_number = receipt.wait(config.SEAL_TIMEOUT) if wait else None
+    return {
+        "block_number": block_number,
+        "tx_id": receipt.tx_id,
+        "receipt": receipt.to_dict()
+    }
+
+def ledger_response(result, message, **data):
+    """Build a response from a ledger result dictionary"""
+    if not result["success"]:
+        return {
+            "success": False,
+            "message": result["message"],
+            "data": None
+        }
+    
+    return {
+        "success": True,
+        "message": message,
+        "data": {
+            "block_number": result["block_number"],
+            "tx_id": result["tx_id"],
+            "uav_id": result["uav_id"],
+            **({"shard": result["shard"]} if "shard" in result else {}),
+            **data
+        }
+    }
+
+def batch_response(results, action):
+    """Build the response of a batch endpoint from per-item result dictionaries"""
+    succeeded = sum(1 for result in results if result["success"])
+    return {
+        "success": succeeded == len(results),
+        "message": f"{succeeded} of {len(results)} UAVs {action}",
+        "data": {
+            "results": [
+                {
+                    "uav_id": result["uav_id"],
+                    "success": result["success"],
+                    "message": result["message"],
+                    "block_number": result.get("block_number"),
+                    "tx_id": result.get("tx_id"),
+                    "receipt_id": result.get("receipt_id"),
+                    **({"shard": result["shard"]} if "shard" in result else {})
+                }
+                for result in results
+            ]
+        }
+    }
+
+def batch_too_large(count):
+    """Response for a batch above the configured limit"""
+    return {
+        "success": False,
+        "message": f"Batch of {count} items exceeds the limit of {config.MAX_BATCH}",
+        "data": None
+    }
+
+def cached_response(request, key, source, build):
+    """Serve a cached JSON body with its ETag, or 304 if the client already has it"""
+    etag, body = responses.get(key, source, build)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+def read_only():
+    """Response for writes sent to a follower"""
+    return {
+        "success": False,
+        "message": f"This node is a read-only follower, send writes to the leader at {config.FOLLOW}",
+        "data": None
+    }
+
+def pruned_blocks(start):
+    """410 response for replication requests that start behind the pruned height"""
+    return JSONResponse(status_code=410, content={
+        "success": False,
+        "message": f"Blocks from {start} are pruned, this node keeps bodies from block {blockchain.pruned_height} on",
+        "data": {"pruned_height": blockchain.pruned_height}
+    })
+
+def worker_unavailable(feature):
+    """Response for chain internals that only the ledger process holds"""
+    return {
+        "success": False,
+        "message": f"{feature} is not available on multi-worker HTTP workers",
+        "data": None
+    }
+
+@app.get("/")
+async def read_root():
+    return "UAV Authentication System API is running..."
+
+@app.get("/api/v1/blockchain/stats")
+async def get_blockchain_stats(request: Request):
+    """Get blockchain statistics, supports If-None-Match"""
+    snapshot = await ledger.get_snapshot() if ledger else snapshots.get()
+    
+    return cached_response(request, ("stats",), snapshot, lambda: {
+        "success": True,
+        "message": "Blockchain statistics",
+        "data": snapshot.to_dict()
+    })
+
+@app.get("/api/v1/blockchain/verify")
+async def verify_blockchain(full: bool = False):
+    """Validate the chain, only new blocks unless a full audit is requested"""
+    if not blockchain:
+        return worker_unavailable("Chain validation")
+    
+    valid = await run_in_threadpool(blockchain.is_chain_valid, full=full)
+    
+    return {
+        "success": valid,
+        "message": "Blockchain is valid" if valid else "Blockchain validation failed",
+        "data": {
+            "blocks": len(blockchain.chain),
+            "verified_height": blockchain.verified_height,
+            "pruned_height": blockchain.pruned_height,
+            "full": full
+        }
+    }
+
+@app.get("/api/v1/blockchain/checkpoints")
+async def get_checkpoints(limit: int = 100):
+    """Get the latest checkpoints, newest first, and how far the chain is pruned"""
+    if not blockchain:
+        return worker_unavailable("Checkpoints")
+    
+    checkpoints = blockchain.get_checkpoints(page_size(limit))
+    return {
+        "success": True,
+        "message": f"{len(checkpoints['checkpoints'])} checkpoints",
+        "data": checkpoints
+    }
+
+@app.get("/api/v1/poh/clock")
+async def get_poh_clock():
+    """Get the position and speed of the continuous PoH clock"""
+    if not blockchain:
+        return worker_unavailable("The PoH clock")
+    if not poh_clock:
+        return {
+            "success": False,
+            "message": "PoH clock is not enabled",
+            "data": None
+        }
+    
+    count, current_hash = poh_clock.position()
+    return {
+        "success": True,
+        "message": "PoH clock status",
+        "data": {
+            "count": count,
+            "hash": current_hash,
+            "hashes_per_second": poh_clock.hashes_per_second,
+            "checkpoints": len(poh_clock.checkpoint_counts),
+            "events": len(poh_clock.event_counts)
+        }
+    }
+
+@app.post("/api/v1/uav/register")
+async def register_uav(registration: UavRegistration, wait: bool = True):
+    """Register a new UAV"""
+    if follower:
+        return read_only()
+    if ledger:
+        result = await ledger.register_uav(
+            registration.uav_id,
+            registration.public_key,
+            registration.model,
+            registration.firmware_version
+        )
+        response = ledger_response(result, f"UAV {registration.uav_id} successfully registered")
+    else:
+        response = await run_in_threadpool(register_uav_blocking, registration, wait)
+    
+    metrics.record_registration(response["success"])
+    return response
+
+def register_uav_blocking(registration, wait):
+    """Register a UAV in inline or block producer mode, runs on the threadpool"""
+    if producer:
+        success, message, receipt = producer.register_uav(
+            registration.uav_id,
+            registration.public_key,
+            registration.model,
+            registration.firmware_version
+        )
+    else:
+        with write_lock:
+            success, message = blockchain.register_uav(
+                registration.uav_id,
+                registration.public_key,
+                registration.model,
+                registration.firmware_version
+            )
+            if success:
+                # Mine a new block with the registration transaction
+                block = blockchain.mine_block()
+    
+    if not success:
+        return {
+            "success": False,
+            "message": message,
+            "data": None
+        }
+    
+    if producer:
+        # The block producer seals the transaction together with others
+        data = commit_receipt(receipt, wait)
+    else:
+        data = {"block_number": block.index, "tx_id": block.tx_hashes[-1].hex()}
+    
+    data["uav_id"] = registration.uav_id
+    return {
+        "success": True,
+        "message": f"UAV {registration.uav_id} successfully registered",
+        "data": data
+    }
+
+@app.get("/api/v1/uav/{uav_id}/challenge")
+async def get_challenge(uav_id: str):
+    """Issue a nonce for the UAV to sign, nothing is stored until it is used"""
+    if follower:
+        return read_only()
+    if not challenges:
+        return {
+            "success": False,
+            "message": "Challenges are not enabled, set UAV_CHALLENGE_TTL",
+            "data": None
+        }
+    
+    nonce, expires_at = challenges.issue(uav_id)
+    return {
+        "success": True,
+        "message": f"Challenge for UAV {uav_id}",
+        "data": {"uav_id": uav_id, "nonce": nonce, "expires_at": expires_at}
+    }
+
+@app.post("/api/v1/uav/authenticate")
+async def authenticate_uav(authentication: UavAuthentication, wait: bool = True):
+    """Authenticate a UAV"""
+    if follower:
+        return read_only()
+    if ledger:
+        result = await ledger.authenticate_uav(
+            authentication.uav_id,
+            authentication.nonce,
+            authentication.timestamp,
+            authentication.signature
+        )
+        response = ledger_response(
+            result,
+            f"UAV {authentication.uav_id} successfully authenticated",
+            timestamp=authentication.timestamp
+        )
+    else:
+        response = await run_in_threadpool(authenticate_uav_blocking, authentication, wait)
+    
+    # Only a signature that was checked and sealed earns a token, not a pending receipt
+    if sessions and response["success"] and response["data"]["block_number"] is not None:
+        public_key, _ = await key_state(authentication.uav_id)
+        token, session = sessions.issue(authentication.uav_id, public_key)
+        response["data"]["session_token"] = token
+        response["data"]["session_expires_at"] = session.expires_at
+    
+    metrics.record_authentication(response["success"], response["message"])
+    return response
+
+def authenticate_uav_blocking(authentication, wait):
+    """Authenticate a UAV in inline or block producer mode, runs on the threadpool"""
+    if producer:
+        success, message, receipt = producer.authenticate_uav(
+            authentication.uav_id,
+            authentication.nonce,
+            authentication.timestamp,
+            authentication.signature
+        )
+    else:
+        with write_lock:
+            success, message = blockchain.authenticate_uav(
+                authentication.uav_id,
+                authentication.nonce,
+                authentication.timestamp,
+                authentication.signature
+            )
+            if success:
+                # Mine a new block with the authentication transaction
+                block = blockchain.mine_block()
+    
+    if not success:
+        return {
+            "success": False,
+            "message": message,
+            "data": None
+        }
+    
+    if producer:
+        # The block producer verifies and seals the transaction together with others
+        data = commit_receipt(receipt, wait)
+        if receipt.success is False:
+            return {
+                "success": False,
+                "message": receipt.message,
+                "data": None
+            }
+    else:
+        data = {"block_number": block.index, "tx_id": block.tx_hashes[-1].hex()}
+    
+    data["uav_id"] = authentication.uav_id
+    data["timestamp"] = authentication.timestamp
+    return {
+        "success": True,
+        "message": f"UAV {authentication.uav_id} successfully authenticated",
+        "data": data
+    }
+
+@app.post("/api/v1/session/verify")
+async def verify_session(body: SessionToken):
+    """Check a session token against the UAV's current key, nothing is written to the ledger"""
+    if not sessions:
+        return sessions_disabled()
+    
+    session = sessions.verify(body.token)
+    if not session:
+        metrics.record_session_check(False)
+        return {
+            "success": False,
+            "message": "Invalid or expired session token",
+            "data": None
+        }
+    
+    # The signature cannot tell whether the UAV was revoked or changed keys since
+    if not sessions.is_current(session, await key_state(session.uav_id)):
+        metrics.record_session_check(False)
+        return {
+            "success": False,
+            "message": f"Session of UAV {session.uav_id} ended, the UAV was revoked or rotated its key",
+            "data": None
+        }
+    
+    metrics.record_session_check(True)
+    session_usage.record(session)
+    return {
+        "success": True,
+        "message": f"Session of UAV {session.uav_id} is valid",
+        "data": session.to_dict()
+    }
+
+@app.get("/api/v1/session/key")
+async def get_session_key():
+    """Public key that session tokens are signed with, for checking them offline"""
+    if not sessions:
+        return sessions_disabled()
+    
+    return {
+        "success": True,
+        "message": "Session token public key",
+        "data": {"algorithm": "Ed25519", "public_key": sessions.public_key_hex(), "ttl": sessions.ttl}
+    }
+
+async def key_state(uav_id):
+    """The (public_key, revoked) of a UAV in any ledger mode, or None"""
+    if ledger:
+        return await ledger.get_key_state(uav_id)
+    return blockchain.registry.key_state(uav_id)
+
+def sessions_disabled():
+    """Response for the session endpoints when tokens are turned off"""
+    return {
+        "success": False,
+        "message": "Session tokens are not enabled, set UAV_SESSION_TTL",
+        "data": None
+    }
+
+async def flush_sessions():
+    """Commit the summaries of expired sessions every FLUSH_INTERVAL seconds"""
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL)
+        try:
+            await commit_sessions(session_usage.due())
+        except Exception:
+            # The summaries of this round are lost, the tokens themselves stay valid
+            pass
+
+async def commit_sessions(summaries):
+    """Write session summaries to the ledger as SESSION transactions"""
+    if not summaries:
+        return
+    if ledger:
+        await ledger.record_sessions(summaries)
+    else:
+        await run_in_threadpool(record_sessions_blocking, summaries)
+
+def record_sessions_blocking(summaries):
+    """Commit session summaries in inline or block producer mode, runs on the threadpool"""
+    if producer:
+        # Nobody waits for these, the producer seals them with its next block
+        producer.record_sessions(summaries)
+        return
+    
+    with write_lock:
+        mined_results([blockchain.record_session(*summary) for summary in summaries], summaries)
+
+@app.post("/api/v1/uav/revoke")
+async def revoke_uav(revocation: UavRevocation, wait: bool = True):
+    """Revoke a UAV, signed with its own key over "revoke:" + uav_id + timestamp"""
+    if follower:
+        return read_only()
+    args = (revocation.uav_id, revocation.timestamp, revocation.signature)
+    if ledger:
+        result = await ledger.revoke_uav(*args)
+    else:
+        result = await run_in_threadpool(key_change_blocking, 'revoke_uav', args, wait)
+    return ledger_response(result, f"UAV {revocation.uav_id} revoked")
+
+@app.post("/api/v1/uav/rotate-key")
+async def rotate_key(rotation: UavKeyRotation, wait: bool = True):
+    """Replace a UAV's key, signed with the old key over "rotate:" + uav_id + new key + timestamp"""
+    if follower:
+        return read_only()
+    args = (rotation.uav_id, rotation.public_key, rotation.timestamp, rotation.signature)
+    if ledger:
+        result = await ledger.rotate_key(*args)
+    else:
+        result = await run_in_threadpool(key_change_blocking, 'rotate_key', args, wait)
+    return ledger_response(result, f"Key of UAV {rotation.uav_id} rotated")
+
+def key_change_blocking(method, args, wait):
+    """Revoke a UAV or rotate its key in inline or block producer mode, runs on the threadpool"""
+    if producer:
+        success, message, receipt = getattr(producer, method)(*args)
+        result = {"success": success, "message": message, "uav_id": args[0]}
+        if success:
+            result.update(commit_receipt(receipt, wait))
+        return result
+    
+    with write_lock:
+        outcome = getattr(blockchain, method)(*args)
+        return mined_results([outcome], [args])[0]
+
+@app.post("/api/v1/uav/register:batch")
+async def register_batch(batch: UavRegistrationBatch, wait: bool = True):
+    """Register a fleet of UAVs in one block"""
+    if follower:
+        return read_only()
+    if len(batch.registrations) > config.MAX_BATCH:
+        return batch_too_large(len(batch.registrations))
+    
+    registrations = [
+        (registration.uav_id, registration.public_key, registration.model, registration.firmware_version)
+        for registration in batch.registrations
+    ]
+    if ledger:
+        results = await ledger.register_batch(registrations)
+    else:
+        results = await run_in_threadpool(register_batch_blocking, registrations, wait)
+    for result in results:
+        metrics.record_registration(result["success"])
+    return batch_response(results, "registered")
+
+def register_batch_blocking(registrations, wait):
+    """Register a fleet in inline or block producer mode, runs on the threadpool"""
+    if producer:
+        outcomes = producer.register_batch(registrations)
+        return receipt_results(outcomes, registrations, wait)
+    
+    with write_lock:
+        outcomes = [blockchain.register_uav(*registration) for registration in registrations]
+        return mined_results(outcomes, registrations)
+
+@app.post("/api/v1/uav/authenticate:batch")
+async def authenticate_batch(batch: UavAuthenticationBatch, wait: bool = True):
+    """Authenticate a fleet of UAVs in one block, signatures are verified as one batch"""
+    if follower:
+        return read_only()
+    if len(batch.authentications) > config.MAX_BATCH:
+        return batch_too_large(len(batch.authentications))
+    
+    authentications = [
+        (authentication.uav_id, authentication.nonce, authentication.timestamp, authentication.signature)
+        for authentication in batch.authentications
+    ]
+    if ledger:
+        results = await ledger.authenticate_batch(authentications)
+    else:
+        results = await run_in_threadpool(authenticate_batch_blocking, authentications, wait)
+    for result in results:
+        metrics.record_authentication(result["success"], result["message"])
+    return batch_response(results, "authenticated")
+
+def authenticate_batch_blocking(authentications, wait):
+    """Authenticate a fleet in inline or block producer mode, runs on the threadpool"""
+    if producer:
+        outcomes = producer.authenticate_batch(authentications)
+        return receipt_results(outcomes, authentications, wait)
+    
+    with write_lock:
+        outcomes = blockchain.authenticate_batch(authentications)
+        return mined_results(outcomes, authentications)
+
+def mined_results(outcomes, items):
+    """Mine the pending transactions of a batch into one block, returns per-item results"""
+    block = blockchain.mine_block()
+    results = []
+    position = 0
+    for (success, message), item in zip(outcomes, items):
+        result = {"success": success, "message": message, "uav_id": item[0]}
+        if success:
+            result["block_number"] = block.index
+            result["tx_id"] = block.tx_hashes[position].hex()
+            position += 1
+        results.append(result)
+    return results
+
+def receipt_results(outcomes, items, wait):
+    """Wait for the receipts of a batch queued with the block producer, returns per-item results"""
+    results = []
+    for (success, message, receipt), item in zip(outcomes, items):
+        result = {"success": success, "message": message, "uav_id": item[0]}
+        if success:
+            result["block_number"] = receipt.wait(config.SEAL_TIMEOUT) if wait else None
+            result["tx_id"] = receipt.tx_id
+            result["receipt_id"] = receipt.receipt_id
+            if receipt.success is False:
+                result["success"] = False
+                result["message"] = receipt.message
+            elif receipt.is_sealed() and receipt.tx_type == 'AUTHENTICATE':
+                result["message"] = "UAV authenticated successfully"
+        results.append(result)
+    return results
+
+@app.get("/api/v1/receipts/{receipt_id}")
+async def get_receipt(receipt_id: str):
+    """Get the sealing status of a transaction accepted in block producer mode"""
+    receipt = producer.get_receipt(receipt_id) if producer else None
+    
+    if not receipt:
+        return {
+            "success": False,
+            "message": f"Receipt {receipt_id} not found",
+            "data": None
+        }
+    
+    return {
+        "success": True,
+        "message": f"Receipt {receipt_id} status",
+        "data": receipt.to_dict()
+    }
+
+@app.get("/api/v1/tx/{tx_id}/proof")
+async def get_transaction_proof(tx_id: str):
+    """Get a Merkle inclusion proof for a sealed transaction"""
+    if not blockchain:
+        return worker_unavailable("Inclusion proofs")
+    
+    proof = await run_in_threadpool(blockchain.get_transaction_proof, tx_id)
+    
+    if not proof:
+        return {
+            "success": False,
+            "message": f"Transaction {tx_id} not found",
+            "data": None
+        }
+    
+    return {
+        "success": True,
+        "message": f"Inclusion proof for transaction {tx_id}",
+        "data": proof
+    }
+
+@app.get("/api/v1/uav/status/{uav_id}")
+async def get_uav_status(uav_id: str, request: Request):
+    """Get UAV status, supports If-None-Match"""
+    if ledger:
+        status = await ledger.get_uav_status(uav_id)
+    else:
+        status = blockchain.registry.status(uav_id)
+    
+    if not status:
+        return {
+            "success": False,
+            "message": f"UAV {uav_id} is not registered",
+            "data": None
+        }
+    
+    last_auth, firmware_version, revoked = status
+    return cached_response(request, ("status", uav_id), status, lambda: {
+        "success": True,
+        "message": f"UAV {uav_id} status",
+        "data": {
+            "uav_id": uav_id,
+            "last_authenticated": last_auth,
+            "firmware": firmware_version,
+            "revoked": revoked
+        }
+    })
+
+@app.get("/api/v1/uavs")
+async def find_uavs(model: Optional[str] = None, firmware: Optional[str] = None, include_revoked: bool = False,
+                    limit: int = 100, cursor: int = 0, shard: int = 0):
+    """List the UAVs with a model and/or firmware version, paginated with next_cursor"""
+    if model is None and firmware is None:
+        return {
+            "success": False,
+            "message": "Give a model or a firmware version",
+            "data": None
+        }
+    
+    args = (model, firmware, include_revoked, cursor, page_size(limit))
+    if blockchain:
+        page = await run_in_threadpool(blockchain.registry.find, *args)
+    elif sharded:
+        # Every shard has its own registry
+        if not 0 <= shard < len(ledger.shards):
+            return {
+                "success": False,
+                "message": f"Shard {shard} does not exist, there are {len(ledger.shards)} shards",
+                "data": None
+            }
+        page = await ledger.find_uavs(*args, shard)
+    else:
+        page = await ledger.find_uavs(*args)
+    
+    return {
+        "success": True,
+        "message": f"{len(page['uav_ids'])} UAVs",
+        "data": page
+    }
+
+@app.get("/api/v1/uavs/counts")
+async def count_uavs(by: str = "firmware_version"):
+    """Count the UAVs that are not revoked per model or firmware version"""
+    if by not in ("model", "firmware_version"):
+        return {
+            "success": False,
+            "message": "Counts are kept by model and firmware_version",
+            "data": None
+        }
+    
+    counts = await ledger.count_uavs(by) if ledger else blockchain.registry.counts(by)
+    return {
+        "success": True,
+        "message": f"UAVs by {by}",
+        "data": {"by": by, "counts": counts}
+    }
+
+def read_locked(read, *args):
+    """Run a read of the chain or history index under the chain lock, runs on the threadpool"""
+    with blockchain.lock:
+        return read(*args)
+
+def page_size(limit):
+    """Clamp a requested page size to the configured maximum"""
+    return max(1, min(limit, config.MAX_PAGE))
+
+@app.get("/api/v1/uav/{uav_id}/history")
+async def get_uav_history(uav_id: str, since: Optional[int] = None, limit: int = 100, cursor: int = 0):
+    """Get the sealed transactions of a UAV, oldest first, paginated with next_cursor"""
+    if blockchain:
+        history = await run_in_threadpool(read_locked, blockchain.get_uav_history, uav_id, since, cursor, page_size(limit))
+    else:
+        history = await ledger.get_uav_history(uav_id, since, cursor, page_size(limit))
+    
+    if history is None:
+        return {
+            "success": False,
+            "message": f"No transactions for UAV {uav_id}",
+            "data": None
+        }
+    
+    return {
+        "success": True,
+        "message": f"UAV {uav_id} history",
+        "data": history
+    }
+
+@app.get("/api/v1/blocks")
+async def get_blocks(start_time: Optional[int] = Query(None, alias="from"),
+                     end_time: Optional[int] = Query(None, alias="to"),
+                     limit: int = 100, cursor: Optional[int] = None, shard: int = 0):
+    """List block headers sealed in [from, to) by unix time, paginated with next_cursor"""
+    if blockchain:
+        page = await run_in_threadpool(read_locked, blockchain.get_blocks, start_time, end_time, cursor, page_size(limit))
+    elif sharded:
+        # Every shard has its own block sequence
+        if not 0 <= shard < len(ledger.shards):
+            return {
+                "success": False,
+                "message": f"Shard {shard} does not exist, there are {len(ledger.shards)} shards",
+                "data": None
+            }
+        page = await ledger.get_blocks(start_time, end_time, cursor, page_size(limit), shard)
+    else:
+        page = await ledger.get_blocks(start_time, end_time, cursor, page_size(limit))
+    
+    return {
+        "success": True,
+        "message": f"{len(page['blocks'])} blocks",
+        "data": page
+    }
+
+@app.get("/api/v1/events")
+async def stream_events(request: Request, start: Optional[int] = Query(None, alias="from"),
+                        uav_id: Optional[str] = None, types: Optional[str] = None):
+    """Server-sent events for sealed blocks and their transactions, filtered by type and UAV"""
+    if not blockchain:
+        return worker_unavailable("The event feed")
+    
+    # EventSource clients reconnect with the id of the last event they got
+    last_event_id = request.headers.get("last-event-id")
+    if start is None and last_event_id and last_event_id.isdigit():
+        start = int(last_event_id)
+    event_types = tuple(types.split(",")) if types else EVENT_TYPES
+    unknown = [event_type for event_type in event_types if event_type not in EVENT_TYPES]
+    if unknown:
+        return {
+            "success": False,
+            "message": f"Unknown event types {', '.join(unknown)}, use {', '.join(EVENT_TYPES)}",
+            "data": None
+        }
+    if start is not None and start < blockchain.pruned_height:
+        return pruned_blocks(start)
+    
+    # Subscribe before reading back, so no block falls between the two
+    subscription = events.subscribe(event_types, uav_id)
+    height = len(blockchain.chain) if start is None else start
+    return StreamingResponse(event_stream(events, blockchain, subscription, height), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+@app.get("/api/v1/shards")
+async def get_shards(limit: int = 10):
+    """Per-shard statistics and the latest global PoH anchors of a sharded ledger"""
+    if not sharded:
+        return {
+            "success": False,
+            "message": "The ledger is not sharded",
+            "data": None
+        }
+    
+    return {
+        "success": True,
+        "message": f"{len(ledger.shards)} shards",
+        "data": {
+            "shards": [{"shard": index, **shard.snapshot.to_dict()} for index, shard in enumerate(ledger.shards)],
+            "anchors": await ledger.get_anchors(page_size(limit))
+        }
+    }
+
+@app.get("/api/v1/replication/blocks")
+async def get_block_records(start: int = Query(0, alias="from"), limit: int = 500):
+    """Encoded blocks from a height on, for followers catching up"""
+    if not blockchain:
+        return worker_unavailable("Replication")
+    
+    # Checked under the chain lock, pruning may run between any two requests
+    records = await run_in_threadpool(blockchain.get_block_records, start, max(1, min(limit, config.REPLICATION_BATCH)))
+    if records is None:
+        return pruned_blocks(start)
+    return Response(content=records, media_type="application/octet-stream",
+                    headers={HEIGHT_HEADER: str(len(blockchain.chain))})
+
+@app.get("/api/v1/replication/stream")
+async def stream_block_records(start: int = Query(0, alias="from")):
+    """Stream encoded blocks from a height on and then every newly sealed block"""
+    if not blockchain:
+        return worker_unavailable("Replication")
+    if start < blockchain.pruned_height:
+        return pruned_blocks(start)
+    
+    # Every batch is checked against the pruned height again, the stream ends once it falls behind
+    return StreamingResponse(block_stream(blockchain, start, config.REPLICATION_BATCH),
+                             media_type="application/octet-stream")
+
+@app.get("/api/v1/replication/status")
+async def get_replication_status():
+    """Role of this node and, on followers, how far behind the leader it is"""
+    if not blockchain:
+        return worker_unavailable("Replication")
+    
+    return {
+        "success": True,
+        "message": "Replication status",
+        "data": follower.status() if follower else {"role": "leader", "height": len(blockchain.chain)}
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Counters, gauges and stage timings in the Prometheus text format"""
+    snapshot = await ledger.get_snapshot() if ledger else snapshots.get()
+    return PlainTextResponse(metrics.render(snapshot), media_type="text/plain; version=0.0.4")
+
+# Profiling and stage timing can be switched on by anyone who reaches the API, so they are opt-in
+if config.DEBUG_ENDPOINTS:
+    @app.post("/api/v1/debug/timing")
+    async def set_stage_timing(enabled: bool):
+        """Turn the hot-path stage histograms on or off"""
+        if enabled:
+            metrics.timer.enable()
+        else:
+            metrics.timer.disable()
+        
+        return {
+            "success": True,
+            "message": f"Stage timing {'enabled' if enabled else 'disabled'}",
+            "data": {"enabled": metrics.timer.enabled}
+        }
+
+    @app.post("/api/v1/debug/profiler")
+    async def set_profiler(enabled: bool, interval: float = Query(0.005, gt=0.001, le=1.0)):
+        """Start or stop the sampling profiler, starting discards the previous samples"""
+        if enabled:
+            metrics.profiler.start(interval)
+        else:
+            await run_in_threadpool(metrics.profiler.stop)
+        
+        return {
+            "success": True,
+            "message": f"Profiler {'running' if metrics.profiler.running else 'stopped'}",
+            "data": {
+                "running": metrics.profiler.running,
+                "interval": metrics.profiler.interval,
+                "samples": metrics.profiler.sample_count
+            }
+        }
+
+    @app.get("/api/v1/debug/profiler", response_class=PlainTextResponse)
+    async def get_profile(limit: int = 100):
+        """The most frequent sampled stacks in collapsed format, for flame graph tools"""
+        return metrics.profiler.report(limit)
+
+if __name__ == "__main__":
+    # Development server with auto reload, use `python -m server` for production
+    uvicorn.run("server.server:app", host="0.0.0.0", port=8080, reload=True)
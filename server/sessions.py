@@ -0,0 +1,45 @@
+import time
+
+# Seconds between commits of the summaries of expired sessions
+FLUSH_INTERVAL = 5.0
+
+
+class SessionTracker:
+    """Usage of the session tokens checked by this process
+
+    Checking a token is stateless, this only counts the checks so that a
+    session leaves one summary transaction on the chain once it expires
+    instead of one transaction per check. Sessions that are never checked
+    leave nothing beyond the authentication that started them.
+    """
+
+    def __init__(self):
+        self.sessions = {}  # session_id -> [uav_id, issued_at, expires_at, last_seen, checks]
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def record(self, session, now=None):
+        """Count one successful check of a session"""
+        entry = self.sessions.get(session.session_id)
+        if entry is None:
+            entry = self.sessions[session.session_id] = [session.uav_id, session.issued_at, session.expires_at, 0, 0]
+        entry[3] = int(now or time.time())
+        entry[4] += 1
+
+    def due(self, now=None, everything=False):
+        """Remove and return the summaries of the sessions that expired
+
+        Summaries are (uav_id, session_id, issued_at, last_seen, checks)
+        tuples. With everything=True all sessions are summarized, for shutdown.
+        """
+        now = now or time.time()
+        expired = [
+            session_id for session_id, entry in self.sessions.items()
+            if everything or entry[2] <= now
+        ]
+        summaries = []
+        for session_id in expired:
+            uav_id, issued_at, _, last_seen, checks = self.sessions.pop(session_id)
+            summaries.append((uav_id, session_id, issued_at, last_seen, checks))
+        return summaries
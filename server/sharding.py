@@ -0,0 +1,270 @@
+import asyncio
+import hashlib
+import os
+import struct
+import threading
+from collections import deque
+from multiprocessing.managers import BaseManager
+
+from blockchain.storage import BlockLog
+from crypto.poh import ProofOfHistory, Tick
+from server.ledger import LedgerManager, RemoteLedger
+from server.read_model import LedgerSnapshot
+
+# Shard number, block height, block hash and PoH hash of a shard's latest block
+ANCHOR_FIELDS = struct.Struct('>HQ32s32s')
+
+
+def shard_for(uav_id, shards):
+    """Shard that owns a UAV, stable across processes unlike hash()"""
+    digest = hashlib.blake2b(uav_id.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % shards
+
+
+def decode_heads(data):
+    """Turn the data of an anchor tick back into the shard heads it commits to"""
+    return [
+        {'shard': shard, 'height': height, 'block_hash': block_hash.hex(), 'poh_hash': poh_hash.hex()}
+        for shard, height, block_hash, poh_hash in ANCHOR_FIELDS.iter_unpack(data)
+    ]
+
+
+class AnchorService:
+    """Global PoH sequence that anchors the PoH streams of all shards
+
+    Every interval seconds the latest block of every shard is read, and if
+    any shard sealed a block since the last anchor, one global tick commits
+    to the heads of all of them. The order of blocks across shards can then
+    be proven up to the anchor interval. Anchors are appended to a log in
+    storage_dir if given, only the latest keep are held in memory.
+    """
+
+    def __init__(self, shards, interval=1.0, storage_dir=None, keep=1000):
+        self.shards = shards  # ledger proxies, in shard order
+        self.interval = interval
+        self.poh = ProofOfHistory(ticks=())
+        self.anchors = deque(maxlen=keep)
+        self.heads = None
+
+        self.log = None
+        if storage_dir:
+            os.makedirs(storage_dir, exist_ok=True)
+            self.log = BlockLog(os.path.join(storage_dir, 'anchors.log'))
+            for payload in self.log.read():
+                tick, _ = Tick.decode(payload)
+                self.poh.append(tick)
+                self.anchors.append(tick)
+            if self.anchors:
+                self.heads = self.anchors[-1].data
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start anchoring in a background thread"""
+        self._thread = threading.Thread(target=self._run, name="poh-anchor", daemon=True)
+        self._thread.start()
+
+    def anchor(self):
+        """Tick the global PoH over the shard heads if any of them moved, returns the tick or None"""
+        heads = b''.join(
+            ANCHOR_FIELDS.pack(shard, *shard_ledger.get_head())
+            for shard, shard_ledger in enumerate(self.shards)
+        )
+        if heads == self.heads:
+            return None
+
+        tick = self.poh.tick(heads)
+        self.heads = heads
+        self.anchors.append(tick)
+        if self.log is not None:
+            self.log.append(tick.encode())
+        return tick
+
+    def get_anchors(self, limit=10):
+        """The latest anchors, newest first"""
+        return [
+            {**tick.to_dict(), 'data': None, 'heads': decode_heads(tick.data)}
+            for tick in list(self.anchors)[:-limit - 1:-1]
+        ]
+
+    def close(self):
+        """Stop anchoring and close the log"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.log is not None:
+            self.log.close()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.anchor()
+            except (OSError, EOFError):
+                # A shard is restarting or gone, the next round tries again
+                pass
+
+
+class AnchorManager(BaseManager):
+    """Multiprocessing manager that serves the AnchorService to HTTP workers"""
+
+
+# The service instance inside the anchor process
+_anchor = None
+
+
+def _get_anchor():
+    return _anchor
+
+
+def _start_anchor(addresses, authkey, interval, storage_dir):
+    """Anchor process initializer, connects to every shard's ledger process"""
+    global _anchor
+    shards = []
+    for address in addresses:
+        manager = LedgerManager(address=address, authkey=authkey)
+        manager.connect()
+        shards.append(manager.get_ledger())
+    _anchor = AnchorService(shards, interval, storage_dir)
+    _anchor.start()
+
+
+AnchorManager.register('get_anchor', callable=_get_anchor)
+
+
+def start_anchor_process(addresses, authkey, interval, storage_dir=None):
+    """Start the global PoH anchor process for running shards, returns the running manager"""
+    manager = AnchorManager(address=('127.0.0.1', 0), authkey=authkey)
+    manager.start(initializer=_start_anchor, initargs=(addresses, authkey, interval, storage_dir))
+    return manager
+
+
+class ShardedLedger:
+    """Async client for K ledger processes that each own the UAVs hashing to them
+
+    Every shard has its own mempool, nonce store, block sequence and PoH
+    stream, so registrations and authentications of different shards never
+    wait on each other. Calls are routed by uav_id, batches are split per
+    shard and run concurrently, and statistics are summed over all shards.
+    """
+
+    def __init__(self, addresses, authkey, anchor_address=None):
+        self.shards = [RemoteLedger(address, authkey) for address in addresses]
+        self.anchor_address = anchor_address
+        self.authkey = authkey
+        self.anchor = None
+        self._sources = None
+        self._snapshot = None
+
+    async def start(self):
+        """Connect to every shard and to the anchor process"""
+        await asyncio.gather(*(shard.start() for shard in self.shards))
+        if self.anchor_address:
+            manager = AnchorManager(address=self.anchor_address, authkey=self.authkey)
+            manager.connect()
+            self.anchor = manager.get_anchor()
+
+    async def stop(self):
+        """Stop refreshing the shard snapshots"""
+        await asyncio.gather(*(shard.stop() for shard in self.shards))
+
+    def route(self, uav_id):
+        """The shard client that owns a UAV"""
+        return self.shards[shard_for(uav_id, len(self.shards))]
+
+    async def register_uav(self, uav_id, public_key, model, firmware_version):
+        """Register a UAV on its shard"""
+        shard = shard_for(uav_id, len(self.shards))
+        result = await self.shards[shard].register_uav(uav_id, public_key, model, firmware_version)
+        return {**result, 'shard': shard}
+
+    async def authenticate_uav(self, uav_id, nonce, timestamp, signature):
+        """Authenticate a UAV on its shard"""
+        shard = shard_for(uav_id, len(self.shards))
+        result = await self.shards[shard].authenticate_uav(uav_id, nonce, timestamp, signature)
+        return {**result, 'shard': shard}
+
+    async def revoke_uav(self, uav_id, timestamp, signature):
+        """Revoke a UAV on its shard"""
+        shard = shard_for(uav_id, len(self.shards))
+        result = await self.shards[shard].revoke_uav(uav_id, timestamp, signature)
+        return {**result, 'shard': shard}
+
+    async def rotate_key(self, uav_id, public_key, timestamp, signature):
+        """Replace a UAV's key on its shard"""
+        shard = shard_for(uav_id, len(self.shards))
+        result = await self.shards[shard].rotate_key(uav_id, public_key, timestamp, signature)
+        return {**result, 'shard': shard}
+
+    async def register_batch(self, registrations):
+        """Register several UAVs, one concurrent batch per shard"""
+        return await self._split('register_batch', registrations)
+
+    async def authenticate_batch(self, authentications):
+        """Authenticate several UAVs, one concurrent batch per shard"""
+        return await self._split('authenticate_batch', authentications)
+
+    async def record_sessions(self, summaries):
+        """Commit session summaries, each on the shard of its UAV"""
+        return await self._split('record_sessions', summaries)
+
+    async def get_snapshot(self):
+        """Statistics summed over the locally cached shard snapshots"""
+        sources = [shard.snapshot for shard in self.shards]
+        if self._snapshot is None or any(a is not b for a, b in zip(sources, self._sources)):
+            self._snapshot = LedgerSnapshot.combine(sources)
+            self._sources = sources
+        return self._snapshot
+
+    async def get_uav_status(self, uav_id):
+        """Get the (last_auth, firmware_version, revoked) of a UAV from its shard"""
+        return await self.route(uav_id).get_uav_status(uav_id)
+
+    async def get_key_state(self, uav_id):
+        """Get the (public_key, revoked) of a UAV from its shard"""
+        return await self.route(uav_id).get_key_state(uav_id)
+
+    async def find_uavs(self, model, firmware_version, include_revoked, cursor, limit, shard=0):
+        """Get a page of the UAVs with a model and/or firmware version on one shard"""
+        return await self.shards[shard].find_uavs(model, firmware_version, include_revoked, cursor, limit)
+
+    async def count_uavs(self, field):
+        """Count the UAVs not revoked per model or firmware version, summed over all shards"""
+        totals = {}
+        for counts in await asyncio.gather(*(shard.count_uavs(field) for shard in self.shards)):
+            for value, count in counts.items():
+                totals[value] = totals.get(value, 0) + count
+        return totals
+
+    async def get_uav_history(self, uav_id, since, cursor, limit):
+        """Get a page of a UAV's sealed transactions from its shard"""
+        return await self.route(uav_id).get_uav_history(uav_id, since, cursor, limit)
+
+    async def get_blocks(self, start_time, end_time, cursor, limit, shard=0):
+        """Get a page of block headers of one shard, every shard has its own block sequence"""
+        return await self.shards[shard].get_blocks(start_time, end_time, cursor, limit)
+
+    async def get_anchors(self, limit):
+        """The latest global PoH anchors, newest first"""
+        if self.anchor is None:
+            return []
+        return await asyncio.get_running_loop().run_in_executor(None, self.anchor.get_anchors, limit)
+
+    async def _split(self, method, items):
+        """Send the items of a batch to their shards and put the results back in order"""
+        count = len(self.shards)
+        positions = {}
+        for position, item in enumerate(items):
+            positions.setdefault(shard_for(item[0], count), []).append(position)
+
+        shard_ids = list(positions)
+        outcomes = await asyncio.gather(*(
+            getattr(self.shards[shard], method)([items[position] for position in positions[shard]])
+            for shard in shard_ids
+        ))
+
+        results = [None] * len(items)
+        for shard, shard_results in zip(shard_ids, outcomes):
+            for position, result in zip(positions[shard], shard_results):
+                results[position] = {**result, 'shard': shard}
+        return results
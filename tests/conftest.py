@@ -0,0 +1,26 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_server(monkeypatch):
+    """Import server.server afresh from UAV_* settings, the config is read once at import"""
+    from server import config
+
+    def make(**env):
+        for name, value in env.items():
+            monkeypatch.setenv(f"UAV_{name}", str(value))
+        importlib.reload(config)
+        sys.modules.pop('server.server', None)
+        return importlib.import_module('server.server')
+
+    yield make
+    monkeypatch.undo()
+    importlib.reload(config)
+    sys.modules.pop('server.server', None)
@@ -0,0 +1,53 @@
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from fastapi.testclient import TestClient
+
+from crypto.signatures import auth_message
+
+MODES = [{}, {"BLOCK_PRODUCER": 1, "BLOCK_INTERVAL": 0.01}, {"LEDGER_WRITER": 1}]
+
+
+def public_key_hex(key):
+    return key.public_key().public_bytes(
+        encoding=serialization.Encoding.Raw,
+        format=serialization.PublicFormat.Raw
+    ).hex()
+
+
+@pytest.mark.parametrize("env", MODES)
+def test_fleet_is_registered_and_authenticated_in_one_block_each(make_server, env):
+    server = make_server(MAX_BATCH=10, **env)
+    keys = [ed25519.Ed25519PrivateKey.generate() for _ in range(4)]
+    with TestClient(server.app) as client:
+        registrations = [
+            {"uav_id": f"uav-{i}", "public_key": public_key_hex(key), "model": "Quadcopter X500", "firmware_version": "1.0.0"}
+            for i, key in enumerate(keys)
+        ]
+        # The duplicate only fails itself
+        response = client.post("/api/v1/uav/register:batch", json={"registrations": registrations + registrations[:1]}).json()
+        results = response["data"]["results"]
+        assert not response["success"] and response["message"] == "4 of 5 UAVs registered"
+        assert [result["success"] for result in results] == [True] * 4 + [False]
+        registered_in = {result["block_number"] for result in results[:4]}
+        assert len(registered_in) == 1
+
+        timestamp = int(time.time())
+        authentications = [
+            {"uav_id": f"uav-{i}", "nonce": f"nonce-{i}", "timestamp": timestamp,
+             "signature": key.sign(auth_message(f"uav-{i}", f"nonce-{i}", timestamp)).hex()}
+            for i, key in enumerate(keys)
+        ]
+        # Signed by the wrong key
+        authentications[2]["signature"] = keys[0].sign(auth_message("uav-2", "nonce-2", timestamp)).hex()
+        response = client.post("/api/v1/uav/authenticate:batch", json={"authentications": authentications}).json()
+        results = response["data"]["results"]
+        assert [result["success"] for result in results] == [True, True, False, True]
+        assert results[2]["message"] == "Invalid signature"
+        authenticated_in = {result["block_number"] for result in results if result["success"]}
+        assert len(authenticated_in) == 1 and authenticated_in.pop() > registered_in.pop()
+
+        response = client.post("/api/v1/uav/register:batch", json={"registrations": registrations * 3}).json()
+        assert not response["success"] and "exceeds the limit of 10" in response["message"]
@@ -0,0 +1,177 @@
+import threading
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from blockchain.blockchain import Blockchain
+from blockchain.encoding import MAX_FIELD_BYTES
+from blockchain.transaction import Transaction
+from crypto.signatures import auth_message
+
+
+def public_key_hex(key=None):
+    key = key or ed25519.Ed25519PrivateKey.generate()
+    return key.public_key().public_bytes(
+        encoding=serialization.Encoding.Raw,
+        format=serialization.PublicFormat.Raw
+    ).hex()
+
+
+def test_oversized_field_is_rejected_without_side_effects(tmp_path):
+    blockchain = Blockchain(storage_dir=str(tmp_path))
+    oversized = "x" * (MAX_FIELD_BYTES + 1)
+
+    success, message = blockchain.register_uav("uav-1", public_key_hex(), oversized, "1.0.0")
+    assert not success
+    assert "model" in message
+    assert "uav-1" not in blockchain.registry
+    assert blockchain.pending_transactions == [] and blockchain.pending_tx_hashes == []
+
+    # The next registration seals and survives a restart
+    assert blockchain.register_uav("uav-2", public_key_hex(), "Quadcopter X500", "1.0.0")[0]
+    assert blockchain.mine_block() is not None
+    blockchain.close()
+
+    reopened = Blockchain(storage_dir=str(tmp_path))
+    assert "uav-2" in reopened.registry
+    assert reopened.is_chain_valid(full=True)
+    reopened.close()
+
+
+def test_transaction_checks_field_length():
+    with pytest.raises(ValueError):
+        Transaction.register("uav-1", bytes(32), "x" * (MAX_FIELD_BYTES + 1), "1.0.0", 1700000000)
+    with pytest.raises(ValueError):
+        Transaction.authenticate("uav-1", "é" * (MAX_FIELD_BYTES // 2 + 1), 1700000000, bytes(64))
+
+    # Built around the checks, the transaction is refused before it reaches the mempool
+    blockchain = Blockchain()
+    unencodable = Transaction('REGISTER', "uav-1", 1700000000, public_key=bytes(32),
+                              model="x" * (MAX_FIELD_BYTES + 1), firmware_version="1.0.0")
+    with pytest.raises(ValueError):
+        blockchain.add_transaction(unencodable)
+    assert blockchain.pending_transactions == [] and blockchain.pending_tx_hashes == []
+
+
+def test_failed_seal_leaves_no_side_effects(tmp_path, monkeypatch):
+    blockchain = Blockchain(storage_dir=str(tmp_path))
+    assert blockchain.register_uav("uav-1", public_key_hex(), "Quadcopter X500", "1.0.0")[0]
+    poh_hash = blockchain.poh.current_hash
+    height = len(blockchain.chain)
+
+    def fail(block):
+        raise ValueError("cannot encode")
+
+    monkeypatch.setattr(blockchain.chain, "encode", fail)
+    with pytest.raises(ValueError):
+        blockchain.mine_block()
+    monkeypatch.undo()
+
+    assert blockchain.poh.current_hash == poh_hash
+    assert len(blockchain.chain) == height
+    assert len(blockchain.pending_transactions) == len(blockchain.pending_tx_hashes) == 1
+
+    assert blockchain.mine_block() is not None
+    assert blockchain.is_chain_valid(full=True)
+    blockchain.close()
+
+
+class FailingFile:
+    """Lets the record header through, then fails like a full disk"""
+
+    def __init__(self, file):
+        self.file = file
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        if self.writes > 1:
+            raise OSError(28, "No space left on device")
+        return self.file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+
+def test_failed_log_write_leaves_no_side_effects(tmp_path):
+    blockchain = Blockchain(storage_dir=str(tmp_path))
+    assert blockchain.register_uav("uav-1", public_key_hex(), "Quadcopter X500", "1.0.0")[0]
+    poh_hash = blockchain.poh.current_hash
+    height = len(blockchain.chain)
+    log_size = blockchain.block_log.size()
+
+    blockchain.block_log.file = FailingFile(blockchain.block_log.file)
+    with pytest.raises(OSError):
+        blockchain.mine_block()
+
+    assert blockchain.poh.current_hash == poh_hash
+    assert len(blockchain.chain) == height
+    assert blockchain.block_log.size() == log_size
+    assert len(blockchain.pending_transactions) == len(blockchain.pending_undo) == 1
+
+    # The torn record is gone, the retry seals and survives a restart
+    assert blockchain.mine_block() is not None
+    blockchain.close()
+    reopened = Blockchain(storage_dir=str(tmp_path))
+    assert len(reopened.chain) == height + 1
+    assert "uav-1" in reopened.registry
+    assert reopened.is_chain_valid(full=True)
+    reopened.close()
+
+
+def test_snapshots_are_taken_while_transactions_are_pending(tmp_path):
+    blockchain = Blockchain(storage_dir=str(tmp_path), snapshot_every=2)
+    key = ed25519.Ed25519PrivateKey.generate()
+    blockchain.register_uav("uav-0", public_key_hex(key), "Quadcopter X500", "1.0.0")
+    for i in range(1, 8):
+        # The mempool is never empty when a block is appended
+        blockchain.register_uav(f"uav-{i}", public_key_hex(), "Quadcopter X500", "1.0.0")
+        blockchain.mine_block(max_transactions=1)
+    assert blockchain.pending_transactions
+    assert blockchain.snapshot_height >= 6
+
+    snapshot = blockchain.snapshots.load()
+    sealed = {tx.uav_id for index in range(1, snapshot['height'] + 1) for tx in blockchain.chain[index].transactions}
+    assert set(snapshot['registered_uavs']) == sealed
+    assert blockchain.snapshot_matches(snapshot)
+
+    # A pending authentication is left out of the checkpointed state too
+    timestamp = int(time.time())
+    signature = key.sign(auth_message("uav-0", "nonce-1", timestamp)).hex()
+    assert blockchain.authenticate_uav("uav-0", "nonce-1", timestamp, signature)[0]
+    blockchain.checkpoint()
+    snapshot = blockchain.snapshots.load()
+    assert snapshot['registered_uavs']['uav-0']['last_auth'] is None
+    assert "uav-0:nonce-1" not in snapshot['used_nonces']
+    assert blockchain.snapshot_matches(snapshot)
+
+    # Sealing the rest and restarting replays only the blocks after the snapshot
+    blockchain.mine_block()
+    blockchain.close()
+    reopened = Blockchain(storage_dir=str(tmp_path), snapshot_every=2)
+    assert reopened.replayed_blocks <= 2
+    assert len(reopened.registry) == 8
+    assert reopened.is_chain_valid(full=True)
+    reopened.close()
+
+
+def test_prune_waits_for_the_chain_lock():
+    blockchain = Blockchain(snapshot_every=100, retain_blocks=2)
+    for i in range(10):
+        assert blockchain.register_uav(f"uav-{i}", public_key_hex(), "Quadcopter X500", "1.0.0")[0]
+        blockchain.mine_block()
+    assert blockchain.pruned_height == 0
+
+    # A reader holds the lock, the history it pages through must not move
+    with blockchain.lock:
+        pruning = threading.Thread(target=blockchain.checkpoint)
+        pruning.start()
+        pruning.join(0.2)
+        assert pruning.is_alive()
+        assert blockchain.pruned_height == 0
+        assert blockchain.get_uav_history("uav-0")['transactions']
+    pruning.join()
+    assert blockchain.pruned_height > 0
+    assert blockchain.get_uav_history("uav-0")['transactions'] == []
@@ -0,0 +1,56 @@
+from fastapi.testclient import TestClient
+
+from client.uav_client import UAVClient
+from crypto.challenges import CHALLENGE_LENGTH, ChallengeIssuer
+
+NOW = 1700000000
+
+
+def test_challenge_is_bound_to_its_uav_and_expires():
+    issuer = ChallengeIssuer(ttl=30)
+    nonce, expires_at = issuer.issue("uav-1", now=NOW)
+    assert len(nonce) == CHALLENGE_LENGTH and expires_at == NOW + 30
+
+    assert issuer.check("uav-1", nonce, now=NOW + 29)
+    assert not issuer.check("uav-1", nonce, now=NOW + 30)
+    assert not issuer.check("uav-2", nonce, now=NOW)
+
+    # Every issued challenge is different, even within the same second
+    assert issuer.issue("uav-1", now=NOW)[0] != nonce
+
+
+def test_tampered_or_foreign_challenges_are_rejected():
+    key = bytes(range(32))
+    issuer = ChallengeIssuer(key, ttl=30)
+    nonce, _ = issuer.issue("uav-1", now=NOW)
+
+    # Another process sharing the key accepts it, one with another key does not
+    assert ChallengeIssuer(key).check("uav-1", nonce, now=NOW)
+    assert not ChallengeIssuer().check("uav-1", nonce, now=NOW)
+
+    # Pushing the expiry out breaks the MAC
+    later = nonce[:16] + f"{NOW + 3600:016x}" + nonce[32:]
+    assert not issuer.check("uav-1", later, now=NOW)
+    assert not issuer.check("uav-1", nonce[:-2], now=NOW)
+    assert not issuer.check("uav-1", "zz" + nonce[2:], now=NOW)
+
+
+def test_client_authenticates_with_a_challenge(make_server):
+    server = make_server(CHALLENGE_TTL=30)
+    with TestClient(server.app) as http:
+        uav = UAVClient("http://testserver", "uav-1", session=http)
+        assert uav.register("Quadcopter X500", "1.0.0")["success"]
+
+        response = uav.authenticate_with_challenge()
+        assert response["success"], response["message"]
+
+        # A nonce the server did not issue is refused
+        response = uav.authenticate()
+        assert not response["success"] and response["message"] == "Invalid or expired challenge"
+
+
+def test_challenges_need_a_ttl(make_server):
+    server = make_server()
+    with TestClient(server.app) as http:
+        response = http.get("/api/v1/uav/uav-1/challenge").json()
+        assert not response["success"] and "UAV_CHALLENGE_TTL" in response["message"]
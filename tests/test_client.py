@@ -0,0 +1,90 @@
+import asyncio
+import json
+import threading
+
+import httpx
+from fastapi.testclient import TestClient
+
+from client.async_client import AsyncUAVClient
+from client.uav_client import UAVClient, thread_session
+
+
+def test_every_thread_gets_its_own_session():
+    sessions = []
+    threads = [threading.Thread(target=lambda: sessions.append(thread_session())) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+        thread.join()
+    assert sessions[0] is not sessions[1]
+    assert thread_session() is thread_session()
+    assert UAVClient("http://localhost:8000").session is thread_session()
+
+
+def test_client_lifecycle(make_server):
+    server = make_server()
+    with TestClient(server.app) as http:
+        uav = UAVClient("http://testserver", "uav-1", session=http)
+        assert uav.register("Quadcopter X500", "1.0.0")["success"]
+        assert uav.authenticate()["success"]
+        assert uav.get_status()["data"]["last_authenticated"] is not None
+
+        old_key = uav.private_key
+        assert uav.rotate_key()["success"]
+        assert uav.private_key is not old_key
+        assert uav.authenticate()["success"]
+
+        fleet = [UAVClient("http://testserver", f"uav-fleet-{i}") for i in range(3)]
+        assert UAVClient.register_batch("http://testserver", fleet, "Fixed Wing F1", "2.0.0", session=http)["success"]
+        assert UAVClient.authenticate_batch("http://testserver", fleet, session=http)["success"]
+
+        assert uav.revoke()["success"]
+        assert not uav.authenticate()["success"]
+
+
+def test_async_client_against_the_app(make_server):
+    server = make_server()
+    swarm = [UAVClient("http://testserver", f"uav-{i}") for i in range(5)]
+
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with AsyncUAVClient("http://testserver", max_concurrency=2, transport=transport) as gateway:
+            registered = await gateway.register_batch(swarm, "Quadcopter X500", "1.0.0")
+            authenticated = await gateway.authenticate_many(swarm)
+            status = await gateway.get_status("uav-3")
+        return registered, authenticated, status
+
+    registered, authenticated, status = asyncio.run(run())
+    assert registered["success"]
+    assert [result["success"] for result in authenticated] == [True] * 5
+    assert status["data"]["last_authenticated"] is not None
+
+
+def test_async_client_retries_with_a_fresh_nonce():
+    bodies = []
+
+    def answer(request):
+        bodies.append(json.loads(request.content))
+        if len(bodies) < 3:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"success": True, "message": "ok", "data": None})
+
+    uav = UAVClient("http://testserver", "uav-1")
+
+    async def run():
+        async with AsyncUAVClient("http://testserver", backoff=0, transport=httpx.MockTransport(answer)) as gateway:
+            return await gateway.authenticate(uav)
+
+    assert asyncio.run(run())["success"]
+    assert len(bodies) == 3 and len({body["nonce"] for body in bodies}) == 3
+
+
+def test_async_client_gives_up_after_its_retries():
+    def refuse(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    async def run():
+        async with AsyncUAVClient("http://testserver", retries=2, backoff=0, transport=httpx.MockTransport(refuse)) as gateway:
+            return await gateway.get_status("uav-1")
+
+    result = asyncio.run(run())
+    assert not result["success"] and "refused" in result["message"]
@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from blockchain.blockchain import Blockchain
+from server.events import EVENT_TYPES, EventHub, block_events, event_stream
+
+
+def public_key_hex():
+    return ed25519.Ed25519PrivateKey.generate().public_key().public_bytes(
+        encoding=serialization.Encoding.Raw,
+        format=serialization.PublicFormat.Raw
+    ).hex()
+
+
+def parse(chunks):
+    """Server-sent events in the chunks as (id, event, data), keep-alive comments left out"""
+    events = []
+    for message in b''.join(chunks).decode('utf-8').split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in message.splitlines() if not line.startswith(':'))
+        if fields:
+            events.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def seal(blockchain, *uav_ids):
+    for uav_id in uav_ids:
+        blockchain.register_uav(uav_id, public_key_hex(), "Quadcopter X500", "1.0.0")
+    return blockchain.mine_block()
+
+
+def test_block_events_resume_after_the_block():
+    blockchain = Blockchain()
+    block = seal(blockchain, "uav-1", "uav-2")
+    events = block_events(block)
+    assert [(event_type, uav_id) for event_type, uav_id, _ in events] == [
+        ('block', None), ('register', "uav-1"), ('register', "uav-2")
+    ]
+    (_, _, header), (_, _, register), _ = parse([payload for _, _, payload in events])
+    assert header['hash'] == block.hash.hex() and header['transactions'] == 2
+    assert register['uav_id'] == "uav-1" and register['block_number'] == 1 and register['position'] == 0
+    assert {event_id for event_id, _, _ in parse([payload for _, _, payload in events])} == {2}
+
+
+def test_stream_catches_up_then_follows_new_blocks():
+    blockchain = Blockchain()
+    hub = EventHub()
+    blockchain.block_listeners.append(hub.publish)
+    seal(blockchain, "uav-1", "uav-2")
+    seal(blockchain, "uav-3")
+
+    async def run():
+        hub.start(asyncio.get_running_loop())
+        subscription = hub.subscribe(('register',), uav_id="uav-2")
+        chunks = []
+        stream = event_stream(hub, blockchain, subscription, 1)
+        chunks.append(await stream.__anext__())
+        seal(blockchain, "uav-4")
+        seal(blockchain, "uav-2-other")
+        hub.close()
+        async for chunk in stream:
+            chunks.append(chunk)
+        return subscription, chunks
+
+    subscription, chunks = asyncio.run(run())
+    # Only the one event of the subscribed UAV, the stream ended on close
+    assert [(event_id, event_type, data['uav_id']) for event_id, event_type, data in parse(chunks)] == [
+        (2, 'register', "uav-2")
+    ]
+    assert subscription not in hub.subscribers
+
+
+def test_lagging_subscriber_is_cut_off_with_a_resume_height():
+    blockchain = Blockchain()
+    hub = EventHub(buffer_size=1)
+    blockchain.block_listeners.append(hub.publish)
+
+    async def run():
+        hub.start(asyncio.get_running_loop())
+        subscription = hub.subscribe(EVENT_TYPES)
+        stream = event_stream(hub, blockchain, subscription, len(blockchain.chain))
+        # Waiting on its buffer, past the catch-up
+        first = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.01)
+        for i in range(3):
+            seal(blockchain, f"uav-{i}")
+        return [await first] + [chunk async for chunk in stream]
+
+    events = parse(asyncio.run(run()))
+    assert [(event_id, event_type) for event_id, event_type, _ in events] == [
+        (2, 'block'), (2, 'register'), (2, 'lagged')
+    ]
+    assert events[-1][2]['resume_from'] == 2
+    assert hub.dropped == 1 and not hub.subscribers
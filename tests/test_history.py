@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+from blockchain.history import HistoryIndex
+
+
+def block(index, timestamp, *uav_ids):
+    transactions = [SimpleNamespace(uav_id=uav_id) for uav_id in uav_ids]
+    return SimpleNamespace(index=index, timestamp=timestamp, transactions=transactions)
+
+
+def history(blocks=10):
+    """uav-a is in every block, uav-b in the even ones, the clock steps back at block 4"""
+    index = HistoryIndex()
+    for height in range(blocks):
+        timestamp = 1000 + 10 * height - (15 if height == 4 else 0)
+        index.add_block(block(height, timestamp, "uav-a", *(["uav-b"] if height % 2 == 0 else [])))
+    return index
+
+
+def pages(index, uav_id, limit, offset=0, since=None):
+    """Every page from offset on, as lists of heights"""
+    result = []
+    while offset is not None:
+        page, offset = index.uav_history(uav_id, since, offset, limit)
+        result.append([height for height, _ in page])
+    return result
+
+
+def test_paging_and_time_lookups():
+    index = history()
+    assert pages(index, "uav-a", 4) == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert pages(index, "uav-b", 10) == [[0, 2, 4, 6, 8]]
+    assert index.uav_history("uav-c") == ([], None)
+    assert index.uav_history("uav-b")[0][1] == (2, 1)
+
+    # Block 4 was stamped before block 3 but is indexed at block 3's time
+    assert index.block_times[4] == index.block_times[3]
+    assert index.height_at(1030) == 3 and index.height_at(1031) == 5
+    assert pages(index, "uav-b", 2, since=1031) == [[6, 8]]
+
+
+def test_cursors_handed_out_before_pruning_stay_valid():
+    index = history()
+    page, cursor = index.uav_history("uav-a", limit=3)
+    assert cursor == 3
+
+    index.prune(5)
+    assert index.uav_dropped == {"uav-a": 5, "uav-b": 3}
+    # The cursor pointed into the pruned part, the page starts at the first entry left
+    assert pages(index, "uav-a", 3, offset=cursor) == [[5, 6, 7], [8, 9]]
+    # Cursors past the pruned part keep addressing the same entries
+    page, cursor = index.uav_history("uav-a", offset=7, limit=2)
+    assert [height for height, _ in page] == [7, 8] and cursor == 9
+    assert pages(index, "uav-b", 1) == [[6], [8]]
+
+    # New blocks are appended and paged after the old ones
+    index.add_block(block(10, 1100, "uav-b"))
+    assert pages(index, "uav-b", 10, offset=4) == [[8, 10]]
+
+
+def test_round_trip_keeps_the_dropped_counts():
+    index = history()
+    index.prune(5)
+    restored, block_hash = HistoryIndex.from_bytes(index.to_bytes(b"\x07" * 32))
+    assert block_hash == b"\x07" * 32
+    assert list(restored.block_times) == list(index.block_times)
+    assert restored.uav_dropped == index.uav_dropped
+    assert pages(restored, "uav-a", 3, offset=6) == pages(index, "uav-a", 3, offset=6)
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from blockchain.blockchain import Blockchain
+from blockchain.producer import KEY_ROTATED
+from crypto.signatures import auth_message, rotate_key_message
+from server.ledger import LedgerWriter
+
+
+def public_key_hex(key):
+    return key.public_key().public_bytes(
+        encoding=serialization.Encoding.Raw,
+        format=serialization.PublicFormat.Raw
+    ).hex()
+
+
+def registration(uav_id, key=None):
+    key = key or ed25519.Ed25519PrivateKey.generate()
+    return (uav_id, public_key_hex(key), "Quadcopter X500", "1.0.0")
+
+
+def test_failing_item_does_not_fail_its_batch(monkeypatch):
+    blockchain = Blockchain()
+    register_uav = blockchain.register_uav
+
+    def flaky_register(uav_id, *args):
+        if uav_id == "uav-bad":
+            raise RuntimeError("lost the disk")
+        return register_uav(uav_id, *args)
+
+    monkeypatch.setattr(blockchain, "register_uav", flaky_register)
+
+    async def run():
+        writer = LedgerWriter(blockchain)
+        await writer.start()
+        results = await writer.register_batch([registration(uav_id) for uav_id in ("uav-1", "uav-bad", "uav-2")])
+        await writer.stop()
+        return results
+
+    first, bad, second = asyncio.run(run())
+    assert first['success'] and second['success']
+    assert first['block_number'] == second['block_number'] == 1
+    assert not bad['success'] and 'block_number' not in bad
+
+    # Only the acknowledged registrations made it into the block
+    block = blockchain.get_latest_block()
+    assert [tx.uav_id for tx in block.transactions] == ["uav-1", "uav-2"]
+    assert "uav-bad" not in blockchain.registry
+    assert blockchain.pending_transactions == [] and blockchain.pending_tx_hashes == []
+    assert blockchain.is_chain_valid(full=True)
+
+
+def test_key_rotation_in_the_same_batch_as_an_authentication():
+    blockchain = Blockchain()
+    old_key = ed25519.Ed25519PrivateKey.generate()
+    new_key = ed25519.Ed25519PrivateKey.generate()
+    timestamp = int(time.time())
+
+    async def run():
+        writer = LedgerWriter(blockchain)
+        await writer.start()
+        await writer.register_uav(*registration("uav-1", old_key))
+        # Queued together, so both are applied in one batch
+        auth, rotation = await asyncio.gather(
+            writer.authenticate_uav("uav-1", "nonce-1", timestamp,
+                                    old_key.sign(auth_message("uav-1", "nonce-1", timestamp)).hex()),
+            writer.rotate_key("uav-1", public_key_hex(new_key), timestamp,
+                              old_key.sign(rotate_key_message("uav-1", public_key_hex(new_key), timestamp)).hex())
+        )
+        await writer.stop()
+        return auth, rotation
+
+    auth, rotation = asyncio.run(run())
+    assert rotation['success']
+    assert not auth['success'] and auth['message'] == KEY_ROTATED
+    assert [tx.type for tx in blockchain.get_latest_block().transactions] == ['ROTATE_KEY']
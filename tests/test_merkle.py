@@ -0,0 +1,69 @@
+import hashlib
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from blockchain.blockchain import Blockchain
+from crypto import merkle
+
+
+def leaves(count):
+    return [merkle.hash_leaf(f"tx-{i}".encode()) for i in range(count)]
+
+
+def test_roots_of_small_trees():
+    a, b, c = leaves(3)
+    assert merkle.merkle_root([]) == merkle.EMPTY_ROOT
+    assert merkle.merkle_root([a]) == a
+    assert merkle.merkle_root([a, b]) == merkle.hash_pair(a, b)
+    # The unpaired leaf is carried up unchanged
+    assert merkle.merkle_root([a, b, c]) == merkle.hash_pair(merkle.hash_pair(a, b), c)
+    # Leaves and inner nodes never hash alike
+    assert merkle.hash_leaf(a + b) != merkle.hash_pair(a, b)
+    assert merkle.hash_leaf(b"x") != hashlib.sha256(b"x").digest()
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 5, 8, 13])
+def test_every_leaf_has_a_proof(count):
+    hashes = leaves(count)
+    root = merkle.merkle_root(hashes)
+    for index, leaf in enumerate(hashes):
+        proof = merkle.merkle_proof(hashes, index)
+        assert merkle.verify_proof(leaf, proof, root)
+        # Neither another leaf nor another root passes
+        if count > 1:
+            assert not merkle.verify_proof(hashes[index - 1], proof, root)
+        assert not merkle.verify_proof(leaf, proof, merkle.hash_leaf(b"other"))
+
+
+def test_tampered_proof_fails():
+    hashes = leaves(6)
+    root = merkle.merkle_root(hashes)
+    proof = merkle.merkle_proof(hashes, 4)
+    proof[0] = {'hash': proof[0]['hash'], 'position': 'left' if proof[0]['position'] == 'right' else 'right'}
+    assert not merkle.verify_proof(hashes[4], proof, root)
+    with pytest.raises(IndexError):
+        merkle.merkle_proof(hashes, 6)
+
+
+def test_transaction_proofs_check_against_the_block_root():
+    blockchain = Blockchain()
+    for i in range(5):
+        public_key = ed25519.Ed25519PrivateKey.generate().public_key().public_bytes(
+            encoding=serialization.Encoding.Raw,
+            format=serialization.PublicFormat.Raw
+        ).hex()
+        assert blockchain.register_uav(f"uav-{i}", public_key, "Quadcopter X500", "1.0.0")[0]
+    block = blockchain.mine_block()
+    assert block.merkle_root == block.calculate_merkle_root()
+
+    for tx_hash in block.get_tx_hashes():
+        proof = blockchain.get_transaction_proof(tx_hash.hex())
+        steps = [{'hash': bytes.fromhex(step['hash']), 'position': step['position']} for step in proof['proof']]
+        leaf = merkle.hash_leaf(bytes.fromhex(proof['encoded']))
+        assert leaf == tx_hash
+        assert merkle.verify_proof(leaf, steps, bytes.fromhex(proof['merkle_root']))
+
+    assert blockchain.get_transaction_proof("00" * 32) is None
+    assert blockchain.get_transaction_proof("not hex") is None
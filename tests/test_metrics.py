@@ -0,0 +1,39 @@
+import os
+
+from blockchain.blockchain import Blockchain
+from blockchain.transaction import Transaction
+from server.metrics import ServerMetrics, hot_path_targets
+
+
+def stage_count(metrics, stage):
+    counts = metrics.stages.children.get(stage)
+    return sum(counts[:-1]) if counts else 0
+
+
+def test_mining_is_timed_by_stage():
+    metrics = ServerMetrics(hot_path_targets())
+    blockchain = Blockchain()
+    metrics.timer.enable()
+    try:
+        for i in range(3):
+            blockchain.add_transaction(
+                Transaction.register(f"uav-{i}", os.urandom(32), "Quadcopter X500", "1.0.0", 1700000000)
+            )
+            blockchain.mine_block()
+    finally:
+        metrics.timer.disable()
+
+    assert stage_count(metrics, 'poh_tick') == 3
+    assert stage_count(metrics, 'mine_block') == 3
+    assert stage_count(metrics, 'block_hash') >= 3
+    assert 'uav_stage_seconds_count{stage="poh_tick"} 3' in metrics.registry.render()
+
+
+def test_disabled_timer_restores_the_originals():
+    metrics = ServerMetrics(hot_path_targets())
+    metrics.timer.enable()
+    metrics.timer.disable()
+    blockchain = Blockchain()
+    blockchain.add_transaction(Transaction.register("uav-1", os.urandom(32), "Quadcopter X500", "1.0.0", 1700000000))
+    blockchain.mine_block()
+    assert stage_count(metrics, 'poh_tick') == 0
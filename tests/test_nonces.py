@@ -0,0 +1,94 @@
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from blockchain.blockchain import Blockchain
+from blockchain.nonces import NonceStore
+from crypto.signatures import auth_message
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_window_bounds():
+    store = NonceStore(skew_window=300, clock=Clock(10000))
+    assert store.is_fresh(10000 - 300) and store.is_fresh(10000 + 300)
+    assert not store.is_fresh(10000 - 301) and not store.is_fresh(10000 + 301)
+
+
+def test_nonces_are_evicted_once_their_generation_is_stale():
+    clock = Clock(10000)
+    store = NonceStore(skew_window=300, bucket_seconds=30, clock=clock)
+    store.add("uav-1:a", 9990)
+    store.add("uav-1:b", 10010)
+    assert "uav-1:a" in store and len(store) == 2
+
+    # Still inside the window, nothing goes
+    clock.now = 10200
+    assert store.expire() == 0 and len(store) == 2
+
+    # 9990 is in the bucket [9990, 10020), which is stale from 10320 on
+    clock.now = 10319
+    assert store.expire() == 0
+    clock.now = 10320
+    assert store.expire() == 2
+    assert "uav-1:a" not in store and len(store) == 0 and not store.generations
+
+
+def test_expire_only_sweeps_when_crossing_a_bucket():
+    clock = Clock(0)
+    store = NonceStore(skew_window=60, bucket_seconds=30, clock=clock)
+    store.add("uav-1:a", 0)
+    clock.now = 95
+    # The sweep at 95 ran when the nonce added at 0 was already stale
+    assert store.expire() == 1
+    store.add("uav-1:b", 95)
+    assert store.expire() == 0
+
+
+def test_readded_key_survives_the_old_generation():
+    clock = Clock(10000)
+    store = NonceStore(skew_window=300, bucket_seconds=30, clock=clock)
+    store.add("uav-1:a", 9700)
+    store.add("uav-1:a", 10000)
+    clock.now = 10100
+    store.expire()
+    assert "uav-1:a" in store
+
+
+def test_restore_drops_stale_nonces():
+    store = NonceStore(skew_window=300, bucket_seconds=30, clock=Clock(10000))
+    store.add("uav-1:old", 9750)
+    store.add("uav-1:new", 10000)
+    saved = store.to_dict()
+
+    restored = NonceStore(skew_window=300, bucket_seconds=30, clock=Clock(10200))
+    restored.restore(saved)
+    assert restored.to_dict() == {"uav-1:new": saved["uav-1:new"]}
+
+
+def test_replayed_and_stale_authentications_are_rejected():
+    key = ed25519.Ed25519PrivateKey.generate()
+    public_key = key.public_key().public_bytes(
+        encoding=serialization.Encoding.Raw,
+        format=serialization.PublicFormat.Raw
+    ).hex()
+    blockchain = Blockchain(nonce_window=300)
+    assert blockchain.register_uav("uav-1", public_key, "Quadcopter X500", "1.0.0")[0]
+
+    timestamp = int(time.time())
+    signature = key.sign(auth_message("uav-1", "nonce-1", timestamp)).hex()
+    assert blockchain.authenticate_uav("uav-1", "nonce-1", timestamp, signature)[0]
+    success, message = blockchain.authenticate_uav("uav-1", "nonce-1", timestamp, signature)
+    assert not success and "replay" in message
+
+    stale = timestamp - 301
+    signature = key.sign(auth_message("uav-1", "nonce-2", stale)).hex()
+    success, message = blockchain.authenticate_uav("uav-1", "nonce-2", stale, signature)
+    assert not success and "window" in message
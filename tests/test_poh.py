@@ -0,0 +1,62 @@
+import hashlib
+
+import pytest
+
+from crypto.poh import PoHClock, ProofOfHistory, Tick
+
+
+def test_clock_history_stays_bounded():
+    clock = PoHClock(checkpoint_every=10, max_checkpoints=5)
+    for i in range(1000):
+        clock.mix(hashlib.sha256(str(i).encode()).digest())
+        clock.advance(3)
+
+    assert len(clock.checkpoint_counts) == 5
+    assert len(clock.checkpoint_hashes) == 5 * 32
+    # Only the events after the oldest checkpoint are left
+    assert clock.event_counts[0] > clock.checkpoint_counts[0]
+    assert len(clock.event_counts) <= 5 * 10
+    assert len(clock.event_hashes) == len(clock.event_counts) * 32
+    assert clock.verify(workers=1) is None
+
+
+def test_clock_keeps_history_inside_window():
+    clock = PoHClock(checkpoint_every=10, max_checkpoints=100)
+    for i in range(50):
+        clock.mix(hashlib.sha256(str(i).encode()).digest())
+        clock.advance(3)
+
+    assert clock.checkpoint_counts[0] == 0
+    assert len(clock.event_counts) == 50
+    assert clock.verify(workers=1) is None
+
+
+def poh_with_ticks(count):
+    poh = ProofOfHistory(clock=lambda: 1700000000)
+    for i in range(count):
+        poh.tick(f"event-{i}" if i % 3 == 0 else None)
+    return poh
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parallel_verification_finds_the_first_bad_tick(workers):
+    poh = poh_with_ticks(200)
+    assert poh.verify_parallel(workers=workers, segment_size=16) is None
+    assert poh.verify_sequence()
+
+    tick = poh.ticks[137]
+    poh.ticks[137] = Tick(tick.sequence, tick.prev_hash, tick.hash, b"forged", tick.timestamp)
+    tick = poh.ticks[170]
+    poh.ticks[170] = Tick(tick.sequence, tick.prev_hash, tick.hash, b"forged", tick.timestamp)
+    assert poh.verify_parallel(workers=workers, segment_size=16) == 137
+    assert poh.verify_parallel(150, workers=workers, segment_size=16) == 170
+    assert poh.verify_parallel(0, 137, workers=workers, segment_size=16) is None
+    assert not poh.verify_sequence()
+
+
+def test_parallel_verification_range_checks():
+    poh = poh_with_ticks(10)
+    with pytest.raises(IndexError):
+        poh.verify_parallel(0, 11)
+    with pytest.raises(IndexError):
+        poh.verify_parallel(5, 5)
@@ -0,0 +1,90 @@
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from blockchain.blockchain import Blockchain
+from blockchain.producer import KEY_ROTATED, BlockProducer
+from crypto.signatures import auth_message, rotate_key_message
+
+
+def public_key_hex(key):
+    return key.public_key().public_bytes(
+        encoding=serialization.Encoding.Raw,
+        format=serialization.PublicFormat.Raw
+    ).hex()
+
+
+def test_key_rotation_while_authentication_is_queued():
+    blockchain = Blockchain()
+    producer = BlockProducer(blockchain)
+    old_key = ed25519.Ed25519PrivateKey.generate()
+    new_key = ed25519.Ed25519PrivateKey.generate()
+    assert producer.register_uav("uav-1", public_key_hex(old_key), "Quadcopter X500", "1.0.0")[0]
+    producer.flush()
+
+    timestamp = int(time.time())
+    signature = old_key.sign(auth_message("uav-1", "nonce-1", timestamp)).hex()
+    success, _, auth_receipt = producer.authenticate_uav("uav-1", "nonce-1", timestamp, signature)
+    assert success
+
+    # The rotation is applied before the queued authentication is sealed
+    rotation = old_key.sign(rotate_key_message("uav-1", public_key_hex(new_key), timestamp)).hex()
+    success, _, rotate_receipt = producer.rotate_key("uav-1", public_key_hex(new_key), timestamp, rotation)
+    assert success
+    producer.flush()
+
+    assert rotate_receipt.is_sealed()
+    assert not auth_receipt.is_sealed() and auth_receipt.message == KEY_ROTATED
+    block = blockchain.get_latest_block()
+    assert [tx.type for tx in block.transactions] == ['ROTATE_KEY']
+
+    # Authentications signed with the new key still go through
+    signature = new_key.sign(auth_message("uav-1", "nonce-2", timestamp)).hex()
+    success, _, receipt = producer.authenticate_uav("uav-1", "nonce-2", timestamp, signature)
+    producer.flush()
+    assert success and receipt.is_sealed()
+
+
+def test_transactions_are_sealed_together_up_to_the_block_size():
+    blockchain = Blockchain()
+    producer = BlockProducer(blockchain, max_block_size=4, block_interval=60)
+    keys = [ed25519.Ed25519PrivateKey.generate() for _ in range(6)]
+    receipts = [
+        producer.register_uav(f"uav-{i}", public_key_hex(key), "Quadcopter X500", "1.0.0")[2]
+        for i, key in enumerate(keys)
+    ]
+    assert len(blockchain.chain) == 1 and producer.pending_count() == 6
+
+    producer.flush()
+    assert [receipt.wait(1) for receipt in receipts] == [1, 1, 1, 1, 2, 2]
+    assert [len(blockchain.chain[height].transactions) for height in (1, 2)] == [4, 2]
+    assert producer.get_receipt(receipts[0].receipt_id).to_dict()['status'] == 'sealed'
+
+    # A bad signature only rejects its own receipt, the rest of the batch is sealed
+    timestamp = int(time.time())
+    good = keys[0].sign(auth_message("uav-0", "nonce-1", timestamp)).hex()
+    bad = keys[0].sign(auth_message("uav-1", "nonce-1", timestamp)).hex()
+    results = producer.authenticate_batch([
+        ("uav-0", "nonce-1", timestamp, good),
+        ("uav-1", "nonce-1", timestamp, bad)
+    ])
+    assert all(success for success, _, _ in results)
+    producer.flush()
+    sealed, rejected = (receipt for _, _, receipt in results)
+    assert sealed.is_sealed() and sealed.block_number == 3
+    assert rejected.is_done() and not rejected.is_sealed() and rejected.message == "Invalid signature"
+
+
+def test_time_window_seals_a_partial_block():
+    blockchain = Blockchain()
+    producer = BlockProducer(blockchain, max_block_size=100, block_interval=0.05)
+    producer.start()
+    try:
+        _, _, receipt = producer.register_uav(
+            "uav-1", public_key_hex(ed25519.Ed25519PrivateKey.generate()), "Quadcopter X500", "1.0.0"
+        )
+        assert receipt.wait(5) == 1
+    finally:
+        producer.stop()
+    assert len(blockchain.chain) == 2 and producer.pending_count() == 0
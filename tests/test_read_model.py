@@ -0,0 +1,88 @@
+import time
+from types import SimpleNamespace
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from fastapi.testclient import TestClient
+
+from crypto.signatures import auth_message
+from server.read_model import ResponseCache, ThroughputWindows, etag_matches
+
+
+def test_bodies_are_rebuilt_only_when_their_source_changes():
+    cache = ResponseCache(max_entries=2)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return {"data": len(builds)}
+
+    etag, body = cache.get("a", (1, "1.0.0", False), build)
+    assert cache.get("a", (1, "1.0.0", False), build) == (etag, body)
+    assert len(builds) == 1
+
+    changed, _ = cache.get("a", (2, "1.0.0", False), build)
+    assert changed != etag and len(builds) == 2
+
+    # The least recently used key goes first
+    cache.get("b", 1, build)
+    cache.get("a", (2, "1.0.0", False), build)
+    cache.get("c", 1, build)
+    assert list(cache.entries) == ["a", "c"]
+
+
+def test_etag_matching():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", "abc"', '"abc"')
+    assert etag_matches('*', '"abc"')
+    assert not etag_matches(None, '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
+
+
+def test_throughput_windows():
+    now = 10000
+    chain = [SimpleNamespace(timestamp=0, transactions=[])]
+    for age in (400, 200, 30, 5):
+        transactions = [SimpleNamespace(type='AUTHENTICATE')] * 6 + [SimpleNamespace(type='REGISTER')] * 4
+        chain.append(SimpleNamespace(timestamp=now - age, transactions=transactions))
+    windows = ThroughputWindows()
+    windows.observe(SimpleNamespace(chain=chain), now)
+    tx_per_second, auths = windows.rates(now)
+    assert tx_per_second == {'10s': 1.0, '60s': round(20 / 60, 2), '300s': round(30 / 300, 2)}
+    assert auths == 12
+
+    # Later calls only read the new blocks, and old ones fall out of the windows
+    chain.append(SimpleNamespace(timestamp=now + 55, transactions=[SimpleNamespace(type='REGISTER')]))
+    windows.observe(SimpleNamespace(chain=chain), now + 60)
+    tx_per_second, auths = windows.rates(now + 60)
+    assert tx_per_second['10s'] == 0.1 and auths == 0
+
+
+def test_status_is_served_from_cache_until_it_changes(make_server):
+    server = make_server()
+    key = ed25519.Ed25519PrivateKey.generate()
+    public_key = key.public_key().public_bytes(
+        encoding=serialization.Encoding.Raw,
+        format=serialization.PublicFormat.Raw
+    ).hex()
+    with TestClient(server.app) as client:
+        client.post("/api/v1/uav/register", json={
+            "uav_id": "uav-1", "public_key": public_key, "model": "Quadcopter X500", "firmware_version": "1.0.0"
+        })
+        response = client.get("/api/v1/uav/status/uav-1")
+        etag = response.headers["etag"]
+        assert response.json()["data"]["last_authenticated"] is None
+        assert client.get("/api/v1/uav/status/uav-1", headers={"If-None-Match": etag}).status_code == 304
+
+        timestamp = int(time.time())
+        client.post("/api/v1/uav/authenticate", json={
+            "uav_id": "uav-1", "nonce": "nonce-1", "timestamp": timestamp,
+            "signature": key.sign(auth_message("uav-1", "nonce-1", timestamp)).hex()
+        })
+        response = client.get("/api/v1/uav/status/uav-1", headers={"If-None-Match": etag})
+        assert response.status_code == 200 and response.headers["etag"] != etag
+        assert response.json()["data"]["last_authenticated"] == timestamp
+
+        stats = client.get("/api/v1/blockchain/stats")
+        assert stats.json()["data"]["registered_uavs"] == 1 and stats.headers["etag"]
@@ -0,0 +1,85 @@
+from fastapi.testclient import TestClient
+
+from blockchain.registry import UavRegistry
+
+
+def key(i):
+    return bytes([i]) * 32
+
+
+def fleet():
+    registry = UavRegistry()
+    for i in range(10):
+        registry.register(f"uav-{i}", key(i), "Quadcopter X500" if i % 2 else "Fixed Wing F1", f"1.{i % 3}.0")
+    return registry
+
+
+def test_rows_read_back_as_registered():
+    registry = fleet()
+    assert len(registry) == 10 and "uav-3" in registry and "uav-10" not in registry
+    assert registry.get("uav-3") == {
+        'public_key': key(3).hex(), 'model': "Quadcopter X500", 'firmware_version': "1.0.0", 'last_auth': None
+    }
+    registry.set_last_auth("uav-3", 1700000000)
+    assert registry.status("uav-3") == (1700000000, "1.0.0", False)
+    assert registry.status("uav-10") is None and registry.get("uav-10") is None
+    # Repeated strings are stored once
+    assert len(registry.tables['model']) == 2 and len(registry.tables['firmware_version']) == 3
+
+
+def test_find_pages_through_one_or_both_indexes():
+    registry = fleet()
+    assert registry.find(firmware_version="1.0.0")['uav_ids'] == ["uav-0", "uav-3", "uav-6", "uav-9"]
+    assert registry.find(model="Quadcopter X500", firmware_version="1.0.0")['uav_ids'] == ["uav-3", "uav-9"]
+    assert registry.find(model="Hexacopter H6") == {'uav_ids': [], 'next_cursor': None}
+
+    pages = []
+    cursor = 0
+    while cursor is not None:
+        page = registry.find(model="Fixed Wing F1", cursor=cursor, limit=2)
+        pages.append(page['uav_ids'])
+        cursor = page['next_cursor']
+    assert pages == [["uav-0", "uav-2"], ["uav-4", "uav-6"], ["uav-8"]]
+
+
+def test_revoking_updates_counts_and_queries_in_place():
+    registry = fleet()
+    assert registry.counts('firmware_version') == {"1.0.0": 4, "1.1.0": 3, "1.2.0": 3}
+
+    registry.revoke("uav-3")
+    registry.revoke("uav-3")
+    assert registry.is_revoked("uav-3") and registry.key_state("uav-3") == (key(3), True)
+    assert registry.counts('firmware_version')["1.0.0"] == 3
+    assert registry.counts('model') == {"Fixed Wing F1": 5, "Quadcopter X500": 4}
+    assert registry.find(firmware_version="1.0.0")['uav_ids'] == ["uav-0", "uav-6", "uav-9"]
+    assert "uav-3" in registry.find(firmware_version="1.0.0", include_revoked=True)['uav_ids']
+
+    registry.rotate_key("uav-4", key(99))
+    assert registry.public_key("uav-4") == key(99) and registry.public_key("uav-5") == key(5)
+
+
+def test_snapshot_round_trip():
+    registry = fleet()
+    registry.set_last_auth("uav-1", 1700000000)
+    registry.revoke("uav-2")
+    restored = UavRegistry.from_dict(registry.to_dict())
+    assert restored.to_dict() == registry.to_dict()
+    assert restored.counts('model') == registry.counts('model')
+
+
+def test_fleet_queries_over_the_api(make_server):
+    server = make_server()
+    with TestClient(server.app) as client:
+        registry = fleet()
+        for uav_id, entry in registry.to_dict().items():
+            assert client.post("/api/v1/uav/register", json={
+                "uav_id": uav_id, "public_key": entry['public_key'],
+                "model": entry['model'], "firmware_version": entry['firmware_version']
+            }).json()["success"]
+
+        page = client.get("/api/v1/uavs", params={"firmware": "1.2.0", "limit": 2}).json()["data"]
+        assert page == {'uav_ids': ["uav-2", "uav-5"], 'next_cursor': 2}
+        counts = client.get("/api/v1/uavs/counts", params={"by": "model"}).json()["data"]["counts"]
+        assert counts == {"Fixed Wing F1": 5, "Quadcopter X500": 5}
+        assert not client.get("/api/v1/uavs").json()["success"]
+        assert not client.get("/api/v1/uavs/counts", params={"by": "owner"}).json()["success"]
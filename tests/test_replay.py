@@ -0,0 +1,57 @@
+from argparse import Namespace
+
+from benchmarks.replay import generate, read_stream, replay, stream_from_chain, write_stream
+from blockchain.blockchain import Blockchain
+
+UAVS = 20
+AUTHS = 200
+
+
+def replay_args(**overrides):
+    return Namespace(**{
+        'block_size': 50, 'block_interval': 1.0, 'nonce_window': 300,
+        'verify_executor': None, 'workers': None, **overrides
+    })
+
+
+def test_same_seed_same_stream():
+    stream = generate(7, UAVS, AUTHS, 100.0)
+    assert stream == generate(7, UAVS, AUTHS, 100.0)
+    assert stream != generate(8, UAVS, AUTHS, 100.0)
+    assert [request['type'] for request in stream] == ['REGISTER'] * UAVS + ['AUTHENTICATE'] * AUTHS
+    assert all(a['at'] <= b['at'] for a, b in zip(stream, stream[1:]))
+
+
+def test_replay_ends_on_the_same_head(tmp_path):
+    stream = generate(7, UAVS, AUTHS, 100.0)
+    path = tmp_path / "stream.jsonl"
+    write_stream(path, stream)
+    assert read_stream(path) == stream
+
+    heads = []
+    for source in (stream, read_stream(path)):
+        blockchain, stats = replay(source, replay_args())
+        assert stats['valid'] and stats['rejected'] == 0
+        assert stats['transactions'] == UAVS + AUTHS
+        heads.append((blockchain.get_latest_block().hash, blockchain.poh.current_hash))
+    assert heads[0] == heads[1]
+
+    # The block size is part of what is replayed
+    blockchain, _ = replay(stream, replay_args(block_size=10))
+    assert blockchain.get_latest_block().hash != heads[0][0]
+
+
+def test_stored_chain_replays_its_requests(tmp_path):
+    stream = generate(3, UAVS, AUTHS, 100.0)
+    blockchain, _ = replay(stream, replay_args())
+    # Blocks are checked against the simulated time they were sealed at
+    stored = Blockchain(storage_dir=str(tmp_path), genesis=blockchain.chain[0], clock=blockchain.clock)
+    for block in blockchain.chain[1:]:
+        assert stored.apply_block(block)
+    stored.close()
+
+    recovered = stream_from_chain(str(tmp_path))
+    assert [(request['type'], request['uav_id']) for request in recovered] == \
+        [(request['type'], request['uav_id']) for request in stream]
+    _, stats = replay(recovered, replay_args())
+    assert stats['valid'] and stats['rejected'] == 0
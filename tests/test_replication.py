@@ -0,0 +1,143 @@
+import asyncio
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from fastapi.testclient import TestClient
+
+from blockchain.blockchain import Block, Blockchain
+from server.replication import PRUNED_STATUS, Follower, ReplicationError, block_stream, split_records
+
+
+def public_key_hex():
+    return ed25519.Ed25519PrivateKey.generate().public_key().public_bytes(
+        encoding=serialization.Encoding.Raw,
+        format=serialization.PublicFormat.Raw
+    ).hex()
+
+
+def pruned_chain(blocks=12):
+    """In-memory chain that has pruned all but its latest blocks"""
+    blockchain = Blockchain(snapshot_every=2, retain_blocks=2)
+    for i in range(blocks):
+        assert blockchain.register_uav(f"uav-{i}", public_key_hex(), "Quadcopter X500", "1.0.0")[0]
+        blockchain.mine_block()
+    assert blockchain.pruned_height > 1
+    return blockchain
+
+
+def test_block_records_below_pruned_height():
+    blockchain = pruned_chain()
+    assert blockchain.get_block_records(1, 10) is None
+    assert blockchain.get_block_records(blockchain.pruned_height - 1, 10) is None
+
+    # The genesis block has no body to lose, it is sent on its own
+    payloads, rest = split_records(blockchain.get_block_records(0, 10))
+    assert len(payloads) == 1 and rest == b''
+
+    payloads, _ = split_records(blockchain.get_block_records(blockchain.pruned_height, 100))
+    assert len(payloads) == len(blockchain.chain) - blockchain.pruned_height
+
+
+def test_block_stream_ends_once_pruning_overtakes_it():
+    blockchain = pruned_chain()
+
+    async def collect():
+        return [records async for records in block_stream(blockchain, 1, 10)]
+
+    assert asyncio.run(collect()) == []
+
+
+def test_pruned_range_is_answered_with_gone(make_server):
+    server = make_server(SNAPSHOT_EVERY=2, RETAIN_BLOCKS=2)
+    with TestClient(server.app) as client:
+        for i in range(12):
+            response = client.post("/api/v1/uav/register", json={
+                "uav_id": f"uav-{i}", "public_key": public_key_hex(),
+                "model": "Quadcopter X500", "firmware_version": "1.0.0"
+            }).json()
+            assert response["success"]
+        pruned_height = server.blockchain.pruned_height
+        assert pruned_height > 1
+
+        response = client.get("/api/v1/replication/blocks", params={"from": 1})
+        assert response.status_code == PRUNED_STATUS
+        assert response.json()["data"]["pruned_height"] == pruned_height
+
+        response = client.get("/api/v1/replication/blocks", params={"from": pruned_height})
+        assert response.status_code == 200
+        payloads, _ = split_records(response.content)
+        assert len(payloads) == len(server.blockchain.chain) - pruned_height
+
+
+def follower_of(server, batch_size):
+    """Follower of an in-process leader app, with a chain started from the leader's genesis"""
+    follower = Follower(Blockchain(genesis=server.blockchain.chain[0]), "http://leader", batch_size)
+    follower.http = httpx.AsyncClient(base_url="http://leader", transport=httpx.ASGITransport(app=server.app))
+    return follower
+
+
+def test_follower_catches_up_in_batches(make_server):
+    server = make_server()
+    with TestClient(server.app) as client:
+        for i in range(7):
+            client.post("/api/v1/uav/register", json={
+                "uav_id": f"uav-{i}", "public_key": public_key_hex(),
+                "model": "Quadcopter X500", "firmware_version": "1.0.0"
+            })
+    leader = server.blockchain
+    follower = follower_of(server, batch_size=3)
+
+    async def catch_up():
+        await follower._catch_up()
+        await follower.http.aclose()
+
+    asyncio.run(catch_up())
+    chain = follower.blockchain.chain
+    assert [block.hash for block in chain] == [block.hash for block in leader.chain]
+    assert follower.blockchain.registry.to_dict() == leader.registry.to_dict()
+    assert follower.applied_blocks == 7
+    assert follower.status()['lag'] == 0
+
+    # Blocks sent again after a reconnect are skipped
+    follower._apply_blocks([leader.chain[5].to_bytes()])
+    assert len(chain) == len(leader.chain)
+
+
+def test_follower_rejects_blocks_that_do_not_follow():
+    leader = Blockchain()
+    for i in range(3):
+        leader.register_uav(f"uav-{i}", public_key_hex(), "Quadcopter X500", "1.0.0")
+        leader.mine_block()
+    follower = Follower(Blockchain(genesis=leader.chain[0]), "http://leader")
+
+    # A gap is a protocol error, worth a reconnect
+    with pytest.raises(httpx.RemoteProtocolError):
+        follower._apply_blocks([leader.chain[2].to_bytes()])
+
+    # A block that does not verify means the chains diverged
+    forged = Block.from_bytes(leader.chain[1].to_bytes())
+    forged.transactions[0].model = "Fixed Wing F1"
+    with pytest.raises(ReplicationError):
+        follower._apply_blocks([forged.to_bytes()])
+    assert len(follower.blockchain.chain) == 1
+    asyncio.run(follower.http.aclose())
+
+
+def test_block_stream_pushes_new_blocks():
+    blockchain = Blockchain()
+
+    async def stream():
+        records = block_stream(blockchain, 1, 10)
+        waiting = asyncio.ensure_future(records.__anext__())
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        blockchain.register_uav("uav-1", public_key_hex(), "Quadcopter X500", "1.0.0")
+        block = blockchain.mine_block()
+        payloads, _ = split_records(await asyncio.wait_for(waiting, 5))
+        await records.aclose()
+        return block, payloads
+
+    block, payloads = asyncio.run(stream())
+    assert payloads == [block.to_bytes()]
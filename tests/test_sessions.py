@@ -0,0 +1,88 @@
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from fastapi.testclient import TestClient
+
+from blockchain.blockchain import Blockchain
+from crypto.sessions import SessionSigner, key_id
+from crypto.signatures import auth_message, revoke_message, rotate_key_message
+
+
+def public_key_hex(key):
+    return key.public_key().public_bytes(
+        encoding=serialization.Encoding.Raw,
+        format=serialization.PublicFormat.Raw
+    ).hex()
+
+
+def test_token_round_trip():
+    signer = SessionSigner(ttl=60)
+    token, session = signer.issue("uav-1", b"\x01" * 32, now=1000)
+    checked = signer.verify(token, now=1030)
+    assert checked.uav_id == "uav-1" and checked.session_id == session.session_id
+    assert checked.key_id == key_id(b"\x01" * 32) and checked.expires_at == 1060
+
+    assert signer.verify(token, now=1060) is None
+    assert SessionSigner(ttl=60).verify(token, now=1030) is None
+    claims, signature = token.split('.')
+    assert signer.verify(claims[:-2] + "AA." + signature, now=1030) is None
+    assert signer.verify("not a token", now=1030) is None
+
+
+def test_revocation_and_rotation_end_sessions():
+    blockchain = Blockchain()
+    signer = SessionSigner()
+    key = ed25519.Ed25519PrivateKey.generate()
+    new_key = ed25519.Ed25519PrivateKey.generate()
+    assert blockchain.register_uav("uav-1", public_key_hex(key), "Quadcopter X500", "1.0.0")[0]
+    assert blockchain.register_uav("uav-2", public_key_hex(key), "Quadcopter X500", "1.0.0")[0]
+    blockchain.mine_block()
+
+    token_1, _ = signer.issue("uav-1", blockchain.registry.public_key("uav-1"))
+    token_2, _ = signer.issue("uav-2", blockchain.registry.public_key("uav-2"))
+    session_1, session_2 = signer.verify(token_1), signer.verify(token_2)
+    assert signer.is_current(session_1, blockchain.registry.key_state("uav-1"))
+    assert signer.is_current(session_2, blockchain.registry.key_state("uav-2"))
+    assert not signer.is_current(session_1, blockchain.registry.key_state("uav-unknown"))
+
+    timestamp = int(time.time())
+    assert blockchain.revoke_uav("uav-1", timestamp, key.sign(revoke_message("uav-1", timestamp)).hex())[0]
+    rotation = key.sign(rotate_key_message("uav-2", public_key_hex(new_key), timestamp)).hex()
+    assert blockchain.rotate_key("uav-2", public_key_hex(new_key), timestamp, rotation)[0]
+    blockchain.mine_block()
+
+    # Both tokens still carry a good signature, only the registry knows better
+    assert signer.verify(token_1) and signer.verify(token_2)
+    assert not signer.is_current(session_1, blockchain.registry.key_state("uav-1"))
+    assert not signer.is_current(session_2, blockchain.registry.key_state("uav-2"))
+
+
+def test_verify_endpoint_rejects_token_after_revocation(make_server):
+    server = make_server(SESSION_TTL=300)
+    key = ed25519.Ed25519PrivateKey.generate()
+    with TestClient(server.app) as client:
+        response = client.post("/api/v1/uav/register", json={
+            "uav_id": "uav-1", "public_key": public_key_hex(key),
+            "model": "Quadcopter X500", "firmware_version": "1.0.0"
+        }).json()
+        assert response["success"]
+
+        timestamp = int(time.time())
+        response = client.post("/api/v1/uav/authenticate", json={
+            "uav_id": "uav-1", "nonce": "nonce-1", "timestamp": timestamp,
+            "signature": key.sign(auth_message("uav-1", "nonce-1", timestamp)).hex()
+        }).json()
+        token = response["data"]["session_token"]
+
+        response = client.post("/api/v1/session/verify", json={"token": token}).json()
+        assert response["success"] and response["data"]["uav_id"] == "uav-1"
+
+        response = client.post("/api/v1/uav/revoke", json={
+            "uav_id": "uav-1", "timestamp": timestamp,
+            "signature": key.sign(revoke_message("uav-1", timestamp)).hex()
+        }).json()
+        assert response["success"]
+
+        response = client.post("/api/v1/session/verify", json={"token": token}).json()
+        assert not response["success"] and "revoked" in response["message"]
@@ -0,0 +1,152 @@
+import asyncio
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from blockchain.blockchain import Blockchain
+from blockchain.producer import BlockProducer
+from crypto.poh import verify_tick
+from crypto.signatures import auth_message
+from server.ledger import LedgerService
+from server.read_model import LedgerSnapshot
+from server.sharding import AnchorService, ShardedLedger, decode_heads, shard_for
+
+SHARDS = 3
+
+
+def public_key_hex(key):
+    return key.public_key().public_bytes(
+        encoding=serialization.Encoding.Raw,
+        format=serialization.PublicFormat.Raw
+    ).hex()
+
+
+def ledger_service():
+    blockchain = Blockchain()
+    producer = BlockProducer(blockchain, max_block_size=100, block_interval=0.01)
+    producer.start()
+    return LedgerService(blockchain, producer, seal_timeout=5)
+
+
+def sharded_ledger(services):
+    """ShardedLedger whose shard clients call in-process services instead of ledger processes"""
+    ledger = ShardedLedger([('127.0.0.1', 0)] * len(services), b'test')
+    for shard, service in zip(ledger.shards, services):
+        shard.ledger = service
+        shard.snapshot = service.get_snapshot()
+    return ledger
+
+
+def close(services):
+    for service in services:
+        service.close()
+
+
+def test_shard_for_is_stable_and_spreads_uavs():
+    owners = [shard_for(f"uav-{i}", SHARDS) for i in range(300)]
+    assert owners == [shard_for(f"uav-{i}", SHARDS) for i in range(300)]
+    assert set(owners) == set(range(SHARDS))
+    assert all(owners.count(shard) > 50 for shard in range(SHARDS))
+    assert {shard_for(f"uav-{i}", 1) for i in range(10)} == {0}
+
+
+def test_batches_are_split_per_shard_and_put_back_in_order():
+    services = [ledger_service() for _ in range(SHARDS)]
+    ledger = sharded_ledger(services)
+    keys = {f"uav-{i}": ed25519.Ed25519PrivateKey.generate() for i in range(12)}
+    timestamp = int(time.time())
+
+    async def run():
+        registered = await ledger.register_batch([
+            (uav_id, public_key_hex(key), "Quadcopter X500" if i % 2 else "Fixed Wing F1", "1.0.0")
+            for i, (uav_id, key) in enumerate(keys.items())
+        ])
+        authenticated = await ledger.authenticate_uav(
+            "uav-3", "nonce-1", timestamp, keys["uav-3"].sign(auth_message("uav-3", "nonce-1", timestamp)).hex()
+        )
+        key_state = await ledger.get_key_state("uav-3")
+        counts = await ledger.count_uavs('model')
+        await ledger.stop()
+        return registered, authenticated, key_state, counts
+
+    try:
+        registered, authenticated, key_state, counts = asyncio.run(run())
+    finally:
+        close(services)
+
+    assert [result['uav_id'] for result in registered] == list(keys)
+    assert all(result['success'] for result in registered)
+    for result in registered:
+        assert result['shard'] == shard_for(result['uav_id'], SHARDS)
+    for shard, service in enumerate(services):
+        assert set(service.blockchain.registry.to_dict()) == {
+            uav_id for uav_id in keys if shard_for(uav_id, SHARDS) == shard
+        }
+
+    assert authenticated['success'] and authenticated['shard'] == shard_for("uav-3", SHARDS)
+    assert key_state == (bytes.fromhex(public_key_hex(keys["uav-3"])), False)
+    assert counts == {"Quadcopter X500": 6, "Fixed Wing F1": 6}
+
+
+def test_snapshot_sums_the_shards_and_is_cached():
+    blockchains = [Blockchain() for _ in range(SHARDS)]
+    for shard, blockchain in enumerate(blockchains):
+        for i in range(shard + 1):
+            blockchain.register_uav(f"uav-{shard}-{i}", public_key_hex(ed25519.Ed25519PrivateKey.generate()),
+                                    "Quadcopter X500", "1.0.0")
+        blockchain.mine_block()
+    snapshots = [LedgerSnapshot(blockchain, pending_transactions=shard) for shard, blockchain in enumerate(blockchains)]
+
+    combined = LedgerSnapshot.combine(snapshots)
+    assert combined.shards == SHARDS
+    assert combined.blocks == 2 * SHARDS
+    assert combined.registered_uavs == 1 + 2 + 3
+    assert combined.pending_transactions == 0 + 1 + 2
+    assert combined.last_block_time == max(blockchain.get_latest_block().timestamp for blockchain in blockchains)
+    assert combined.tx_per_second is None
+
+    ledger = ShardedLedger([('127.0.0.1', 0)] * SHARDS, b'test')
+    for shard, snapshot in zip(ledger.shards, snapshots):
+        shard.snapshot = snapshot
+    first = asyncio.run(ledger.get_snapshot())
+    assert asyncio.run(ledger.get_snapshot()) is first
+    # A refreshed shard snapshot is summed again
+    ledger.shards[0].snapshot = LedgerSnapshot(blockchains[0], pending_transactions=5)
+    assert asyncio.run(ledger.get_snapshot()).pending_transactions == 5 + 1 + 2
+
+
+def test_anchor_commits_to_the_shard_heads_when_they_move(tmp_path):
+    services = [ledger_service() for _ in range(SHARDS)]
+    try:
+        anchors = AnchorService(services, storage_dir=str(tmp_path))
+        first = anchors.anchor()
+        assert first is not None
+        # Nothing sealed since, no new anchor
+        assert anchors.anchor() is None
+
+        key = ed25519.Ed25519PrivateKey.generate()
+        uav_id = next(f"uav-{i}" for i in range(100) if shard_for(f"uav-{i}", SHARDS) == 1)
+        assert services[1].register_uav(uav_id, public_key_hex(key), "Quadcopter X500", "1.0.0")['success']
+        second = anchors.anchor()
+        assert verify_tick(first, second)
+
+        heads = decode_heads(second.data)
+        assert [head['shard'] for head in heads] == list(range(SHARDS))
+        assert [head['height'] for head in heads] == [0, 1, 0]
+        block = services[1].blockchain.get_latest_block()
+        assert heads[1]['block_hash'] == block.hash.hex()
+        assert heads[1]['poh_hash'] == block.poh_tick.hash.hex()
+
+        latest = anchors.get_anchors(limit=1)
+        assert len(latest) == 1 and latest[0]['heads'] == heads and latest[0]['data'] is None
+        assert [anchor['sequence'] for anchor in anchors.get_anchors()] == [2, 1]
+        anchors.close()
+
+        # The anchors survive a restart and so does the last committed set of heads
+        reopened = AnchorService(services, storage_dir=str(tmp_path))
+        assert [anchor['sequence'] for anchor in reopened.get_anchors()] == [2, 1]
+        assert reopened.anchor() is None
+        reopened.close()
+    finally:
+        close(services)
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from crypto.signatures import SignatureVerifier, VerifyingKeyCache, auth_message
+
+
+def public_key_hex(key):
+    return key.public_key().public_bytes(
+        encoding=serialization.Encoding.Raw,
+        format=serialization.PublicFormat.Raw
+    ).hex()
+
+
+def signed_items(count, bad=()):
+    """(uav_id, public_key_hex, message, signature_hex) items, the ones at the bad positions are forged"""
+    items = []
+    for i in range(count):
+        key = ed25519.Ed25519PrivateKey.generate()
+        message = auth_message(f"uav-{i}", f"nonce-{i}", 1700000000)
+        signer = ed25519.Ed25519PrivateKey.generate() if i in bad else key
+        items.append((f"uav-{i}", public_key_hex(key), message, signer.sign(message).hex()))
+    return items
+
+
+def test_key_cache_hits_and_evicts():
+    keys = [public_key_hex(ed25519.Ed25519PrivateKey.generate()) for _ in range(3)]
+    cache = VerifyingKeyCache(max_size=2)
+    cache.get("uav-0", keys[0])
+    cache.get("uav-0", keys[0])
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.get("uav-1", keys[1])
+    cache.get("uav-0", keys[0])
+    cache.get("uav-2", keys[2])
+    # uav-1 was the least recently used
+    assert list(cache.keys) == ["uav-0", "uav-2"]
+
+    # A new key for the same UAV replaces the cached one
+    cache.get("uav-0", keys[1])
+    assert cache.keys["uav-0"][0] == keys[1] and cache.misses == 4
+    cache.invalidate("uav-0")
+    assert "uav-0" not in cache.keys
+
+
+def test_verify_rejects_forged_and_malformed_signatures():
+    verifier = SignatureVerifier()
+    uav_id, public_key, message, signature = signed_items(1)[0]
+    assert verifier.verify(uav_id, public_key, message, signature)
+    assert not verifier.verify(uav_id, public_key, message + b"x", signature)
+    assert not verifier.verify(uav_id, public_key, message, "zz" * 64)
+    assert not verifier.verify(uav_id, "00" * 31, message, signature)
+    with pytest.raises(ValueError):
+        verifier.load_key(uav_id, "not hex")
+
+
+@pytest.mark.parametrize("executor", [None, "thread", "process"])
+def test_batch_results_keep_their_order(executor):
+    verifier = SignatureVerifier(executor=executor, workers=2)
+    try:
+        items = signed_items(9, bad={2, 7})
+        expected = [i not in (2, 7) for i in range(9)]
+        assert verifier.verify_batch(items) == expected
+        assert asyncio.run(verifier.verify_batch_async(items)) == expected
+        assert verifier.verify_batch([]) == []
+    finally:
+        verifier.shutdown()
+
+
+def test_unknown_executor():
+    with pytest.raises(ValueError):
+        SignatureVerifier(executor="gpu")
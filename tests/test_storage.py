@@ -0,0 +1,174 @@
+import os
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from blockchain.blockchain import Block, Blockchain
+from blockchain.storage import RECORD_HEADER, BlockLog, ChainView
+
+
+def public_key_hex():
+    return ed25519.Ed25519PrivateKey.generate().public_key().public_bytes(
+        encoding=serialization.Encoding.Raw,
+        format=serialization.PublicFormat.Raw
+    ).hex()
+
+
+def test_records_survive_reopening(tmp_path):
+    path = str(tmp_path / "blocks.log")
+    log = BlockLog(path, sync_every=2)
+    payloads = [b"first", b"", b"third" * 100]
+    offsets = [log.append(payload) for payload in payloads]
+    assert offsets[0] == 0 and offsets[1] == RECORD_HEADER.size + 5
+    log.close()
+
+    reopened = BlockLog(path)
+    assert len(reopened) == 3
+    assert list(reopened.read()) == payloads
+    assert list(reopened.read(2)) == payloads[2:]
+    assert reopened.read_record(0) == b"first"
+    reopened.close()
+
+
+def test_torn_record_is_cut_off(tmp_path):
+    path = str(tmp_path / "blocks.log")
+    log = BlockLog(path)
+    log.append(b"whole")
+    log.close()
+    size = os.path.getsize(path)
+
+    # A crash in the middle of the next append, the header promises more than was written
+    with open(path, 'ab') as f:
+        f.write(RECORD_HEADER.pack(100) + b"torn")
+    log = BlockLog(path)
+    assert len(log) == 1 and os.path.getsize(path) == size
+
+    # Appends continue right after the last whole record
+    log.append(b"next")
+    log.close()
+    assert list(BlockLog(path).read()) == [b"whole", b"next"]
+
+    # Half a length header is cut off too
+    with open(path, 'ab') as f:
+        f.write(b"\x00\x00")
+    assert len(BlockLog(path)) == 2
+
+
+def test_truncate_and_drop_front(tmp_path):
+    path = str(tmp_path / "blocks.log")
+    log = BlockLog(path)
+    for i in range(5):
+        log.append(f"record-{i}".encode())
+
+    log.truncate(4)
+    assert len(log) == 4
+    log.drop_front(2)
+    assert list(log.read()) == [b"record-2", b"record-3"]
+    assert log.offsets[0] == 0 and log.read_record(1) == b"record-3"
+    assert not os.path.exists(path + '.tmp')
+
+    # The swapped in file is appended to and reopened like any other
+    log.append(b"record-5")
+    log.close()
+    assert list(BlockLog(path).read()) == [b"record-2", b"record-3", b"record-5"]
+
+
+def test_restart_after_torn_block(tmp_path):
+    blockchain = Blockchain(storage_dir=str(tmp_path), snapshot_every=1000)
+    for i in range(3):
+        assert blockchain.register_uav(f"uav-{i}", public_key_hex(), "Quadcopter X500", "1.0.0")[0]
+        blockchain.mine_block()
+    head = blockchain.get_latest_block()
+    blockchain.close()
+
+    with open(tmp_path / "blocks.log", 'ab') as f:
+        f.write(RECORD_HEADER.pack(1000) + b"half a block")
+
+    reopened = Blockchain(storage_dir=str(tmp_path), snapshot_every=1000)
+    assert len(reopened.chain) == 4
+    assert reopened.get_latest_block().hash == head.hash
+    assert reopened.poh.current_hash == head.poh_tick.hash
+    assert set(reopened.registry.uav_ids) == {"uav-0", "uav-1", "uav-2"}
+    assert reopened.is_chain_valid(full=True)
+
+    # The chain goes on where it left off
+    assert reopened.register_uav("uav-3", public_key_hex(), "Quadcopter X500", "1.0.0")[0]
+    assert reopened.mine_block().prev_hash == head.hash
+    reopened.close()
+
+
+def stored_blocks(tmp_path, count):
+    """Blocks of a stored chain with one registration each"""
+    blockchain = Blockchain(storage_dir=str(tmp_path / "source"), snapshot_every=1000)
+    for i in range(count - 1):
+        assert blockchain.register_uav(f"uav-{i}", public_key_hex(), "Quadcopter X500", "1.0.0")[0]
+        blockchain.mine_block()
+    blocks = list(blockchain.chain)
+    blockchain.close()
+    return blocks
+
+
+def test_chain_view_reads_through_the_map_with_a_bounded_lru(tmp_path):
+    blocks = stored_blocks(tmp_path, 6)
+    log = BlockLog(str(tmp_path / "blocks.log"))
+    view = ChainView(log, Block.to_bytes, Block.from_bytes, cache_size=2)
+    for block in blocks[:3]:
+        view.append(block)
+    assert len(view) == 3 and list(view.cache) == [1, 2]
+
+    # Blocks written after the file was mapped are found by remapping
+    assert view[0].hash == blocks[0].hash
+    for block in blocks[3:]:
+        view.append(block)
+    assert [block.hash for block in view] == [block.hash for block in blocks]
+    assert len(view.cache) == 2
+    assert view[-1] is view[5] and view[1:3][1].hash == blocks[2].hash
+    assert bytes(view.read_raw(4)) == blocks[4].to_bytes()
+    view.close()
+    log.close()
+
+    # A reopened view decodes the same blocks lazily
+    log = BlockLog(str(tmp_path / "blocks.log"))
+    view = ChainView(log, Block.to_bytes, Block.from_bytes, cache_size=2)
+    assert not view.cache and view[3].merkle_root == blocks[3].merkle_root
+    view.close()
+    log.close()
+
+
+def test_prune_interrupted_before_dropping_the_bodies(tmp_path):
+    blocks = stored_blocks(tmp_path, 5)
+    log = BlockLog(str(tmp_path / "blocks.log"))
+    headers = BlockLog(str(tmp_path / "headers.log"))
+    for block in blocks:
+        log.append(block.to_bytes())
+    # The headers of the first blocks were written, then the process died
+    for block in blocks[:3]:
+        headers.append(block.header().to_bytes())
+
+    view = ChainView(log, Block.to_bytes, Block.from_bytes, headers=headers)
+    assert view.base == 0 and len(headers) == 0 and len(view) == 5
+
+    # Pruning again from the start leaves each block stored once
+    assert view.prune(3, lambda block: block.header().to_bytes()) == 3
+    assert view.base == 3 and len(log) == 2 and len(headers) == 3
+    assert view[1].transactions == [] and view[4].hash == blocks[4].hash
+    view.close()
+
+
+def test_pruned_chain_restarts(tmp_path):
+    blockchain = Blockchain(storage_dir=str(tmp_path), snapshot_every=2, retain_blocks=2)
+    for i in range(12):
+        assert blockchain.register_uav(f"uav-{i}", public_key_hex(), "Quadcopter X500", "1.0.0")[0]
+        blockchain.mine_block()
+    pruned_height = blockchain.pruned_height
+    head = blockchain.get_latest_block()
+    assert pruned_height > 1
+    blockchain.close()
+
+    reopened = Blockchain(storage_dir=str(tmp_path), snapshot_every=2, retain_blocks=2)
+    assert reopened.pruned_height == pruned_height
+    assert reopened.get_latest_block().hash == head.hash
+    assert reopened.chain[1].transactions == [] and reopened.chain[-1].transactions
+    assert len(reopened.registry) == 12
+    assert reopened.is_chain_valid(full=True)
+    reopened.close()
@@ -0,0 +1,61 @@
+import os
+
+from blockchain.blockchain import Block, Blockchain
+from blockchain.transaction import Transaction
+from blockchain.validation import verify_block
+from crypto.poh import PoHClock
+
+
+def build_chain(blocks=3, poh_clock=None):
+    blockchain = Blockchain(poh_clock=poh_clock)
+    for b in range(blocks):
+        for i in range(4):
+            blockchain.add_transaction(
+                Transaction.register(f"uav-{b}-{i}", os.urandom(32), "Quadcopter X500", "1.0.0", 1700000000)
+            )
+        blockchain.mine_block()
+    return blockchain
+
+
+def swap_transactions(block):
+    """Same tick and link, different transactions with a matching Merkle root and hash"""
+    transactions = [
+        Transaction.register(f"forged-{i}", os.urandom(32), "Quadcopter X500", "1.0.0", 1700000000)
+        for i in range(len(block.transactions))
+    ]
+    return Block(block.index, block.prev_hash, block.poh_tick, transactions, block.timestamp)
+
+
+def test_sealed_blocks_verify():
+    blockchain = build_chain()
+    assert blockchain.is_chain_valid()
+    assert blockchain.is_chain_valid(full=True)
+
+
+def test_transactions_swapped_under_valid_tick_are_rejected():
+    blockchain = build_chain()
+    latest = blockchain.get_latest_block()
+    forged = swap_transactions(latest)
+    assert forged.hash == forged.calculate_hash()
+    assert forged.merkle_root == forged.calculate_merkle_root()
+
+    assert verify_block(latest, blockchain.chain[-2])
+    assert not verify_block(forged, blockchain.chain[-2])
+
+    blockchain.chain[-1] = forged
+    assert not blockchain.is_chain_valid(full=True)
+
+
+def test_clock_suffix_is_checked():
+    clock = PoHClock(checkpoint_every=1000)
+    blockchain = build_chain(poh_clock=clock)
+    latest = blockchain.get_latest_block()
+    assert len(latest.poh_tick.data) == 72
+    assert blockchain.is_chain_valid(full=True)
+
+    # A tick whose data is the root plus a truncated clock suffix
+    previous = blockchain.chain[-2]
+    blockchain.poh.restore([previous.poh_tick])
+    tick = blockchain.poh.tick(latest.merkle_root + latest.poh_tick.data[32:40])
+    truncated = Block(latest.index, latest.prev_hash, tick, latest.transactions, latest.timestamp)
+    assert not verify_block(truncated, previous)